@@ -0,0 +1,50 @@
+"""
+Decisions/sec of the rule-based agents in lib/agents/rules.py.
+
+Collects observations and masks from random self-play on a BriscolaVecEnv,
+then times `act` over batches of `--batch-size` positions.
+
+    python -m benchmarks.agents_bench --players 4 --batch-size 4096
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.suite import measure
+from lib.agents.rules import AGENTS
+from lib.briscola_env.vec_env import BriscolaVecEnv
+
+
+def positions(players: int, n: int):
+    env = BriscolaVecEnv(n, num_players=players)
+    env.seed(0)
+    obs = env.reset()
+    rng = np.random.default_rng(0)
+    # Mid-game positions, some of them part way through a trick
+    for _ in range(int(rng.integers(10, 30))):
+        masks = env.action_masks()
+        obs, _, _, _ = env.step(((rng.random(masks.shape) + 1) * masks).argmax(axis=1))
+    return obs, env.action_masks()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--min-time", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    observations, masks = positions(args.players, args.batch_size)
+    for name, cls in AGENTS.items():
+        agent = cls()
+
+        def run():
+            agent.act(observations, masks)
+            return len(observations)
+
+        print(f"{name:<12}{measure(run, args.min_time, args.repeats):14,.0f} decisions/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Per-step cost of the bitboard BriscolaState against list-based card sets.
+
+Every step of the same random games observes the seat to act, builds its
+action mask, checks the chosen card is playable and plays it. The list
+side does the first three from hand and deck lists like the engine did
+before bitboards; the bitboard side calls game_embedding, action_mask and
+playable. Positions are recorded up front, so only those three are timed;
+playing the card is common to both. Best of three passes.
+
+    python -m benchmarks.bitboard_bench --players 4 --games 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lib.briscola.core import HAND_SIZE, NUM_CARDS, BriscolaState
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.embedding import EMBEDDING_SHAPE, game_embedding
+
+
+def list_embedding(state: BriscolaState, player: int) -> np.ndarray:
+    embedding = np.zeros(EMBEDDING_SHAPE, dtype=np.uint8)
+    for card in state.hand(player):
+        embedding[card] = 1
+    trick = state.trick_cards()
+    for i, card in enumerate(trick):
+        embedding[40 + i] = card
+    if trick:
+        embedding[43] = trick[0] // 10 + 1
+    embedding[44] = len(trick)
+    embedding[45] = state.briscola
+    embedding[46] = state.briscola // 10 + 1
+    unseen = state.deck_cards()
+    for seat in range(state.num_players):
+        unseen += state.hand(seat)
+    for card in unseen:
+        embedding[47 + card] = 1
+    return embedding
+
+
+def list_mask(state: BriscolaState, player: int) -> np.ndarray:
+    mask = np.zeros(NUM_CARDS, dtype=np.int8)
+    mask[state.hand(player)] = 1
+    return mask
+
+
+def list_playable(state: BriscolaState, card: int) -> bool:
+    base = state.action_on * HAND_SIZE
+    return card in state.hands[base : base + state.hand_len[state.action_on]]
+
+
+def bitboard_step(game: BriscolaGame, player: int, card: int):
+    state = game.state
+    game_embedding(game, player)
+    state.action_mask(player)
+    state.playable(card)
+
+
+def list_step(game: BriscolaGame, player: int, card: int):
+    state = game.state
+    list_embedding(state, player)
+    list_mask(state, player)
+    list_playable(state, card)
+
+
+def positions(players: int, games: int):
+    """
+    Game, seat to act and the card it plays, before every card of `games`
+    random games.
+    """
+    result = []
+    for seed in range(games):
+        game = BriscolaGame(players, seed=seed)
+        state = game.state
+        rng = np.random.default_rng(seed)
+        while not state.game_over():
+            player = state.action_on
+            hand = state.hand(player)
+            card = hand[rng.integers(len(hand))]
+            result.append((game.clone(), player, card))
+            state.apply(card)
+    return result
+
+
+def steps_per_sec(step, steps) -> float:
+    start = time.perf_counter()
+    for game, player, card in steps:
+        step(game, player, card)
+    return len(steps) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--games", type=int, default=500)
+    args = parser.parse_args()
+
+    steps = positions(args.players, args.games)
+    lists = max(steps_per_sec(list_step, steps) for _ in range(3))
+    bits = max(steps_per_sec(bitboard_step, steps) for _ in range(3))
+    print(f"lists:     {lists:12,.0f} steps/sec  {1e6 / lists:6.1f} us/step")
+    print(f"bitboards: {bits:12,.0f} steps/sec  {1e6 / bits:6.1f} us/step ({bits / lists:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Observations/sec of game_embedding against the incremental ObservationEncoder.
+
+Both sides encode the seat about to act after every card of the same random
+games; only time spent producing observations is counted, including the
+encoder's per-event updates.
+
+    python -m benchmarks.embedding_bench --players 4 --games 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.embedding import game_embedding
+from lib.briscola_env.encoder import ObservationEncoder
+
+
+def bench_game_embedding(players: int, games: int) -> float:
+    observations = 0
+    elapsed = 0.0
+    for seed in range(games):
+        game = BriscolaGame(players, seed=seed)
+        rng = np.random.default_rng(seed)
+        while not game.game_over():
+            start = time.perf_counter()
+            game_embedding(game, game.action_on)
+            elapsed += time.perf_counter() - start
+            observations += 1
+            hand = game.state.hand(game.action_on)
+            game.state.play(hand[rng.integers(len(hand))])
+            if game.should_score_trick():
+                game.score_trick()
+            if game.needs_redeal():
+                game.redeal()
+    return observations / elapsed
+
+
+def bench_encoder(players: int, games: int) -> float:
+    encoder = ObservationEncoder(players)
+    observations = 0
+    elapsed = 0.0
+    for seed in range(games):
+        game = BriscolaGame(players, seed=seed)
+        state = game.state
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+        encoder.reset(state)
+        elapsed += time.perf_counter() - start
+        while not state.game_over():
+            start = time.perf_counter()
+            encoder.observe(state.action_on)
+            elapsed += time.perf_counter() - start
+            observations += 1
+            player = state.action_on
+            hand = state.hand(player)
+            card = hand[rng.integers(len(hand))]
+            state.play(card)
+            start = time.perf_counter()
+            encoder.on_play(player, card, state.trick_len - 1)
+            elapsed += time.perf_counter() - start
+            if state.should_score_trick():
+                state.score_trick()
+                start = time.perf_counter()
+                encoder.on_trick_scored()
+                elapsed += time.perf_counter() - start
+            if state.needs_redeal():
+                state.redeal()
+                start = time.perf_counter()
+                encoder.on_redeal(state)
+                elapsed += time.perf_counter() - start
+    return observations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--games", type=int, default=500)
+    args = parser.parse_args()
+
+    baseline = bench_game_embedding(args.players, args.games)
+    encoder = bench_encoder(args.players, args.games)
+    print(f"game_embedding:     {baseline:12,.0f} obs/sec")
+    print(f"ObservationEncoder: {encoder:12,.0f} obs/sec ({encoder / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+PIMC player: playouts/sec per core and win rate against random opponents.
+
+    python -m benchmarks.pimc_bench --players 2 --games 20 --budget 0.02
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lib.briscola.core import BriscolaState
+from lib.search.pimc import PIMCPlayer, playouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=0.02, help="seconds per move")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    state = BriscolaState.new(args.players, seed=0)
+    start = time.perf_counter()
+    _cards, _totals, counts = playouts(state, 1.0, batch_size=args.batch_size, seed=0)
+    print(f"Playouts/sec:  {counts.sum() / (time.perf_counter() - start):,.0f}")
+
+    player = PIMCPlayer(budget=args.budget, batch_size=args.batch_size, seed=0)
+    rng = np.random.default_rng(0)
+    wins = 0
+    for seed in range(args.games):
+        state = BriscolaState.new(args.players, goes_first=seed % args.players, seed=seed)
+        while not state.game_over():
+            if state.action_on == 0:
+                card = player.choose(state)
+            else:
+                card = int(rng.choice(state.hand(state.action_on)))
+            state.apply(card)
+        wins += state.leaders()[0][1] == 0
+    print(f"Win rate vs random: {wins / args.games:.0%} over {args.games} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Load generator for the move service in lib/serving/server.py.
+
+Keeps `concurrency` requests in flight for `duration` seconds, each asking
+for the move in a random mid-game position, and reports sustained
+requests/sec with client-side p50/p99 latency next to the server's own
+metrics. Without --url it starts a server for --policy in a subprocess.
+
+    python -m benchmarks.serve_load --policy models/briscola.onnx --concurrency 64 --mode ws
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+
+from lib.briscola.game import BriscolaGame
+
+PORT = 8765
+
+
+def random_views(count: int, num_players: int, seed: int = 0) -> list:
+    """
+    Seat views of random positions, like a client would send them.
+    """
+    rng = np.random.default_rng(seed)
+    views = []
+    while len(views) < count:
+        state = BriscolaGame(players=num_players, seed=int(rng.integers(1 << 31))).state
+        for _ in range(int(rng.integers(40))):
+            state.apply(int(rng.choice(state.hand(state.action_on))))
+        views.append(
+            {
+                "players": num_players,
+                "hand": state.hand(state.action_on),
+                "trick": state.trick_cards(),
+                "briscola": state.briscola,
+                "played": [c for c in range(40) if any(pile >> c & 1 for pile in state.piles)],
+                "deck_size": state.deck_size() + 1 if state.deck_size() else 0,
+            }
+        )
+    return views
+
+
+async def http_worker(session, url, views, deadline, latencies):
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with session.post(f"{url}/move", json={"state": views[i % len(views)]}) as response:
+            response.raise_for_status()
+            await response.read()
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+async def ws_worker(session, url, views, deadline, latencies):
+    async with session.ws_connect(f"{url}/ws") as ws:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await ws.send_json({"id": i, "state": views[i % len(views)]})
+            reply = await ws.receive_json()
+            if "error" in reply:
+                raise Exception(reply["error"])
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+
+async def wait_ready(session, url, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with session.get(f"{url}/metrics") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientConnectionError:
+            if time.perf_counter() > deadline:
+                raise
+        await asyncio.sleep(0.2)
+
+
+async def run(args) -> None:
+    views = random_views(1000, args.players)
+    worker = ws_worker if args.mode == "ws" else http_worker
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_ready(session, args.url)
+        # Warm up the policy and the connections
+        await worker(session, args.url, views, time.perf_counter() + 1, [])
+        latencies = []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *[worker(session, args.url, views[i:] + views[:i], deadline, latencies) for i in range(args.concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{args.url}/metrics") as response:
+            metrics = await response.json()
+
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(
+        f"{args.mode} concurrency {args.concurrency}: {len(latencies) / elapsed:,.0f} requests/sec  "
+        f"client p50 {p50:.2f} ms  p99 {p99:.2f} ms"
+    )
+    print(
+        f"server: p50 {metrics['latency_p50_ms']:.2f} ms  p99 {metrics['latency_p99_ms']:.2f} ms  "
+        f"mean batch {metrics['mean_batch_size']:.1f}  max queue depth {metrics['max_queue_depth']}"
+    )
+    if "cache" in metrics:
+        print(f"cache: hit rate {metrics['cache']['hit_rate']:.1%}  evictions {metrics['cache']['evictions']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="running server, else one is started for --policy")
+    parser.add_argument("--policy", default="greedy", help="policy file or rule-based agent name")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--cache-size", type=int, default=0, help="server policy cache, off if 0")
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--mode", default="http", choices=["http", "ws"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    args = parser.parse_args()
+
+    server = None
+    if args.url is None:
+        args.url = f"http://127.0.0.1:{PORT}"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "lib.serving.server",
+                args.policy,
+                "--port",
+                str(PORT),
+                "--max-wait-ms",
+                str(args.max_wait_ms),
+                "--cache-size",
+                str(args.cache_size),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Endgame solver throughput: nodes/sec, transposition table hit rate and
+microseconds per solve, from the first move after the deck runs out.
+--keep-table shares the table across all solves, --raw-suits turns off
+suit canonicalization.
+
+    python -m benchmarks.solver_bench --players 4 --games 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lib.briscola.core import BriscolaState
+from lib.search.endgame import EndgameSolver
+
+
+def endgame_states(players: int, games: int):
+    states = []
+    for seed in range(games):
+        state = BriscolaState.new(players, goes_first=seed % players, seed=seed)
+        rng = np.random.default_rng(seed)
+        while state.deck_size():
+            state.play(int(rng.choice(state.hand(state.action_on))))
+            if state.should_score_trick():
+                state.score_trick()
+            if state.needs_redeal():
+                state.redeal()
+        states.append(state)
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--keep-table", action="store_true", help="don't clear the table between solves")
+    parser.add_argument("--raw-suits", action="store_true", help="solve without suit canonicalization")
+    args = parser.parse_args()
+
+    states = endgame_states(args.players, args.games)
+    solver = EndgameSolver(canonical=not args.raw_suits)
+    start = time.perf_counter()
+    for state in states:
+        if not args.keep_table:
+            solver.clear()
+        solver.solve(state)
+    seconds = time.perf_counter() - start
+
+    print(f"Players:       {args.players}")
+    print(f"Solves:        {len(states)}")
+    print(f"us/solve:      {seconds / len(states) * 1e6:,.0f}")
+    print(f"Nodes/solve:   {solver.nodes / len(states):,.0f}")
+    print(f"Nodes/sec:     {solver.nodes / seconds:,.0f}")
+    print(f"TT hit rate:   {solver.hits / solver.probes:.1%}")
+
+
+if __name__ == "__main__":
+    main()
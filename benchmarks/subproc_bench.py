@@ -0,0 +1,57 @@
+"""
+Scaling of SubprocBriscolaVecEnv with the number of worker processes.
+
+Steps `envs-per-worker` games per worker with random legal actions and
+reports env steps/sec and parallel efficiency against the per-worker rate
+of the smallest run, next to one in-process BriscolaVecEnv of the same
+size.
+
+    python -m benchmarks.subproc_bench --players 4 --workers 1 2 4 8 16 32
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from lib.briscola_env.subproc_vec_env import SubprocBriscolaVecEnv
+from lib.briscola_env.vec_env import BriscolaVecEnv
+
+
+def steps_per_sec(env, steps: int) -> float:
+    rng = np.random.default_rng(0)
+    env.seed(0)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        masks = env.action_masks()
+        env.step(((rng.random(masks.shape) + 1) * masks).argmax(axis=1))
+    return steps * env.num_envs / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--envs-per-worker", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=2000, help="vector steps per run")
+    args = parser.parse_args()
+
+    single = None
+    for workers in sorted(set(args.workers)):
+        num_envs = workers * args.envs_per_worker
+        local = steps_per_sec(BriscolaVecEnv(num_envs, num_players=args.players), args.steps)
+        env = SubprocBriscolaVecEnv(num_envs, num_players=args.players, num_workers=workers)
+        try:
+            rate = steps_per_sec(env, args.steps)
+        finally:
+            env.close()
+        single = single or rate / workers
+        print(
+            f"{workers:3d} workers  {num_envs:6d} envs  {rate:12,.0f} steps/sec  "
+            f"efficiency {rate / (single * workers):5.0%}  in-process {local:12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Throughput benchmarks for the game, env stack, embedding and policies.
+
+Writes every metric (higher is better) to JSON and compares it against a
+stored baseline, exiting non-zero when any metric drops by more than the
+threshold.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --save-baseline
+"""
+import argparse
+import glob
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.embedding import game_embedding
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+PLAYER_COUNTS = [2, 4]
+
+
+def measure(run: Callable[[], int], min_time: float, repeats: int) -> float:
+    """
+    Best units/sec over `repeats` rounds, each calling `run` (which returns
+    the units it did) until `min_time` seconds have passed.
+    """
+    best = 0.0
+    for _ in range(repeats):
+        units = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < min_time:
+            units += run()
+        best = max(best, units / (time.perf_counter() - start))
+    return best
+
+
+def random_games(players: int) -> Callable[[], int]:
+    seeds = iter(range(10**9))
+
+    def run():
+        seed = next(seeds)
+        game = BriscolaGame(players, seed=seed)
+        draws = np.random.default_rng(seed).random((40, 3))
+        for step in range(40):
+            hand = game.players[game.action_on].hand
+            game.play(hand[int(draws[step, 0] * len(hand))])
+            if game.should_score_trick():
+                game.score_trick()
+            if game.needs_redeal():
+                game.redeal()
+        return 1
+
+    return run
+
+
+def aec_env_steps(players: int) -> Callable[[], int]:
+    env = BriscolaEnv(num_players=players)
+    seeds = iter(range(10**9))
+
+    def run():
+        env.reset(seed=next(seeds))
+        steps = 0
+        for agent in env.agent_iter():
+            obs, _, termination, truncation, _ = env.last()
+            if termination or truncation:
+                break
+            env.step(int(obs["action_mask"].argmax()))
+            steps += 1
+        return steps
+
+    return run
+
+
+def wrapper_env_steps(players: int) -> Callable[[], int]:
+    from sb3_contrib.common.wrappers import ActionMasker
+
+    from lib.action_mask_wrapper import SB3ActionMaskWrapper
+
+    env = SB3ActionMaskWrapper(BriscolaEnv(num_players=players))
+    env.reset(seed=0)
+    env = ActionMasker(env, lambda env: env.action_mask())
+    seeds = iter(range(10**9))
+
+    def run():
+        env.reset(seed=next(seeds))
+        steps = 0
+        terminated = False
+        while not terminated:
+            _, _, terminated, _, _ = env.step(int(env.action_masks().argmax()))
+            steps += 1
+        return steps
+
+    return run
+
+
+def embeddings(players: int) -> Callable[[], int]:
+    games = [BriscolaGame(players, seed=seed) for seed in range(32)]
+
+    def run():
+        for game in games:
+            game_embedding(game, game.action_on)
+        return len(games)
+
+    return run
+
+
+def policy_inferences(path: str) -> Callable[[], int]:
+    from lib.inference.policy import load_policy
+
+    policy = load_policy(path)
+    rng = np.random.default_rng(0)
+    observation = rng.integers(0, 2, size=policy.observation_shape).astype(np.uint8)
+    mask = np.zeros(40, dtype=np.int8)
+    mask[rng.choice(40, 3, replace=False)] = 1
+
+    def run():
+        policy.predict(observation, action_masks=mask, deterministic=True)
+        return 1
+
+    return run
+
+
+def run_suite(min_time: float, repeats: int, models: List[str]) -> Dict[str, float]:
+    benches = {}
+    for players in PLAYER_COUNTS:
+        benches[f"game_games_per_sec_{players}p"] = random_games(players)
+        benches[f"env_steps_per_sec_{players}p"] = aec_env_steps(players)
+        benches[f"wrapper_steps_per_sec_{players}p"] = wrapper_env_steps(players)
+        benches[f"embedding_obs_per_sec_{players}p"] = embeddings(players)
+    for path in models:
+        name = path.split("/")[-1]
+        benches[f"inference_per_sec_{name}"] = policy_inferences(path)
+
+    metrics = {}
+    for name, run in benches.items():
+        metrics[name] = measure(run, min_time, repeats)
+        print(f"{name:<70}{metrics[name]:14,.0f}")
+    return metrics
+
+
+def compare(metrics: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """
+    Metrics that fell more than `threshold` (a fraction) below the baseline.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        if name not in metrics:
+            continue
+        if metrics[name] < expected * (1 - threshold):
+            change = metrics[name] / expected - 1
+            regressions.append(f"{name}: {metrics[name]:,.0f} vs baseline {expected:,.0f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed drop, e.g. 0.2 for 20%%")
+    parser.add_argument("--save-baseline", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per round")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--models", nargs="*", default=sorted(glob.glob("models/*.zip") + glob.glob("models/*.onnx")))
+    args = parser.parse_args()
+
+    metrics = run_suite(args.min_time, args.repeats, args.models)
+    results = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "metrics": metrics,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        return
+    regressions = compare(metrics, baseline, args.threshold)
+    if regressions:
+        print("Regressions:")
+        for line in regressions:
+            print(f"\t{line}")
+        sys.exit(1)
+    print(f"No metric regressed more than {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Wall-clock per training timestep: wrapper stack against BriscolaTrainingEnv.
+
+Measures raw env steps/sec with random legal actions, then timesteps/sec of
+rollout collection (policy forward included, gradient updates excluded)
+during a short MaskablePPO.learn run on each env.
+
+    python -m benchmarks.training_env_bench --players 4 --steps 20000
+"""
+import argparse
+import time
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.wrappers import ActionMasker
+from stable_baselines3.common.callbacks import BaseCallback
+
+from lib.action_mask_wrapper import SB3ActionMaskWrapper
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.training_env import BriscolaTrainingEnv
+
+
+def make_wrapper_stack(players: int):
+    env = SB3ActionMaskWrapper(BriscolaEnv(num_players=players))
+    # The wrapper only sets its spaces on reset
+    env.reset(seed=0)
+    return ActionMasker(env, lambda env: env.action_mask())
+
+
+def env_steps_per_sec(env, steps: int) -> float:
+    draws = np.random.default_rng(0).random((steps, 40)) + 1
+    env.reset(seed=0)
+    start = time.perf_counter()
+    for step in range(steps):
+        action = int((draws[step] * env.action_masks()).argmax())
+        _, _, terminated, _, _ = env.step(action)
+        if terminated:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+class RolloutTimer(BaseCallback):
+    def __init__(self):
+        super().__init__()
+        self.elapsed = 0.0
+
+    def _on_rollout_start(self) -> None:
+        self.start = time.perf_counter()
+
+    def _on_rollout_end(self) -> None:
+        self.elapsed += time.perf_counter() - self.start
+
+    def _on_step(self) -> bool:
+        return True
+
+
+def rollout_steps_per_sec(env, steps: int) -> float:
+    model = MaskablePPO("MlpPolicy", env, n_steps=160, batch_size=40, seed=0, device="cpu")
+    timer = RolloutTimer()
+    model.learn(total_timesteps=steps, callback=timer)
+    return model.num_timesteps / timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--steps", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, bench in [("env steps", env_steps_per_sec), ("rollout timesteps", rollout_steps_per_sec)]:
+        steps = args.steps if bench is env_steps_per_sec else args.steps // 4
+        wrapped = bench(make_wrapper_stack(args.players), steps)
+        lean = bench(BriscolaTrainingEnv(num_players=args.players), steps)
+        print(f"{name + '/sec':<22}wrappers {wrapped:10,.0f}  lean {lean:10,.0f}  ({lean / wrapped:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
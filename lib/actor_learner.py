@@ -0,0 +1,418 @@
+"""
+Asynchronous actor/learner training for MaskablePPO.
+
+Actor processes each step their own BriscolaVecEnv with a copy of the
+policy and write whole rollout segments (observations, action masks,
+actions, rewards, values and log-probabilities) into a ring of slots in
+shared memory. The learner takes one segment per actor for each update,
+so actors keep playing while it trains, and publishes its weights to a
+shared parameter vector that actors pick up before every segment.
+
+Policy lag is the number of updates between the weights a segment was
+played with and the weights it trains. It is bounded by the ring depth
+and by `max_policy_lag`: older segments are dropped. Lag and drops are
+logged under async/.
+
+    env = ActorPool(num_actors=4, envs_per_actor=16, num_players=4)
+    model = AsyncMaskablePPO("MlpPolicy", env, n_steps=160)
+    model.learn(1_000_000)
+    env.close()
+"""
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.buffers import MaskableRolloutBuffer
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.utils import obs_as_tensor
+from stable_baselines3.common.vec_env import VecEnv
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from lib.briscola.core import NUM_CARDS
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.shared_arrays import SharedArrays
+
+# Seconds between liveness checks while waiting on a semaphore
+POLL = 0.1
+
+
+def segment_layout(slots: int, n_steps: int, num_envs: int) -> Dict[str, Tuple[Any, tuple]]:
+    """
+    Ring of `slots` rollout segments of `n_steps` steps in `num_envs` envs.
+    """
+    episodes = num_envs * (n_steps // NUM_CARDS + 1)
+    steps = (slots, n_steps, num_envs)
+    return {
+        "observations": (np.uint8, steps + EMBEDDING_SHAPE),
+        "action_masks": (np.bool_, steps + (NUM_CARDS,)),
+        "actions": (np.int8, steps),
+        "rewards": (np.float32, steps),
+        "episode_starts": (np.float32, steps),
+        "values": (np.float32, steps),
+        "log_probs": (np.float32, steps),
+        # Observation and done after the last step, to bootstrap from
+        "last_observations": (np.uint8, (slots, num_envs) + EMBEDDING_SHAPE),
+        "last_dones": (np.float32, (slots, num_envs)),
+        # Policy version the segment was played with
+        "versions": (np.int64, (slots,)),
+        # Return and length of the episodes finished during the segment
+        "episodes": (np.int64, (slots,)),
+        "episode_returns": (np.float32, (slots, episodes)),
+        "episode_lengths": (np.int32, (slots, episodes)),
+    }
+
+
+def _run_actor(
+    index: int,
+    policy_path: str,
+    weights_name: str,
+    num_params: int,
+    version,
+    segments_name: str,
+    layout: Dict,
+    free,
+    filled,
+    stop,
+    num_envs: int,
+    num_players: int,
+    n_steps: int,
+    seed: Optional[int],
+):
+    from lib.inference.policy import TorchPolicy
+
+    th.set_num_threads(1)
+    if seed is not None:
+        th.manual_seed(seed + index)
+    policy = TorchPolicy(policy_path).policy
+    weights = SharedArrays({"params": (np.float32, (num_params,))}, weights_name)
+    ring = SharedArrays(layout, segments_name)
+    slots = len(ring["versions"])
+
+    env = BriscolaVecEnv(num_envs, num_players=num_players)
+    env.seed(None if seed is None else seed + index)
+    obs = env.reset()
+    episode_starts = np.ones(num_envs, dtype=np.float32)
+    returns = np.zeros(num_envs, dtype=np.float32)
+    lengths = np.zeros(num_envs, dtype=np.int32)
+    local_version = -1
+    slot = 0
+    try:
+        while not stop.is_set():
+            if not free.acquire(timeout=POLL):
+                continue
+            with version.get_lock():
+                if version.value != local_version:
+                    local_version = version.value
+                    vector_to_parameters(th.from_numpy(weights["params"].copy()), policy.parameters())
+
+            episodes = 0
+            for step in range(n_steps):
+                masks = env.action_masks()
+                with th.no_grad():
+                    actions, values, log_probs = policy(obs_as_tensor(obs, policy.device), action_masks=masks)
+                actions = actions.cpu().numpy()
+                ring["observations"][slot, step] = obs
+                ring["action_masks"][slot, step] = masks
+                ring["actions"][slot, step] = actions
+                ring["episode_starts"][slot, step] = episode_starts
+                ring["values"][slot, step] = values.flatten().cpu().numpy()
+                ring["log_probs"][slot, step] = log_probs.cpu().numpy()
+
+                obs, rewards, dones, _ = env.step(actions)
+                ring["rewards"][slot, step] = rewards
+                episode_starts = dones.astype(np.float32)
+                returns += rewards
+                lengths += 1
+                for i in np.flatnonzero(dones):
+                    ring["episode_returns"][slot, episodes] = returns[i]
+                    ring["episode_lengths"][slot, episodes] = lengths[i]
+                    episodes += 1
+                returns[dones] = 0
+                lengths[dones] = 0
+
+            ring["last_observations"][slot] = obs
+            ring["last_dones"][slot] = episode_starts
+            ring["episodes"][slot] = episodes
+            ring["versions"][slot] = local_version
+            filled.release()
+            slot = (slot + 1) % slots
+    finally:
+        ring.close()
+        weights.close()
+
+
+class ActorPool(VecEnv):
+    """
+    `num_actors` processes of `envs_per_actor` self-play games each, seen
+    by the learner as one VecEnv of num_actors * envs_per_actor envs. Only
+    AsyncMaskablePPO can train on it: the envs are stepped by the actors,
+    not through `step`.
+
+    Each actor has `slots` segments of ring buffer, so it can run that many
+    segments ahead of the learner before it waits.
+    """
+
+    metadata = {"name": "briscola", "render_modes": []}
+
+    def __init__(
+        self,
+        num_actors: int,
+        envs_per_actor: int,
+        num_players: int = 4,
+        slots: int = 2,
+        max_policy_lag: int = 2,
+        seed: Optional[int] = None,
+    ):
+        if num_actors < 1 or envs_per_actor < 1:
+            raise ValueError("need at least one actor and one env per actor")
+        if slots < 1:
+            raise ValueError(f"Invalid slots: {slots}")
+        if max_policy_lag < 0:
+            raise ValueError(f"Invalid max_policy_lag: {max_policy_lag}")
+        self.num_actors = num_actors
+        self.envs_per_actor = envs_per_actor
+        self.num_players = num_players
+        self.slots = slots
+        self.max_policy_lag = max_policy_lag
+        self.seed_value = seed
+        self.render_mode = None
+
+        self.version = 0
+        self.dropped = 0
+        # Lag of every segment trained on
+        self.lags: List[int] = []
+        self.processes: List[mp.Process] = []
+        self.rings: List[SharedArrays] = []
+        self.weights: Optional[SharedArrays] = None
+        self._read_slots: List[int] = []
+        self._directory: Optional[tempfile.TemporaryDirectory] = None
+
+        super().__init__(
+            num_actors * envs_per_actor,
+            spaces.Box(low=0, high=255, shape=EMBEDDING_SHAPE, dtype=np.uint8),
+            spaces.Discrete(NUM_CARDS),
+        )
+
+    @property
+    def started(self) -> bool:
+        return bool(self.processes)
+
+    def start(self, policy, n_steps: int):
+        """
+        Start the actors with `policy`'s architecture and weights, playing
+        segments of `n_steps` steps.
+        """
+        if self.started:
+            raise Exception("actors already started")
+        self.n_steps = n_steps
+        self._directory = tempfile.TemporaryDirectory()
+        policy_path = os.path.join(self._directory.name, "policy.pt")
+        policy.save(policy_path)
+
+        params = parameters_to_vector(policy.parameters()).detach().cpu().numpy()
+        self.weights = SharedArrays({"params": (np.float32, params.shape)})
+        self.weights["params"][:] = params
+
+        # Spawned, not forked: forking a process that has run torch can deadlock
+        context = mp.get_context("spawn")
+        self._shared_version = context.Value("q", self.version)
+        self._stop = context.Event()
+        self._free = [context.Semaphore(self.slots) for _ in range(self.num_actors)]
+        self._filled = [context.Semaphore(0) for _ in range(self.num_actors)]
+        layout = segment_layout(self.slots, n_steps, self.envs_per_actor)
+        for index in range(self.num_actors):
+            ring = SharedArrays(layout)
+            self.rings.append(ring)
+            self._read_slots.append(0)
+            process = context.Process(
+                target=_run_actor,
+                name=f"actor-{index}",
+                args=(
+                    index,
+                    policy_path,
+                    self.weights.name,
+                    len(params),
+                    self._shared_version,
+                    ring.name,
+                    layout,
+                    self._free[index],
+                    self._filled[index],
+                    self._stop,
+                    self.envs_per_actor,
+                    self.num_players,
+                    n_steps,
+                    self.seed_value,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+    def publish(self, policy):
+        """
+        Make `policy`'s weights the next version actors play with.
+        """
+        params = parameters_to_vector(policy.parameters()).detach().cpu().numpy()
+        with self._shared_version.get_lock():
+            self.weights["params"][:] = params
+            self.version += 1
+            self._shared_version.value = self.version
+
+    def _wait(self, index: int):
+        while not self._filled[index].acquire(timeout=POLL):
+            if not self.processes[index].is_alive():
+                raise Exception(f"actor {index} exited with code {self.processes[index].exitcode}")
+
+    def collect(self, rollout_buffer: MaskableRolloutBuffer) -> Dict[str, Any]:
+        """
+        Fill `rollout_buffer` with one segment from each actor, actor i's
+        envs as columns i * envs_per_actor onward, dropping segments older
+        than `max_policy_lag` versions. Returns the last observations and
+        dones, the segments' lags, the episodes they finished and the
+        seconds spent waiting on actors.
+        """
+        n = self.envs_per_actor
+        last_observations = np.zeros((self.num_envs,) + EMBEDDING_SHAPE, dtype=np.uint8)
+        last_dones = np.zeros(self.num_envs, dtype=np.float32)
+        lags = []
+        episodes = []
+        waited = 0.0
+        for index, ring in enumerate(self.rings):
+            while True:
+                start = time.perf_counter()
+                self._wait(index)
+                waited += time.perf_counter() - start
+                slot = self._read_slots[index]
+                self._read_slots[index] = (slot + 1) % self.slots
+                lag = self.version - int(ring["versions"][slot])
+                if lag <= self.max_policy_lag:
+                    break
+                self.dropped += 1
+                self._free[index].release()
+
+            columns = slice(index * n, (index + 1) * n)
+            rollout_buffer.observations[:, columns] = ring["observations"][slot]
+            rollout_buffer.action_masks[:, columns] = ring["action_masks"][slot]
+            rollout_buffer.actions[:, columns, 0] = ring["actions"][slot]
+            rollout_buffer.rewards[:, columns] = ring["rewards"][slot]
+            rollout_buffer.episode_starts[:, columns] = ring["episode_starts"][slot]
+            rollout_buffer.values[:, columns] = ring["values"][slot]
+            rollout_buffer.log_probs[:, columns] = ring["log_probs"][slot]
+            last_observations[columns] = ring["last_observations"][slot]
+            last_dones[columns] = ring["last_dones"][slot]
+            finished = int(ring["episodes"][slot])
+            episodes += [
+                {"r": float(r), "l": int(l)}
+                for r, l in zip(ring["episode_returns"][slot, :finished], ring["episode_lengths"][slot, :finished])
+            ]
+            lags.append(lag)
+            self.lags.append(lag)
+            self._free[index].release()
+
+        rollout_buffer.pos = rollout_buffer.buffer_size
+        rollout_buffer.full = True
+        return {
+            "last_observations": last_observations,
+            "last_dones": last_dones,
+            "lags": lags,
+            "episodes": episodes,
+            "waited": waited,
+        }
+
+    def reset(self) -> np.ndarray:
+        return np.zeros((self.num_envs,) + EMBEDDING_SHAPE, dtype=np.uint8)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        raise NotImplementedError("ActorPool envs are stepped by its actors, train with AsyncMaskablePPO")
+
+    def step_wait(self):
+        raise NotImplementedError("ActorPool envs are stepped by its actors, train with AsyncMaskablePPO")
+
+    def close(self) -> None:
+        if self.started:
+            self._stop.set()
+            for process in self.processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            self.processes = []
+        for ring in self.rings:
+            ring.close()
+            ring.unlink()
+        self.rings = []
+        if self.weights is not None:
+            self.weights.close()
+            self.weights.unlink()
+            self.weights = None
+        if self._directory is not None:
+            self._directory.cleanup()
+            self._directory = None
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        raise NotImplementedError("ActorPool envs live in the actor processes")
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False] * len(self._get_indices(indices))
+
+
+class AsyncMaskablePPO(MaskablePPO):
+    """
+    MaskablePPO that trains on segments from an ActorPool instead of
+    stepping its env. Each rollout publishes the current weights and fills
+    the usual MaskableRolloutBuffer with `n_steps` steps of every actor's
+    envs, so `train` runs unchanged.
+    """
+
+    def collect_rollouts(
+        self,
+        env: VecEnv,
+        callback: BaseCallback,
+        rollout_buffer: MaskableRolloutBuffer,
+        n_rollout_steps: int,
+        use_masking: bool = True,
+    ) -> bool:
+        if not isinstance(env, ActorPool):
+            raise ValueError("AsyncMaskablePPO trains on an ActorPool")
+        if not use_masking:
+            raise ValueError("actors always play with action masks")
+        if env.started:
+            env.publish(self.policy)
+        else:
+            env.start(self.policy, n_rollout_steps)
+        self.policy.set_training_mode(False)
+        rollout_buffer.reset()
+        callback.on_rollout_start()
+
+        collected = env.collect(rollout_buffer)
+        self.num_timesteps += n_rollout_steps * env.num_envs
+        self.ep_info_buffer.extend(collected["episodes"])
+        callback.update_locals(locals())
+        if not callback.on_step():
+            return False
+
+        lags = collected["lags"]
+        self.logger.record("async/policy_lag_mean", float(np.mean(lags)))
+        self.logger.record("async/policy_lag_max", max(lags))
+        self.logger.record("async/dropped_segments", env.dropped)
+        self.logger.record("async/learner_wait_seconds", collected["waited"])
+
+        with th.no_grad():
+            values = self.policy.predict_values(obs_as_tensor(collected["last_observations"], self.device))
+        rollout_buffer.compute_returns_and_advantage(last_values=values, dones=collected["last_dones"])
+
+        callback.on_rollout_end()
+        return True
@@ -0,0 +1,154 @@
+"""
+Rule-based Briscola players that act on whole batches at once.
+
+Agents read only what a seat sees, the BriscolaEnv observation and action
+mask, so they can play at any seat of BriscolaVecEnv, LeagueVecEnv or a
+tournament. Every decision is a handful of (N, 40) array operations over
+the batch; nothing is built per game.
+"""
+from typing import Dict, Type
+
+import numpy as np
+
+from lib.briscola.core import CARD_STRENGTH, NUM_CARDS, NUM_SUITS
+from lib.briscola.vec_game import SCORE_OF, SUIT_OF, TRICK_KEY
+from lib.inference.policy import Policy
+
+# Observation layout, see lib.briscola_env.embedding
+TRICK = slice(40, 43)
+TRICK_SUIT = 43
+TRICK_LEN = 44
+BRISCOLA_SUIT = 46
+UNSEEN = slice(47, 87)
+
+STRENGTH_OF = np.array(CARD_STRENGTH, dtype=np.int16)
+# IS_TRUMP[trump, card]
+IS_TRUMP = SUIT_OF[None, :] == np.arange(NUM_SUITS)[:, None]
+# Cost of a card no rule may pick
+NEVER = np.iinfo(np.int16).max
+
+
+def cheapest(costs: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+    """
+    Per row, the allowed card with the lowest cost.
+    """
+    return np.where(allowed, costs, NEVER).argmin(axis=1)
+
+
+def read_tricks(observations: np.ndarray):
+    """
+    Trump suit, the (N, 40) trick key of every card, the key and trick
+    position of the card winning so far (-1 when leading), the trick
+    length and the points already in the trick, per row.
+    """
+    trick_len = observations[:, TRICK_LEN].astype(np.intp)
+    trump = observations[:, BRISCOLA_SUIT].astype(np.intp) - 1
+    # A leader's card sets the lead suit, so its key is never compared
+    lead = np.maximum(observations[:, TRICK_SUIT].astype(np.intp) - 1, 0)
+    keys = TRICK_KEY[trump, lead]
+
+    trick = observations[:, TRICK].astype(np.intp)
+    played = np.arange(trick.shape[1]) < trick_len[:, None]
+    played_keys = np.where(played, np.take_along_axis(keys, trick, axis=1), -1)
+    best = played_keys.max(axis=1)
+    best_position = played_keys.argmax(axis=1)
+    points = (SCORE_OF[trick] * played).sum(axis=1)
+    return trump, keys, best, best_position, trick_len, points
+
+
+class Agent(Policy):
+    """
+    Maps a (N, obs) batch of observations and (N, 40) action masks to N
+    card ids with `act`. `predict` wraps it in the Policy interface, so
+    an agent can stand in for a model anywhere one is expected.
+    """
+
+    def act(self, observations: np.ndarray, action_masks: np.ndarray) -> np.ndarray:
+        raise NotImplementedError()
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        observation = np.asarray(observation)
+        single = observation.ndim == 1
+        actions = self.act(
+            observation.reshape(-1, observation.shape[-1]),
+            np.asarray(action_masks).reshape(-1, NUM_CARDS),
+        )
+        return (actions[0] if single else actions), None
+
+
+class GreedyAgent(Agent):
+    """
+    Wins the trick with its cheapest winning card when it can, otherwise
+    dumps its least valuable card. Trumps are only spent on tricks already
+    holding `trump_threshold` points, and count as `trump_cost` when
+    choosing what to throw away.
+    """
+
+    def __init__(self, trump_threshold: int = 10, trump_cost: int = 25):
+        self.trump_threshold = trump_threshold
+        # dump_cost[trump, card]: points given away first, then strength
+        self.dump_cost = (SCORE_OF * 10 + STRENGTH_OF + IS_TRUMP * trump_cost).astype(np.int16)
+        # win_cost[trump, card]: weakest winner first, trumps last
+        self.win_cost = (STRENGTH_OF + IS_TRUMP * 100).astype(np.int16)
+
+    def act(self, observations: np.ndarray, action_masks: np.ndarray) -> np.ndarray:
+        trump, keys, best, _, trick_len, points = read_tricks(observations)
+        legal = action_masks > 0
+        return self._greedy(trump, keys, best, trick_len, points, legal)[0]
+
+    def _greedy(self, trump, keys, best, trick_len, points, legal):
+        """
+        Greedy choice and the card to dump, per row.
+        """
+        winners = legal & (keys > best[:, None]) & (trick_len > 0)[:, None]
+        winners &= ~IS_TRUMP[trump] | (points >= self.trump_threshold)[:, None]
+        win = cheapest(self.win_cost[trump], winners)
+        dump = cheapest(self.dump_cost[trump], legal)
+        return np.where(winners.any(axis=1), win, dump), dump
+
+
+class TrumpHoarderAgent(GreedyAgent):
+    """
+    GreedyAgent that hoards its trumps: it still trumps tricks worth
+    `trump_threshold` points, but never throws a trump away while its hand
+    holds anything else.
+    """
+
+    def __init__(self, trump_threshold: int = 10):
+        super().__init__(trump_threshold=trump_threshold, trump_cost=1000)
+
+
+class PartnerAgent(GreedyAgent):
+    """
+    GreedyAgent for 4 players that never overtakes its partner. When the
+    partner's card is winning and safe, because this seat plays last or
+    the card is a trump above every trump an opponent could hold, it loads
+    its highest scoring non-trump onto the trick; when the partner's card
+    is winning but could still be beaten it dumps instead. With 2 players it plays exactly like GreedyAgent.
+    """
+
+    def __init__(self, trump_threshold: int = 10, trump_cost: int = 25):
+        super().__init__(trump_threshold, trump_cost)
+        # load_cost[trump, card]: most points first, never a trump if avoidable
+        self.load_cost = (-SCORE_OF * 10 + STRENGTH_OF + IS_TRUMP * 1000).astype(np.int16)
+
+    def act(self, observations: np.ndarray, action_masks: np.ndarray) -> np.ndarray:
+        trump, keys, best, best_position, trick_len, points = read_tricks(observations)
+        legal = action_masks > 0
+        greedy, dump = self._greedy(trump, keys, best, trick_len, points, legal)
+
+        # The partner played two cards before this seat
+        partner_winning = (trick_len >= 2) & (best_position == trick_len - 2)
+        # Cards this seat can't see, any of which the last opponent may hold
+        hidden = (observations[:, UNSEEN] > 0) & (observations[:, :NUM_CARDS] == 0)
+        top_hidden_trump = np.where(hidden & IS_TRUMP[trump], keys, -1).max(axis=1)
+        safe = (trick_len == 3) | ((best >= 100) & (best >= top_hidden_trump))
+        load = cheapest(self.load_cost[trump], legal)
+        return np.where(partner_winning, np.where(safe, load, dump), greedy)
+
+
+AGENTS: Dict[str, Type[Agent]] = {
+    "greedy": GreedyAgent,
+    "hoarder": TrumpHoarderAgent,
+    "partner": PartnerAgent,
+}
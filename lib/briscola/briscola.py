@@ -1,6 +1,8 @@
 import numpy as np
 from typing import List
 
+from lib.briscola.core import CARD_SCORE, CARD_STRENGTH, cards_bits
+
 
 class BriscolaCard:
     """
@@ -17,6 +19,7 @@ class BriscolaCard:
             raise ValueError(f"Invalid rank: {rank}")
         self.suit = suit
         self.rank = rank
+        self.id = self.SUITS.index(suit) * 10 + (rank - 1)
 
     def __repr__(self):
         return f"Card({self.suit}, {self.rank})"
@@ -25,21 +28,26 @@ class BriscolaCard:
         """
         Returns the point value of a card.
         """
-        return {1: 11, 3: 10, 10: 4, 9: 3, 8: 2}.get(self.rank, 0)
+        return CARD_SCORE[self.id]
 
     def strength(self) -> int:
         """
         Returns the strength of a card, used to determine a trick winner.
         """
-        score_value = self.score()
-        return score_value + 20 if score_value > 0 else self.rank
+        return CARD_STRENGTH[self.id]
 
     def __str__(self):
         rank_names = {1: "ace", 8: "jack", 9: "knight", 10: "king"}
         return f"({rank_names.get(self.rank, self.rank)}, {self.suit})"
 
     def __eq__(self, val):
-        return self.suit == val.suit and self.rank == val.rank
+        return self.id == val.id
+
+
+# One shared instance per card id, used when converting from the int core
+CARDS = tuple(
+    BriscolaCard(suit, rank) for suit in BriscolaCard.SUITS for rank in BriscolaCard.RANKS
+)
 
 
 class BriscolaDeck:
@@ -80,6 +88,13 @@ class BriscolaDeck:
         self.cards = self.cards[n:]
         return taken
 
+    @property
+    def bits(self) -> int:
+        """
+        The cards of the deck as a bitboard, bit c for card id c.
+        """
+        return cards_bits(card.id for card in self.cards)
+
     def __repr__(self):
         return f"Deck({self.cards})"
 
@@ -93,6 +108,13 @@ class BriscolaPlayer:
         self.hand = []
         self.pile = []
 
+    @property
+    def hand_bits(self) -> int:
+        """
+        The player's hand as a bitboard, bit c for card id c.
+        """
+        return cards_bits(card.id for card in self.hand)
+
     def score(self) -> int:
         """
         Calculate the player's score based on their pile.
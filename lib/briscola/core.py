@@ -0,0 +1,378 @@
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NUM_CARDS = 40
+NUM_SUITS = 4
+HAND_SIZE = 3
+NO_CARD = -1
+
+RANK_SCORES = {1: 11, 3: 10, 10: 4, 9: 3, 8: 2}
+
+# Card ids follow the embedding scheme: suit_index * 10 + (rank - 1)
+CARD_SUIT = tuple(i // 10 for i in range(NUM_CARDS))
+CARD_RANK = tuple(i % 10 + 1 for i in range(NUM_CARDS))
+CARD_SCORE = tuple(RANK_SCORES.get(rank, 0) for rank in CARD_RANK)
+CARD_STRENGTH = tuple(
+    score + 20 if score > 0 else rank for score, rank in zip(CARD_SCORE, CARD_RANK)
+)
+
+
+def _trick_key(trump: int, lead: int, card: int) -> int:
+    # Trumps beat the lead suit, which beats every other suit
+    if CARD_SUIT[card] == trump:
+        return CARD_STRENGTH[card] + 100
+    if CARD_SUIT[card] == lead:
+        return CARD_STRENGTH[card] + 50
+    return 0
+
+
+# CARD_KEY[trump][lead][card]: the card with the highest key takes the trick
+CARD_KEY = tuple(
+    tuple(tuple(_trick_key(trump, lead, card) for card in range(NUM_CARDS)) for lead in range(NUM_SUITS))
+    for trump in range(NUM_SUITS)
+)
+# CARD_BEATS[trump][lead][card][winner]: whether `card` takes the trick from
+# the card winning it so far. Off-suit cards never beat each other.
+CARD_BEATS = tuple(
+    tuple(tuple(tuple(k > w for w in keys) for k in keys) for keys in by_lead) for by_lead in CARD_KEY
+)
+
+
+def winning_index(trick: Sequence[int], trump: int) -> int:
+    """
+    Position in `trick` of the card that takes it, with `trump` as a suit index.
+    """
+    beats = CARD_BEATS[trump][CARD_SUIT[trick[0]]]
+    index = 0
+    winner = trick[0]
+    for i in range(1, len(trick)):
+        card = trick[i]
+        if beats[card][winner]:
+            index = i
+            winner = card
+    return index
+
+
+def cards_bits(cards) -> int:
+    """
+    Bitboard of card ids: bit c is set when card c is in `cards`.
+    """
+    bits = 0
+    for card in cards:
+        bits |= 1 << card
+    return bits
+
+
+def bits_cards(bits: int) -> List[int]:
+    """
+    Card ids of a bitboard, lowest first.
+    """
+    cards = []
+    while bits:
+        low = bits & -bits
+        cards.append(low.bit_length() - 1)
+        bits ^= low
+    return cards
+
+
+def bits_mask(bits: int, size: int = NUM_CARDS) -> np.ndarray:
+    """
+    (size,) uint8 array holding bit i of `bits` at index i.
+    """
+    packed = np.frombuffer(bits.to_bytes(-(-size // 8), "little"), dtype=np.uint8)
+    return np.unpackbits(packed, count=size, bitorder="little")
+
+
+def shuffled_deck(seed=None) -> np.ndarray:
+    """
+    Card ids in dealing order, shuffled exactly like BriscolaDeck.shuffle.
+    """
+    deck = np.arange(NUM_CARDS, dtype=np.int8)
+    if seed is not None:
+        np.random.default_rng(seed).shuffle(deck)
+    else:
+        np.random.shuffle(deck)
+    return deck
+
+
+class BriscolaState:
+    """
+    Compact game state where every card is an int in [0, 40).
+
+    The deck is a fixed buffer read from `deck_pos` onwards, hands and the
+    trick are fixed-size buffers padded with NO_CARD, and piles are bitmasks
+    of the cards each player has won. Alongside the buffers, `hand_bits`
+    and `deck_bits` hold every hand and the undealt cards as bitboards (bit
+    c for card c), so membership is one bit test and card sets combine with |.
+    Code writing `hands` or `deck` directly calls `sync_bits` after.
+    """
+
+    __slots__ = (
+        "num_players",
+        "deck",
+        "deck_pos",
+        "briscola",
+        "hands",
+        "hand_len",
+        "hand_bits",
+        "deck_bits",
+        "trick",
+        "trick_len",
+        "piles",
+        "scores",
+        "action_on",
+    )
+
+    def __init__(self, num_players: int, deck: Sequence[int], goes_first: int = 0):
+        if num_players not in [2, 4]:
+            raise ValueError(f"Invalid number of players: {num_players}")
+        if goes_first < 0 or goes_first >= num_players:
+            raise ValueError(f"Invalid first player index: {goes_first}")
+        if len(deck) != NUM_CARDS:
+            raise ValueError(f"Invalid deck size: {len(deck)}")
+
+        self.num_players = num_players
+        self.deck = array("b", [int(c) for c in deck])
+        # The first card off the deck is turned up as the briscola
+        self.briscola = self.deck[0]
+        self.deck_pos = 1
+        self.deck_bits = cards_bits(self.deck[1:])
+        self.hands = array("b", [NO_CARD] * (num_players * HAND_SIZE))
+        self.hand_len = [0] * num_players
+        self.hand_bits = [0] * num_players
+        self.trick = array("b", [NO_CARD] * num_players)
+        self.trick_len = 0
+        self.piles = [0] * num_players
+        self.scores = [0] * num_players
+        self.action_on = goes_first
+        self.deal_cards(HAND_SIZE)
+
+    @classmethod
+    def new(cls, num_players: int = 4, goes_first: int = 0, seed=None) -> "BriscolaState":
+        return cls(num_players, shuffled_deck(seed), goes_first)
+
+    def clone(self) -> "BriscolaState":
+        state = BriscolaState.__new__(BriscolaState)
+        state.num_players = self.num_players
+        # Nothing writes to the deck once dealt, so clones share it
+        state.deck = self.deck
+        state.deck_pos = self.deck_pos
+        state.deck_bits = self.deck_bits
+        state.briscola = self.briscola
+        state.hands = self.hands[:]
+        state.hand_len = self.hand_len[:]
+        state.hand_bits = self.hand_bits[:]
+        state.trick = self.trick[:]
+        state.trick_len = self.trick_len
+        state.piles = self.piles[:]
+        state.scores = self.scores[:]
+        state.action_on = self.action_on
+        return state
+
+    def apply(self, card: int) -> Tuple[int, int, int, Optional[Tuple[int, ...]], int]:
+        """
+        Play `card`, then score the trick and redeal when due, like one env
+        step. Returns the record `undo` needs to take it back.
+        """
+        player = self.action_on
+        if self.trick_len == self.num_players or self.needs_redeal() or not self.hand_bits[player] >> card & 1:
+            raise Exception(f"card not playable: {card}")
+        base = player * HAND_SIZE
+        slot = self.hands[base : base + self.hand_len[player]].index(card)
+        deck_pos = self.deck_pos
+        self.play(card)
+
+        trick = None
+        if self.trick_len == self.num_players:
+            trick = tuple(self.trick)
+            self.score_trick()
+            if self.needs_redeal():
+                self.deal_cards(1)
+        return player, card, slot, trick, deck_pos
+
+    def undo(self, record: Tuple[int, int, int, Optional[Tuple[int, ...]], int]) -> None:
+        player, card, slot, trick, deck_pos = record
+        players = self.num_players
+        hands = self.hands
+        if self.deck_pos != deck_pos:
+            # Every redeal gives each seat exactly one card, last in its hand
+            self.deck_pos = deck_pos
+            for seat in range(players):
+                self.hand_len[seat] -= 1
+                last = seat * HAND_SIZE + self.hand_len[seat]
+                dealt = hands[last]
+                hands[last] = NO_CARD
+                self.hand_bits[seat] ^= 1 << dealt
+                if dealt != self.briscola:
+                    self.deck_bits |= 1 << dealt
+        if trick is not None:
+            winner = self.action_on
+            for played in trick:
+                self.piles[winner] ^= 1 << played
+                self.scores[winner] -= CARD_SCORE[played]
+            self.trick[:] = array("b", trick)
+            self.trick_len = players
+
+        self.trick_len -= 1
+        self.trick[self.trick_len] = NO_CARD
+        base = player * HAND_SIZE
+        n = self.hand_len[player]
+        hand = hands[base : base + n]
+        hand.insert(slot, card)
+        hands[base : base + n + 1] = hand
+        self.hand_len[player] = n + 1
+        self.hand_bits[player] |= 1 << card
+        self.action_on = player
+
+    def deck_size(self) -> int:
+        return NUM_CARDS - self.deck_pos
+
+    def deck_cards(self) -> List[int]:
+        return self.deck[self.deck_pos :].tolist()
+
+    def hand(self, player: int) -> List[int]:
+        base = player * HAND_SIZE
+        return self.hands[base : base + self.hand_len[player]].tolist()
+
+    def trick_cards(self) -> List[int]:
+        return self.trick[: self.trick_len].tolist()
+
+    def in_hand(self, player: int, card: int) -> bool:
+        return bool(self.hand_bits[player] >> card & 1)
+
+    def unseen_bits(self) -> int:
+        """
+        Cards still in the deck or in any hand, the briscola once dealt.
+        """
+        bits = self.deck_bits
+        for hand in self.hand_bits:
+            bits |= hand
+        return bits
+
+    def action_mask(self, player: int) -> np.ndarray:
+        return bits_mask(self.hand_bits[player]).view(np.int8)
+
+    def sync_bits(self) -> None:
+        """
+        Rebuild the bitboards from `hands` and `deck`.
+        """
+        self.deck_bits = cards_bits(self.deck[self.deck_pos :])
+        self.hand_bits = [cards_bits(self.hand(p)) for p in range(self.num_players)]
+
+    def remove_from_hand(self, player: int, card: int) -> bool:
+        if not self.hand_bits[player] >> card & 1:
+            return False
+        base = player * HAND_SIZE
+        n = self.hand_len[player]
+        hand = self.hands[base : base + n]
+        # Keep the remaining cards in dealing order, padded with NO_CARD
+        hand.remove(card)
+        hand.append(NO_CARD)
+        self.hands[base : base + n] = hand
+        self.hand_len[player] = n - 1
+        self.hand_bits[player] ^= 1 << card
+        return True
+
+    def play(self, card: int) -> None:
+        if self.trick_len == self.num_players:
+            raise Exception("trick over")
+        if self.needs_redeal() or not self.remove_from_hand(self.action_on, card):
+            raise Exception(f"card not playable: {card}")
+
+        self.trick[self.trick_len] = card
+        self.trick_len += 1
+        self.action_on = (self.action_on + 1) % self.num_players
+
+    def playable(self, card: Optional[int]) -> bool:
+        if self.should_score_trick():
+            return False
+        if self.needs_redeal():
+            return False
+        if card is None or not self.hand_bits[self.action_on] >> card & 1:
+            return False
+        return True
+
+    def score_trick(self) -> int:
+        if self.trick_len != self.num_players:
+            raise Exception("trick not over")
+
+        winning_player, _ = self.trick_winner()
+        self.take_trick(winning_player)
+        self.action_on = winning_player
+        return winning_player
+
+    def take_trick(self, player: int) -> None:
+        pile = self.piles[player]
+        points = 0
+        for card in self.trick[: self.trick_len]:
+            pile |= 1 << card
+            points += CARD_SCORE[card]
+        self.piles[player] = pile
+        self.scores[player] += points
+        trick = self.trick
+        for i in range(self.trick_len):
+            trick[i] = NO_CARD
+        self.trick_len = 0
+
+    def trick_winner(self) -> Tuple[int, int]:
+        if self.trick_len == 0:
+            raise Exception("no winning card")
+        index = winning_index(self.trick[: self.trick_len], CARD_SUIT[self.briscola])
+        # Action_on is the starting player, i.e. who played the first card in the trick
+        winning_player = (self.action_on + index) % self.num_players
+        return winning_player, self.trick[index]
+
+    def trick_order(self) -> List[int]:
+        return [(self.action_on + i) % self.num_players for i in range(self.num_players)]
+
+    def redeal(self) -> None:
+        if max(self.hand_len) < HAND_SIZE:
+            self.deal_cards(1)
+        else:
+            raise Exception("players have cards")
+
+    def deal_cards(self, n: int) -> None:
+        wanted = n * self.num_players
+        start = self.deck_pos
+        end = min(start + wanted, NUM_CARDS)
+        cards = self.deck[start:end].tolist()
+        self.deck_pos = end
+        if len(cards) < wanted:
+            cards.append(self.briscola)
+        hands = self.hands
+        hand_len = self.hand_len
+        hand_bits = self.hand_bits
+        players = self.num_players
+        dealt = 0
+        for i, card in enumerate(cards):
+            player = i % players
+            hands[player * HAND_SIZE + hand_len[player]] = card
+            hand_len[player] += 1
+            hand_bits[player] |= 1 << card
+            dealt |= 1 << card
+        self.deck_bits &= ~dealt
+
+    def needs_redeal(self) -> bool:
+        return (
+            self.trick_len == 0
+            and self.deck_pos < NUM_CARDS
+            and max(self.hand_len) < HAND_SIZE
+        )
+
+    def should_score_trick(self) -> bool:
+        return self.trick_len == self.num_players
+
+    def game_over(self) -> bool:
+        return self.deck_pos == NUM_CARDS and max(self.hand_len) == 0
+
+    def leaders(self) -> List[Tuple[int, int]]:
+        return sorted(((s, i) for i, s in enumerate(self.scores)), reverse=True)
+
+    def __repr__(self):
+        return (
+            f"BriscolaState(hands={[self.hand(p) for p in range(self.num_players)]}, "
+            f"trick={self.trick_cards()}, briscola={self.briscola}, "
+            f"deck={self.deck_size()}, scores={self.scores}, action_on={self.action_on})"
+        )
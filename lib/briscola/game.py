@@ -1,132 +1,182 @@
 from typing import List, Tuple, Optional
 
-from lib.briscola.briscola import BriscolaDeck, BriscolaCard, BriscolaPlayer
+from lib.briscola.briscola import CARDS, BriscolaDeck, BriscolaCard, BriscolaPlayer
+from lib.briscola.core import HAND_SIZE, BriscolaState
 
-HAND_SIZE = 3
+
+class _DeckView(BriscolaDeck):
+    """
+    Read-through view of the undealt cards of a BriscolaState.
+    """
+
+    def __init__(self, state: BriscolaState):
+        self.state = state
+
+    @property
+    def cards(self) -> List[BriscolaCard]:
+        state = self.state
+        return [CARDS[c] for c in state.deck[state.deck_pos :]]
+
+    @property
+    def bits(self) -> int:
+        return self.state.deck_bits
+
+    def shuffle(self, seed=None):
+        raise Exception("cannot shuffle a dealt deck")
+
+    def take(self, n: int) -> List[BriscolaCard]:
+        state = self.state
+        start = state.deck_pos
+        state.deck_pos = min(start + n, len(state.deck))
+        for card in state.deck[start : state.deck_pos]:
+            state.deck_bits &= ~(1 << card)
+        return [CARDS[c] for c in state.deck[start : state.deck_pos]]
+
+
+class _PlayerView(BriscolaPlayer):
+    """
+    Read-through view of one seat of a BriscolaState.
+    """
+
+    def __init__(self, state: BriscolaState, index: int):
+        self.state = state
+        self.index = index
+
+    @property
+    def hand(self) -> List[BriscolaCard]:
+        return [CARDS[c] for c in self.state.hand(self.index)]
+
+    @property
+    def hand_bits(self) -> int:
+        return self.state.hand_bits[self.index]
+
+    @property
+    def pile(self) -> List[BriscolaCard]:
+        bits = self.state.piles[self.index]
+        return [card for card in CARDS if bits >> card.id & 1]
+
+    def score(self) -> int:
+        return self.state.scores[self.index]
+
+    def remove_from_hand(self, card: BriscolaCard):
+        self.state.remove_from_hand(self.index, card.id)
+
+    def take_trick(self, cards: List[BriscolaCard]):
+        for card in cards:
+            self.state.piles[self.index] |= 1 << card.id
+            self.state.scores[self.index] += card.score()
+
+
+def deck_ids(deck) -> List[int]:
+    if isinstance(deck, BriscolaDeck):
+        deck = deck.cards
+    return [card.id if isinstance(card, BriscolaCard) else int(card) for card in deck]
 
 
 class BriscolaGame:
-    def __init__(self, players=4, goes_first=0, seed=None):
-        if players not in [2, 4]:
-            raise ValueError(f"Invalid number of players: {players}")
-        if goes_first < 0 or goes_first >= players:
-            raise ValueError(f"Invalid first player index: {goes_first}")
-
-        deck = BriscolaDeck()
-        deck.shuffle(seed)
-        briscola = deck.take(1)[0]
-
-        self.deck = deck
-        self.players = [BriscolaPlayer() for _ in range(players)]
-        self.briscola = briscola
-        self.trick = []
-        self.action_on = goes_first
-        self.deal_cards(HAND_SIZE)
+    """
+    Object API over BriscolaState. Cards are exposed as BriscolaCard, while
+    all game logic runs on the int core in `self.state`.
+    """
+
+    def __init__(self, players=4, goes_first=0, seed=None, deck=None):
+        """
+        Deals from `deck` when given, a shuffled BriscolaDeck or a sequence
+        of cards (BriscolaCard or id) in dealing order, instead of
+        shuffling with `seed`.
+        """
+        if deck is None:
+            self.state = BriscolaState.new(players, goes_first, seed)
+        else:
+            self.state = BriscolaState(players, deck_ids(deck), goes_first)
+        self._bind()
+
+    @classmethod
+    def from_state(cls, state: BriscolaState) -> "BriscolaGame":
+        game = cls.__new__(cls)
+        game.state = state
+        game._bind()
+        return game
+
+    def clone(self) -> "BriscolaGame":
+        return BriscolaGame.from_state(self.state.clone())
+
+    def _bind(self):
+        self.deck = _DeckView(self.state)
+        self.players = [_PlayerView(self.state, i) for i in range(self.state.num_players)]
+        self.briscola = CARDS[self.state.briscola]
+
+    @property
+    def action_on(self) -> int:
+        return self.state.action_on
+
+    @action_on.setter
+    def action_on(self, value: int):
+        self.state.action_on = value
+
+    @property
+    def trick(self) -> List[BriscolaCard]:
+        return [CARDS[c] for c in self.state.trick_cards()]
+
+    @trick.setter
+    def trick(self, cards: List[BriscolaCard]):
+        state = self.state
+        if len(cards) > state.num_players:
+            raise Exception("trick exceeded player count")
+        for i in range(state.num_players):
+            state.trick[i] = cards[i].id if i < len(cards) else -1
+        state.trick_len = len(cards)
 
     def play(self, card: BriscolaCard) -> None:
-        if len(self.trick) == len(self.players):
+        state = self.state
+        if state.should_score_trick():
             raise Exception("trick over")
 
         if isinstance(card, int):
-            card = self.players[self.action_on].hand[card]
-
-        if not self.playable(card):
-            raise Exception(f"card not playable: {card}")
-
-        self.players[self.action_on].remove_from_hand(card)
-        self.trick.append(card)
-        self.action_on = (self.action_on + 1) % len(self.players)
+            card = state.hand(state.action_on)[card]
+        else:
+            card = card.id
+        state.play(card)
 
     def playable(self, card: Optional[BriscolaCard]) -> bool:
-        if self.should_score_trick():
-            return False
-        if self.needs_redeal():
-            return False
-        if card is None or card not in self.players[self.action_on].hand:
+        if card is None:
             return False
-        return True
+        return self.state.playable(card.id)
 
     def score_trick(self) -> int:
-        if len(self.trick) != len(self.players):
-            raise Exception("trick not over")
-
-        winning_player, _ = self.trick_winner()
-        self.players[winning_player].take_trick(self.trick)
-        self.trick = []
-        self.action_on = winning_player
-
-        return winning_player
+        return self.state.score_trick()
 
     def trick_winner(self) -> Tuple[int, BriscolaCard]:
-        trump = self.trump_suit()
-        lead = self.lead_suit()
-
-        winning_card = None
-        for card in self.trick:
-            if not winning_card:
-                winning_card = card
-            elif card.suit == trump and winning_card.suit != trump:
-                winning_card = card
-            elif card.suit == lead and winning_card.suit not in [trump, lead]:
-                winning_card = card
-            elif (
-                card.suit == trump
-                and winning_card.suit == trump
-                and BriscolaCard.strength(card) > BriscolaCard.strength(winning_card)
-            ):
-                winning_card = card
-            elif (
-                card.suit == lead
-                and winning_card.suit == lead
-                and BriscolaCard.strength(card) > BriscolaCard.strength(winning_card)
-            ):
-                winning_card = card
-        if not winning_card:
-            raise Exception("no winning card")
-        # Action_on is the starting player, i.e. who played the first card in the trick
-        who_played = self.trick_order()
-        winning_player_index = who_played[self.trick.index(winning_card)]
-        return winning_player_index, winning_card
+        winning_player, winning_card = self.state.trick_winner()
+        return winning_player, CARDS[winning_card]
 
     def trick_order(self):
-        return [(self.action_on + i) % len(self.players) for i in range(len(self.players))]
+        return self.state.trick_order()
 
     def redeal(self):
-        if all(len(p.hand) < 3 for p in self.players):
-            self.deal_cards(1)
-        else:
-            raise Exception("players have cards")
+        self.state.redeal()
 
     def deal_cards(self, n):
-        cards = self.deck.take(n * len(self.players))
-        if len(cards) < n * len(self.players):
-            cards.append(self.briscola)
-        split_cards = [cards[i :: len(self.players)] for i in range(len(self.players))]
-        for i, player in enumerate(self.players):
-            player.hand.extend(split_cards[i])
+        self.state.deal_cards(n)
 
     def needs_redeal(self) -> bool:
-        return (
-            len(self.trick) == 0
-            and len(self.deck.cards) > 0
-            and all(len(p.hand) < HAND_SIZE for p in self.players)
-        )
+        return self.state.needs_redeal()
 
     def trump_suit(self) -> str:
         return self.briscola.suit
 
     def lead_suit(self) -> Optional[str]:
-        return self.trick[0].suit if self.trick else None
+        state = self.state
+        return CARDS[state.trick[0]].suit if state.trick_len else None
 
     def should_score_trick(self) -> bool:
-        return len(self.trick) == len(self.players)
+        return self.state.should_score_trick()
 
     def game_over(self) -> bool:
-        return len(self.deck.cards) == 0 and all(len(p.hand) == 0 for p in self.players)
+        return self.state.game_over()
 
     def leaders(self) -> List[tuple[int, int]]:
-        scores = [(p.score(), i) for i, p in enumerate(self.players)]
-        return sorted(scores, reverse=True)
+        return self.state.leaders()
 
     def __repr__(self):
         result = []
@@ -0,0 +1,51 @@
+"""
+Suit relabelling. The rules only tell suits apart as trump or not, so a
+position with its suits permuted, the trump suit mapped to the trump suit,
+plays out exactly the same. A permutation `perm` maps suit s to perm[s].
+"""
+from typing import List, Sequence, Tuple
+
+from lib.briscola.core import NUM_SUITS
+
+SUIT_BITS = (1 << 10) - 1
+
+
+def relabel_card(card: int, perm: Sequence[int]) -> int:
+    return perm[card // 10] * 10 + card % 10
+
+
+def relabel_bits(bits: int, perm: Sequence[int]) -> int:
+    """
+    A bitmask of card ids with every card relabelled.
+    """
+    result = 0
+    for suit in range(NUM_SUITS):
+        result |= (bits >> (10 * suit) & SUIT_BITS) << (10 * perm[suit])
+    return result
+
+
+def inverse(perm: Sequence[int]) -> Tuple[int, ...]:
+    result = [0] * len(perm)
+    for suit, new in enumerate(perm):
+        result[new] = suit
+    return tuple(result)
+
+
+def canonical_suits(trump: int, hands: List[int], trick: Sequence[int]) -> Tuple[int, ...]:
+    """
+    Permutation taking `trump` to suit 0 and the other suits to 1, 2 and 3
+    in a fixed order of their cards in `hands` (card bitmasks per seat)
+    and `trick`. Positions that only differ by which non-trump suit is
+    which get the same canonical labels; suits that tie hold identical
+    cards, so their order doesn't matter.
+    """
+    def suit_key(suit: int):
+        held = tuple(hand >> (10 * suit) & SUIT_BITS for hand in hands)
+        played = tuple(card % 10 + 1 if card // 10 == suit else 0 for card in trick)
+        return held + played
+
+    others = sorted((s for s in range(NUM_SUITS) if s != trump), key=suit_key, reverse=True)
+    perm = [0] * NUM_SUITS
+    for new, suit in enumerate(others, start=1):
+        perm[suit] = new
+    return tuple(perm)
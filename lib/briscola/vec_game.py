@@ -0,0 +1,198 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from lib.briscola.core import (
+    CARD_KEY,
+    CARD_SCORE,
+    CARD_SUIT,
+    HAND_SIZE,
+    NO_CARD,
+    NUM_CARDS,
+    BriscolaState,
+    shuffled_deck,
+)
+
+SUIT_OF = np.array(CARD_SUIT, dtype=np.int8)
+SCORE_OF = np.array(CARD_SCORE, dtype=np.int16)
+# TRICK_KEY[trump, lead, card]: the card with the highest key wins the trick
+TRICK_KEY = np.array(CARD_KEY, dtype=np.int16)
+
+
+class BriscolaVecGame:
+    """
+    N games of Briscola held as (N, ...) arrays and stepped together.
+
+    Follows the same rules and dealing order as BriscolaState, one card per
+    game per call to `play`.
+    """
+
+    def __init__(self, num_games: int, players: int = 4):
+        if players not in [2, 4]:
+            raise ValueError(f"Invalid number of players: {players}")
+        n = num_games
+        self.num_games = num_games
+        self.num_players = players
+        self.rows = np.arange(n)
+
+        self.deck = np.zeros((n, NUM_CARDS), dtype=np.int8)
+        self.deck_pos = np.full(n, NUM_CARDS, dtype=np.int16)
+        self.briscola = np.zeros(n, dtype=np.int8)
+        self.hands = np.full((n, players, HAND_SIZE), NO_CARD, dtype=np.int8)
+        self.hand_len = np.zeros((n, players), dtype=np.int8)
+        self.trick = np.full((n, players), NO_CARD, dtype=np.int8)
+        self.trick_len = np.zeros(n, dtype=np.int8)
+        self.piles = np.zeros((n, players, NUM_CARDS), dtype=bool)
+        self.scores = np.zeros((n, players), dtype=np.int16)
+        self.action_on = np.zeros(n, dtype=np.int8)
+
+    def reset(self, indices: np.ndarray, decks: np.ndarray, goes_first: np.ndarray):
+        """
+        Start new games at `indices` from decks in dealing order.
+        """
+        indices = np.asarray(indices)
+        self.deck[indices] = decks
+        self.briscola[indices] = self.deck[indices, 0]
+        self.deck_pos[indices] = 1
+        self.hands[indices] = NO_CARD
+        self.hand_len[indices] = 0
+        self.trick[indices] = NO_CARD
+        self.trick_len[indices] = 0
+        self.piles[indices] = False
+        self.scores[indices] = 0
+        self.action_on[indices] = goes_first
+
+        # Deal HAND_SIZE cards each, player i takes every P-th card starting at i
+        dealt = HAND_SIZE * self.num_players
+        cards = self.deck[indices, 1 : 1 + dealt].reshape(-1, HAND_SIZE, self.num_players)
+        self.hands[indices] = cards.transpose(0, 2, 1)
+        self.hand_len[indices] = HAND_SIZE
+        self.deck_pos[indices] = 1 + dealt
+
+    def load(self, indices: np.ndarray, state: BriscolaState):
+        """
+        Copy `state` into the games at `indices`.
+        """
+        indices = np.asarray(indices)
+        players = self.num_players
+        self.deck[indices] = np.frombuffer(state.deck, dtype=np.int8)
+        self.deck_pos[indices] = state.deck_pos
+        self.briscola[indices] = state.briscola
+        self.hands[indices] = np.frombuffer(state.hands, dtype=np.int8).reshape(players, HAND_SIZE)
+        self.hand_len[indices] = state.hand_len
+        self.trick[indices] = np.frombuffer(state.trick, dtype=np.int8)
+        self.trick_len[indices] = state.trick_len
+        cards = np.arange(NUM_CARDS)
+        self.piles[indices] = [(pile >> cards) & 1 for pile in state.piles]
+        self.scores[indices] = state.scores
+        self.action_on[indices] = state.action_on
+
+    def reset_seeded(self, indices: Sequence[int], seeds: Sequence[Optional[int]], goes_first):
+        decks = np.stack([shuffled_deck(seed) for seed in seeds])
+        self.reset(np.asarray(indices), decks, np.asarray(goes_first))
+
+    def action_masks(self) -> np.ndarray:
+        """
+        (N, 40) int8 mask of the cards the player to act holds.
+        """
+        return self.hand_masks(self.action_on)
+
+    def hand_masks(self, players: np.ndarray) -> np.ndarray:
+        masks = np.zeros((self.num_games, NUM_CARDS), dtype=np.int8)
+        hands = self.hands[self.rows, players]
+        rows, slots = np.nonzero(hands != NO_CARD)
+        masks[rows, hands[rows, slots]] = 1
+        return masks
+
+    def play(self, cards: np.ndarray, indices: Optional[np.ndarray] = None) -> None:
+        """
+        Play one card in every game, or only in the games at `indices`.
+        Raises if any card is not playable.
+        """
+        cards = np.asarray(cards, dtype=np.int8)
+        rows = self.rows if indices is None else np.asarray(indices)
+        seats = self.action_on[rows]
+        hands = self.hands[rows, seats]
+        held = hands == cards[:, None]
+        if (
+            not held.any(axis=1).all()
+            or (self.trick_len[rows] == self.num_players).any()
+            or self.needs_redeal()[rows].any()
+        ):
+            bad = rows[~held.any(axis=1)]
+            raise Exception(f"card not playable in games: {bad.tolist()}")
+
+        # Remove the card, keeping the rest of the hand in dealing order
+        order = np.argsort(held, axis=1, kind="stable")
+        hands = np.take_along_axis(hands, order, axis=1)
+        hands[:, -1] = NO_CARD
+        self.hands[rows, seats] = hands
+        self.hand_len[rows, seats] -= 1
+
+        self.trick[rows, self.trick_len[rows]] = cards
+        self.trick_len[rows] += 1
+        self.action_on[rows] = (seats + 1) % self.num_players
+
+    def should_score_trick(self) -> np.ndarray:
+        return self.trick_len == self.num_players
+
+    def trick_winner(self) -> np.ndarray:
+        """
+        Seat that wins the current trick of every game.
+        """
+        trump = SUIT_OF[self.briscola]
+        lead = SUIT_OF[self.trick[:, 0]]
+        keys = TRICK_KEY[trump[:, None], lead[:, None], self.trick]
+        keys[self.trick == NO_CARD] = -1
+        return (self.action_on + keys.argmax(axis=1)) % self.num_players
+
+    def score_tricks(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Score the tricks of games in `mask`, returning the winners of those games.
+        """
+        rows = np.flatnonzero(mask)
+        winners = self.trick_winner()[rows]
+        trick = self.trick[rows]
+        self.piles[rows[:, None], winners[:, None], trick] = True
+        self.scores[rows, winners] += SCORE_OF[trick].sum(axis=1)
+        self.trick[rows] = NO_CARD
+        self.trick_len[rows] = 0
+        self.action_on[rows] = winners
+        return winners
+
+    def needs_redeal(self) -> np.ndarray:
+        return (
+            (self.trick_len == 0)
+            & (self.deck_pos < NUM_CARDS)
+            & (self.hand_len.max(axis=1) < HAND_SIZE)
+        )
+
+    def redeal(self, mask: np.ndarray) -> None:
+        """
+        Deal one card to every player of the games in `mask`, turning up
+        the briscola once the deck runs out.
+        """
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return
+        positions = self.deck_pos[rows, None] + np.arange(self.num_players)
+        cards = np.where(
+            positions < NUM_CARDS,
+            self.deck[rows[:, None], np.minimum(positions, NUM_CARDS - 1)],
+            self.briscola[rows, None],
+        )
+        seats = np.arange(self.num_players)
+        self.hands[rows[:, None], seats, self.hand_len[rows]] = cards
+        self.hand_len[rows] += 1
+        self.deck_pos[rows] = np.minimum(self.deck_pos[rows] + self.num_players, NUM_CARDS)
+
+    def game_over(self) -> np.ndarray:
+        return (self.deck_pos == NUM_CARDS) & (self.hand_len.max(axis=1) == 0)
+
+    def leader(self) -> np.ndarray:
+        """
+        Winning seat of every game, ties going to the higher seat like
+        BriscolaGame.leaders.
+        """
+        seats = np.arange(self.num_players)
+        return (self.scores.astype(np.int32) * self.num_players + seats).argmax(axis=1)
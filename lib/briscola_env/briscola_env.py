@@ -3,12 +3,9 @@ from gymnasium import spaces
 
 from lib.briscola.briscola import BriscolaCard
 from lib.briscola.game import BriscolaGame
-from lib.briscola_env.embedding import (
-    EMBEDDING_SHAPE,
-    card_reverse_embedding,
-    full_cards_embedding,
-    game_embedding,
-)
+from lib.briscola_env.canonical import canonical_permutations, permute_masks, permute_observations, restore_actions
+from lib.briscola_env.embedding import EMBEDDING_SHAPE, card_reverse_embedding
+from lib.briscola_env.encoder import ObservationEncoder
 from pettingzoo import AECEnv
 
 
@@ -21,9 +18,16 @@ class BriscolaEnv(AECEnv):
 
     metadata = {"name": "briscola", "render_modes": ["ansi"], "is_parallelizable": True}
 
-    def __init__(self, num_players=4):
+    def __init__(self, num_players=4, recorder=None, canonical=False):
+        """
+        Finished games are written to `recorder`, a lib.records.RecordWriter,
+        when one is given. With `canonical`, observations, action masks and
+        actions use canonical suits (see lib.briscola_env.canonical).
+        """
         super().__init__()
         self.num_players = num_players
+        self.recorder = recorder
+        self.canonical = canonical
         self.possible_agents = [f"player_{i}" for i in range(self.num_players)]
         self.render_mode = "ansi"
         self.observation_spaces = {
@@ -42,15 +46,26 @@ class BriscolaEnv(AECEnv):
         self.action_spaces = {
             name: spaces.Discrete(40) for name in self.possible_agents
         }
+        self.encoder = ObservationEncoder(self.num_players)
 
     def reset(self, seed=None, options=None):
-        starting_player = np.random.default_rng(seed).choice(self.num_players)
+        """
+        `options` can override the deal: "deck" (see BriscolaGame) and
+        "goes_first". Both default to being derived from `seed`.
+        """
+        options = options or {}
+        starting_player = options.get("goes_first")
+        if starting_player is None:
+            starting_player = np.random.default_rng(seed).choice(self.num_players)
         self.game = BriscolaGame(
-            players=self.num_players, goes_first=starting_player, seed=seed
+            players=self.num_players,
+            goes_first=int(starting_player),
+            seed=seed,
+            deck=options.get("deck"),
         )
 
         self.agents = self.possible_agents[:][: self.num_players]
-        self.observations = {agent: self.observe(agent) for agent in self.agents}
+        self.encoder.reset(self.game.state)
         self.terminations = {agent: False for agent in self.agents}
         self.truncations = {agent: False for agent in self.agents}
         self.infos = {agent: {"tricks": 0, "wins": 0} for agent in self.agents}
@@ -58,6 +73,8 @@ class BriscolaEnv(AECEnv):
         self._cumulative_rewards = {name: 0 for name in self.agents}
 
         self.agent_selection = self.agents[starting_player]
+        self.goes_first = int(starting_player)
+        self.plays = []
 
     def set_game_result(self):
         placements = self.game.leaders()
@@ -84,33 +101,47 @@ class BriscolaEnv(AECEnv):
         if self.terminations[self.agent_selection]:
             return self._was_dead_step(action)
         self._cumulative_rewards[self.agent_selection] = 0
-        played_card = card_reverse_embedding(action)
+        player = self.game.action_on
+        if self.canonical:
+            perms = canonical_permutations(self.encoder.observe(player)[None])
+            action = restore_actions([action], perms)[0]
+        played_card = card_reverse_embedding(int(action))
         self.game.play(played_card)
+        self.plays.append(played_card.id)
+        self.encoder.on_play(player, played_card.id, self.game.state.trick_len - 1)
         if self.game.should_score_trick():
             who_played_what = list(zip(self.game.trick_order(), list(self.game.trick)))
             winner = self.game.score_trick()
+            self.encoder.on_trick_scored()
             self.set_trick_result(winner, who_played_what)
 
         if self.game.needs_redeal():
             self.game.redeal()
+            self.encoder.on_redeal(self.game.state)
 
         if self.game.game_over():
             self.set_game_result()
+            if self.recorder is not None:
+                state = self.game.state
+                self.recorder.write_game(state.deck, self.num_players, self.goes_first, self.plays, state.scores)
 
         self._accumulate_rewards()
-        self.observations = {agent: self.observe(agent) for agent in self.agents}
         self.agent_selection = self.agents[self.game.action_on]
 
+    @property
+    def observations(self):
+        # Built on demand, observe() only encodes the agent that is asked for
+        return {agent: self.observe(agent) for agent in self.agents}
+
     def observe(self, agent):
         agent_id = player_id(agent)
-        player_hand = np.array(
-            full_cards_embedding(self.game.players[agent_id].hand), dtype=np.int8
-        )
-
-        return {
-            "observation": game_embedding(self.game, agent_id),
-            "action_mask": player_hand,
-        }
+        observation = self.encoder.observe(agent_id).copy()
+        action_mask = self.encoder.action_mask(agent_id)
+        if self.canonical:
+            perms = canonical_permutations(observation[None])
+            observation = permute_observations(observation[None], perms)[0]
+            action_mask = permute_masks(action_mask[None], perms)[0]
+        return {"observation": observation, "action_mask": action_mask}
 
     def observation_space(self, agent):
         return self.observation_spaces[agent]
@@ -0,0 +1,128 @@
+"""
+Suit canonicalization of observations.
+
+Only trump versus non-trump matters to the rules, yet the embedding uses
+raw suit indices, so every suit permutation of a position is a different
+observation. `canonicalize` relabels the suits of a batch so the trump is
+always suit 0 and the other suits follow in a fixed order of what the seat
+sees of them: positions equal up to suits get one observation. Permutations
+are (N, 4) arrays, perms[n, s] the new label of suit s in row n; actions
+map with `permute_actions` and back with `restore_actions`.
+"""
+from typing import Optional
+
+import numpy as np
+
+from lib.briscola.core import NUM_CARDS, NUM_SUITS
+from lib.briscola.vec_game import SUIT_OF
+
+# Observation layout, see lib.briscola_env.embedding
+HAND = slice(0, 40)
+TRICK = slice(40, 43)
+TRICK_SUIT = 43
+TRICK_LEN = 44
+BRISCOLA = 45
+BRISCOLA_SUIT = 46
+UNSEEN = slice(47, 87)
+
+RANK_OF = np.arange(NUM_CARDS) % 10
+RANK_BITS = 1 << np.arange(10)
+
+
+def suit_keys(observations: np.ndarray) -> np.ndarray:
+    """
+    (N, 4) integer per suit summarizing everything the observation shows of
+    it: the cards in hand, the unseen cards and the trick cards by position.
+    """
+    n = len(observations)
+    rows = np.arange(n)
+    hand = (observations[:, HAND].reshape(n, NUM_SUITS, 10) * RANK_BITS).sum(axis=2, dtype=np.int64)
+    unseen = (observations[:, UNSEEN].reshape(n, NUM_SUITS, 10) * RANK_BITS).sum(axis=2, dtype=np.int64)
+    trick = np.zeros((n, NUM_SUITS), dtype=np.int64)
+    cards = observations[:, TRICK].astype(np.intp)
+    played = np.arange(cards.shape[1]) < observations[:, TRICK_LEN, None]
+    for position in range(cards.shape[1]):
+        rank = np.where(played[:, position], RANK_OF[cards[:, position]] + 1, 0)
+        trick[rows, SUIT_OF[cards[:, position]]] += rank << (4 * position)
+    return hand << 22 | unseen << 12 | trick
+
+
+def canonical_permutations(observations: np.ndarray) -> np.ndarray:
+    """
+    Per row the permutation taking the trump to 0 and the other suits to
+    1, 2, 3 by decreasing `suit_keys`. Suits with equal keys look the same,
+    so the permuted observation does not depend on how ties are broken.
+    """
+    observations = np.asarray(observations)
+    n = len(observations)
+    rows = np.arange(n)
+    keys = suit_keys(observations)
+    trump = observations[:, BRISCOLA_SUIT].astype(np.intp) - 1
+    keys[rows, trump] = np.iinfo(np.int64).max
+    order = np.argsort(-keys, axis=1, kind="stable")
+    perms = np.empty((n, NUM_SUITS), dtype=np.intp)
+    perms[rows[:, None], order] = np.arange(NUM_SUITS)
+    return perms
+
+
+def random_permutations(n: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.permuted(np.tile(np.arange(NUM_SUITS), (n, 1)), axis=1)
+
+
+def card_maps(perms: np.ndarray) -> np.ndarray:
+    """
+    (N, 40) new id of every card id.
+    """
+    return perms[:, SUIT_OF] * 10 + RANK_OF
+
+
+def permute_observations(observations: np.ndarray, perms: np.ndarray) -> np.ndarray:
+    observations = np.asarray(observations)
+    n = len(observations)
+    rows = np.arange(n)
+    maps = card_maps(perms)
+    result = np.zeros_like(observations)
+    result[:, HAND][rows[:, None], maps] = observations[:, HAND]
+    result[:, UNSEEN][rows[:, None], maps] = observations[:, UNSEEN]
+
+    cards = observations[:, TRICK].astype(np.intp)
+    played = np.arange(cards.shape[1]) < observations[:, TRICK_LEN, None]
+    result[:, TRICK] = np.where(played, np.take_along_axis(maps, cards, axis=1), 0)
+    lead = observations[:, TRICK_SUIT].astype(np.intp)
+    result[:, TRICK_SUIT] = np.where(lead > 0, perms[rows, np.maximum(lead - 1, 0)] + 1, 0)
+    result[:, TRICK_LEN] = observations[:, TRICK_LEN]
+    result[:, BRISCOLA] = maps[rows, observations[:, BRISCOLA].astype(np.intp)]
+    result[:, BRISCOLA_SUIT] = perms[rows, observations[:, BRISCOLA_SUIT].astype(np.intp) - 1] + 1
+    return result
+
+
+def permute_masks(action_masks: np.ndarray, perms: np.ndarray) -> np.ndarray:
+    action_masks = np.asarray(action_masks)
+    result = np.zeros_like(action_masks)
+    result[np.arange(len(action_masks))[:, None], card_maps(perms)] = action_masks
+    return result
+
+
+def permute_actions(actions: np.ndarray, perms: np.ndarray) -> np.ndarray:
+    """
+    Card ids in the permuted labels.
+    """
+    actions = np.asarray(actions, dtype=np.intp)
+    return card_maps(perms)[np.arange(len(actions)), actions]
+
+
+def restore_actions(actions: np.ndarray, perms: np.ndarray) -> np.ndarray:
+    """
+    Card ids in the permuted labels back in the original ones.
+    """
+    actions = np.asarray(actions, dtype=np.intp)
+    return permute_actions(actions, np.argsort(perms, axis=1))
+
+
+def canonicalize(observations: np.ndarray, action_masks: Optional[np.ndarray] = None):
+    """
+    (canonical observations, canonical action masks or None, perms).
+    """
+    perms = canonical_permutations(observations)
+    masks = None if action_masks is None else permute_masks(action_masks, perms)
+    return permute_observations(observations, perms), masks, perms
@@ -1,56 +1,44 @@
 import numpy as np
 from typing import List
+from lib.briscola.core import bits_mask, cards_bits
 from lib.briscola.game import BriscolaGame, BriscolaCard
+from lib.briscola.vec_game import SUIT_OF, BriscolaVecGame
 
 EMBEDDING_SHAPE = (40 + 3 + 1 + 1 + 1 + 1 + 40,)
 
 
 def game_embedding(game: BriscolaGame, player: int):
-    full_embeddings = np.zeros(shape=EMBEDDING_SHAPE, dtype=np.uint8)
-    offset = 0
-
-    # hand
-    for i, v in enumerate(full_cards_embedding(game.players[player].hand)):
-        full_embeddings[i + offset] = v
-    offset += 40
-
-    # trick
-    for i, v in enumerate(cards_embedding(game.trick, 3)):
-        full_embeddings[i + offset] = v
-    offset += 3
+    state = game.state
+    # hand at 0 and deck + other players hands (unaccounted for cards) at 47,
+    # unpacked from one bitboard
+    full_embeddings = bits_mask(state.hand_bits[player] | state.unseen_bits() << 47, EMBEDDING_SHAPE[0])
+
+    # trick, padded to 3 cards with 0
+    trick = state.trick_cards()
+    if len(trick) > 3:
+        raise Exception("cards exceeded expected length")
+    for i, card in enumerate(trick):
+        full_embeddings[40 + i] = card
 
     # trick suit
-    full_embeddings[offset] = 0
-    if len(game.trick) > 0:
-        full_embeddings[offset] = BriscolaCard.SUITS.index(game.trick[0].suit) + 1
-    offset += 1
+    if trick:
+        full_embeddings[43] = trick[0] // 10 + 1
 
     # trick length
-    full_embeddings[offset] = len(game.trick)
-    offset += 1
-
-    # briscola
-    full_embeddings[offset] = card_embedding(game.briscola)
-    offset += 1
+    full_embeddings[44] = len(trick)
 
-    # briscola suit
-    briscola_suit_index = BriscolaCard.SUITS.index(game.briscola.suit) + 1
-    full_embeddings[offset] = briscola_suit_index
-    offset += 1
+    # briscola and briscola suit
+    full_embeddings[45] = state.briscola
+    full_embeddings[46] = state.briscola // 10 + 1
 
-    # deck + other players hands (unaccounted for cards)
-    for i, v in enumerate(remaining_card_embedding(game)):
-        full_embeddings[i + offset] = v
-    offset += 40
-
-    return np.array(full_embeddings, dtype=np.uint8)
+    return full_embeddings
 
 
 def remaining_card_embedding(game: BriscolaGame):
-    existing_cards = list(game.deck.cards)
+    bits = game.deck.bits
     for player in game.players:
-        existing_cards += list(player.hand)
-    return full_cards_embedding(existing_cards)
+        bits |= player.hand_bits
+    return bits_mask(bits).astype(int)
 
 
 def cards_embedding(cards: List[BriscolaCard], length: int):
@@ -76,9 +64,41 @@ def card_reverse_embedding(i: int) -> BriscolaCard:
 
 
 def full_cards_embedding(cards: list[BriscolaCard]):
-    result = np.zeros(shape=(40,), dtype=int)
-    have_cards = set(card_embedding(c) for c in cards)
-    for i in range(40):
-        if i in have_cards:
-            result[i] = 1
-    return result
+    return bits_mask(cards_bits(card.id for card in cards)).astype(int)
+
+
+def vec_game_embedding(game: BriscolaVecGame, players: np.ndarray) -> np.ndarray:
+    """
+    game_embedding for every game of a BriscolaVecGame at once, seen by `players`.
+    """
+    n = game.num_games
+    full_embeddings = np.zeros(shape=(n,) + EMBEDDING_SHAPE, dtype=np.uint8)
+
+    # hand
+    full_embeddings[:, :40] = game.hand_masks(players)
+
+    # trick, padded to 3 cards with 0
+    shown = min(game.num_players, 3)
+    trick = game.trick[:, :shown]
+    full_embeddings[:, 40 : 40 + shown] = np.where(trick == -1, 0, trick)
+
+    # trick suit
+    has_trick = game.trick_len > 0
+    full_embeddings[:, 43] = np.where(has_trick, SUIT_OF[game.trick[:, 0]] + 1, 0)
+
+    # trick length
+    full_embeddings[:, 44] = game.trick_len
+
+    # briscola and briscola suit
+    full_embeddings[:, 45] = game.briscola
+    full_embeddings[:, 46] = SUIT_OF[game.briscola] + 1
+
+    # deck + other players hands (unaccounted for cards)
+    remaining = full_embeddings[:, 47:]
+    r, c = np.nonzero(np.arange(40) >= game.deck_pos[:, None])
+    remaining[r, game.deck[r, c]] = 1
+    hands = game.hands.reshape(n, -1)
+    r, c = np.nonzero(hands != -1)
+    remaining[r, hands[r, c]] = 1
+
+    return full_embeddings
@@ -0,0 +1,89 @@
+import numpy as np
+
+from lib.briscola.core import CARD_SUIT, HAND_SIZE, NUM_CARDS, BriscolaState
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+
+HAND_OFFSET = 0
+TRICK_OFFSET = 40
+TRICK_SUIT_OFFSET = 43
+TRICK_LEN_OFFSET = 44
+BRISCOLA_OFFSET = 45
+BRISCOLA_SUIT_OFFSET = 46
+REMAINING_OFFSET = 47
+
+
+class ObservationEncoder:
+    """
+    Incrementally maintained game_embedding for every seat of one game.
+
+    Each seat owns a preallocated buffer whose hand slots are updated as
+    cards are dealt and played. The slots every seat shares (trick, briscola
+    and unseen cards) live in one buffer and are copied in only when a seat
+    is observed.
+    """
+
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        self.buffers = np.zeros((num_players,) + EMBEDDING_SHAPE, dtype=np.uint8)
+        self.shared = np.zeros(EMBEDDING_SHAPE, dtype=np.uint8)
+        # Bitmask of cards still in the deck or in someone's hand
+        self.unseen = 0
+
+    def reset(self, state: BriscolaState):
+        self.buffers[:] = 0
+        self.shared[:] = 0
+        self.unseen = 0
+        self.shared[BRISCOLA_OFFSET] = state.briscola
+        self.shared[BRISCOLA_SUIT_OFFSET] = CARD_SUIT[state.briscola] + 1
+        for card in state.deck_cards():
+            self._add_unseen(card)
+        for player in range(state.num_players):
+            for card in state.hand(player):
+                self.buffers[player, HAND_OFFSET + card] = 1
+                self._add_unseen(card)
+        for i, card in enumerate(state.trick_cards()[:3]):
+            self.shared[TRICK_OFFSET + i] = card
+        if state.trick_len:
+            self.shared[TRICK_SUIT_OFFSET] = CARD_SUIT[state.trick[0]] + 1
+            self.shared[TRICK_LEN_OFFSET] = state.trick_len
+
+    def _add_unseen(self, card: int):
+        self.unseen |= 1 << card
+        self.shared[REMAINING_OFFSET + card] = 1
+
+    def on_play(self, player: int, card: int, position: int):
+        """
+        `player` put `card` at `position` of the trick.
+        """
+        self.buffers[player, HAND_OFFSET + card] = 0
+        self.unseen &= ~(1 << card)
+        shared = self.shared
+        shared[REMAINING_OFFSET + card] = 0
+        if position < 3:
+            shared[TRICK_OFFSET + position] = card
+        if position == 0:
+            shared[TRICK_SUIT_OFFSET] = CARD_SUIT[card] + 1
+        shared[TRICK_LEN_OFFSET] = position + 1
+
+    def on_trick_scored(self):
+        self.shared[TRICK_OFFSET:BRISCOLA_OFFSET] = 0
+
+    def on_redeal(self, state: BriscolaState):
+        # Every seat was dealt one card, now last in its hand
+        for player in range(state.num_players):
+            card = state.hands[player * HAND_SIZE + state.hand_len[player] - 1]
+            self.buffers[player, HAND_OFFSET + card] = 1
+            if card == state.briscola:
+                self._add_unseen(card)
+
+    def observe(self, player: int) -> np.ndarray:
+        """
+        Observation for `player`. The returned buffer is reused, so it is
+        only valid until the next update.
+        """
+        buffer = self.buffers[player]
+        buffer[TRICK_OFFSET:] = self.shared[TRICK_OFFSET:]
+        return buffer
+
+    def action_mask(self, player: int) -> np.ndarray:
+        return self.buffers[player, HAND_OFFSET : HAND_OFFSET + NUM_CARDS].astype(np.int8)
@@ -0,0 +1,206 @@
+import multiprocessing as mp
+import os
+from typing import Any, List, Optional
+
+import numpy as np
+from gymnasium import spaces
+
+from lib.briscola.core import NUM_CARDS
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.briscola_env.vec_env_base import VecEnvBase, register_vec_env
+from lib.shared_arrays import SharedArrays
+
+STEP, RESET, CLOSE = range(3)
+# Seconds between liveness checks while waiting on the workers
+POLL = 1.0
+
+
+def shared_layout(num_envs: int) -> dict:
+    return {
+        "command": (np.int8, ()),
+        "actions": (np.int8, (num_envs,)),
+        "seeds": (np.int64, (num_envs,)),
+        "seeded": (np.bool_, (num_envs,)),
+        "observations": (np.uint8, (num_envs,) + EMBEDDING_SHAPE),
+        "action_masks": (np.int8, (num_envs, NUM_CARDS)),
+        "rewards": (np.float32, (num_envs,)),
+        "dones": (np.bool_, (num_envs,)),
+        "tricks": (np.int32, (num_envs,)),
+        "wins": (np.int32, (num_envs,)),
+        "terminal_observations": (np.uint8, (num_envs,) + EMBEDDING_SHAPE),
+    }
+
+
+def _run_worker(name: str, layout: dict, lo: int, hi: int, num_players: int, go, done):
+    shared = SharedArrays(layout, name)
+    env = BriscolaVecEnv(hi - lo, num_players=num_players)
+    envs = slice(lo, hi)
+    try:
+        while True:
+            go.acquire()
+            command = int(shared["command"])
+            if command == CLOSE:
+                done.release()
+                return
+            if command == RESET:
+                seeded = shared["seeded"][envs]
+                if seeded.all():
+                    env.seed(int(shared["seeds"][lo]))
+                env.set_seeds([int(s) if ok else None for s, ok in zip(shared["seeds"][envs], seeded)])
+                shared["observations"][envs] = env.reset()
+            else:
+                env.step_async(shared["actions"][envs])
+                obs, rewards, dones, infos = env.step_wait()
+                shared["observations"][envs] = obs
+                shared["rewards"][envs] = rewards
+                shared["dones"][envs] = dones
+                shared["tricks"][envs] = [info["tricks"] for info in infos]
+                shared["wins"][envs] = [info["wins"] for info in infos]
+                for i in np.flatnonzero(dones):
+                    shared["terminal_observations"][lo + i] = infos[i]["terminal_observation"]
+            shared["action_masks"][envs] = env.action_masks()
+            done.release()
+    finally:
+        shared.close()
+
+
+@register_vec_env
+class SubprocBriscolaVecEnv(VecEnvBase):
+    """
+    BriscolaVecEnv split across `num_workers` processes.
+
+    Each worker steps a BriscolaVecEnv over its own contiguous block of
+    envs. Actions, observations, masks, rewards and dones live in one
+    preallocated shared memory block, and a step is one semaphore release
+    per worker and one acquire back: nothing is pickled. Behaves like
+    BriscolaVecEnv with auto reset, including `action_masks()` for
+    MaskablePPO; `reset` takes seeds (`seed`, `set_seeds`) but not deck
+    options.
+    """
+
+    metadata = {"name": "briscola", "render_modes": []}
+
+    def __init__(
+        self,
+        num_envs: int,
+        num_players: int = 4,
+        num_workers: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ):
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        num_workers = min(num_workers, num_envs)
+        if num_workers < 1:
+            raise ValueError(f"Invalid num_workers: {num_workers}")
+        self.num_players = num_players
+        self.num_workers = num_workers
+        self.render_mode = None
+        self.closed = False
+
+        if start_method is None:
+            # Like SubprocVecEnv: fork is unsafe once threads are running
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        context = mp.get_context(start_method)
+        layout = shared_layout(num_envs)
+        self.shared = SharedArrays(layout)
+        self._go = [context.Semaphore(0) for _ in range(num_workers)]
+        self._done = context.Semaphore(0)
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.processes = []
+        for worker in range(num_workers):
+            process = context.Process(
+                target=_run_worker,
+                name=f"briscola-env-{worker}",
+                args=(
+                    self.shared.name,
+                    layout,
+                    bounds[worker],
+                    bounds[worker + 1],
+                    num_players,
+                    self._go[worker],
+                    self._done,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+        super().__init__(
+            num_envs,
+            spaces.Box(low=0, high=255, shape=EMBEDDING_SHAPE, dtype=np.uint8),
+            spaces.Discrete(NUM_CARDS),
+        )
+
+    def _run(self, command: int):
+        self.shared["command"][...] = command
+        for go in self._go:
+            go.release()
+        for _ in range(self.num_workers):
+            while not self._done.acquire(timeout=POLL):
+                for process in self.processes:
+                    if not process.is_alive():
+                        raise Exception(f"{process.name} exited with code {process.exitcode}")
+
+    def set_seeds(self, seeds: List[Optional[int]]) -> None:
+        """
+        Seeds for the next reset, one per sub-env.
+        """
+        self._seeds = list(seeds)
+
+    def reset(self) -> np.ndarray:
+        seeds = self._seeds
+        self.shared["seeded"][:] = [seed is not None for seed in seeds]
+        self.shared["seeds"][:] = [0 if seed is None else seed for seed in seeds]
+        self._run(RESET)
+        self._reset_seeds()
+        self._reset_options()
+        return self.shared["observations"].copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.shared["actions"][:] = actions
+
+    def step_wait(self):
+        self._run(STEP)
+        shared = self.shared
+        dones = shared["dones"].copy()
+        tricks = shared["tricks"]
+        wins = shared["wins"]
+        infos = [{"tricks": int(tricks[i]), "wins": int(wins[i])} for i in range(self.num_envs)]
+        for i in np.flatnonzero(dones):
+            infos[i]["terminal_observation"] = shared["terminal_observations"][i].copy()
+            infos[i]["TimeLimit.truncated"] = False
+        return shared["observations"].copy(), shared["rewards"].copy(), dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        return self.shared["action_masks"].copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if all(process.is_alive() for process in self.processes):
+            self._run(CLOSE)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.shared.close()
+        self.shared.unlink()
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        value = getattr(self, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            masks = self.action_masks()
+            return [masks[i] for i in self._get_indices(indices)]
+        raise NotImplementedError(f"{method_name} runs in the worker processes")
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,206 @@
+from typing import Any, List, Optional
+
+import numpy as np
+from gymnasium import spaces
+
+from lib.briscola.core import shuffled_deck
+from lib.briscola.game import deck_ids
+from lib.briscola.vec_game import SCORE_OF, BriscolaVecGame
+from lib.briscola_env.canonical import canonical_permutations, permute_masks, permute_observations, restore_actions
+from lib.briscola_env.embedding import EMBEDDING_SHAPE, vec_game_embedding
+from lib.briscola_env.vec_env_base import VecEnvBase, register_vec_env
+
+WIN_REWARD = 120
+
+
+@register_vec_env
+class BriscolaVecEnv(VecEnvBase):
+    """
+    N self-play games of Briscola as one SB3 VecEnv.
+
+    Each sub-env behaves like ActionMasker(SB3ActionMaskWrapper(BriscolaEnv)):
+    the observation is for the seat about to act, while reward, done and info
+    are for the seat that just played. Finished games are reset in place
+    unless `auto_reset` is False, and written to `recorder` (a
+    lib.records.RecordWriter) when one is given. With `canonical`,
+    observations, action masks and actions use canonical suits (see
+    lib.briscola_env.canonical).
+    """
+
+    metadata = {"name": "briscola", "render_modes": []}
+
+    def __init__(
+        self,
+        num_envs: int,
+        num_players: int = 4,
+        auto_reset: bool = True,
+        recorder=None,
+        canonical: bool = False,
+    ):
+        self.num_players = num_players
+        self.auto_reset = auto_reset
+        self.canonical = canonical
+        self._perms: Optional[np.ndarray] = None
+        self.recorder = recorder
+        if recorder is not None:
+            from lib.records import new_records
+
+            self.records = new_records(num_envs)
+            self.plays_made = np.zeros(num_envs, dtype=np.intp)
+        self.game = BriscolaVecGame(num_envs, players=num_players)
+        self.rewards = np.zeros((num_envs, num_players), dtype=np.float32)
+        self.tricks = np.zeros((num_envs, num_players), dtype=np.int32)
+        self.wins = np.zeros((num_envs, num_players), dtype=np.int32)
+        self._actions: Optional[np.ndarray] = None
+        self._rng = np.random.default_rng()
+        self.render_mode = None
+
+        super().__init__(
+            num_envs,
+            spaces.Box(low=0, high=255, shape=EMBEDDING_SHAPE, dtype=np.uint8),
+            spaces.Discrete(40),
+        )
+
+    def seed(self, seed: Optional[int] = None) -> List[Optional[int]]:
+        self._rng = np.random.default_rng(seed)
+        return super().seed(seed)
+
+    def _reset_games(self, indices: np.ndarray, seeds: List[Optional[int]], options: Optional[List[dict]] = None):
+        # Same deal and starting seat as BriscolaEnv.reset(seed=..., options=...)
+        seeds = [
+            int(self._rng.integers(2**31)) if seed is None else seed for seed in seeds
+        ]
+        options = [{}] * len(seeds) if options is None else options
+        decks = []
+        goes_first = []
+        for seed, option in zip(seeds, options):
+            deck = option.get("deck")
+            decks.append(shuffled_deck(seed) if deck is None else deck_ids(deck))
+            first = option.get("goes_first")
+            goes_first.append(np.random.default_rng(seed).choice(self.num_players) if first is None else first)
+        self.game.reset(indices, np.array(decks, dtype=np.int8), np.array(goes_first))
+        if self.recorder is not None:
+            records = self.records
+            records["deck"][indices] = decks
+            records["num_players"][indices] = self.num_players
+            records["goes_first"][indices] = goes_first
+            records["plays"][indices] = -1
+            records["scores"][indices] = 0
+            self.plays_made[indices] = 0
+        self.rewards[indices] = 0
+        self.tricks[indices] = 0
+        self.wins[indices] = 0
+
+    def set_seeds(self, seeds: List[Optional[int]]) -> None:
+        """
+        Seeds for the next reset, one per sub-env.
+        """
+        self._seeds = list(seeds)
+
+    def reset(self) -> np.ndarray:
+        """
+        Deals from the seeds of `set_seeds` and the "deck" and "goes_first"
+        overrides of `set_options`, like BriscolaEnv.reset.
+        """
+        self._reset_games(np.arange(self.num_envs), self._seeds, self._options)
+        self._reset_seeds()
+        self._reset_options()
+        return self._observe(vec_game_embedding(self.game, self.game.action_on))
+
+    def _observe(self, obs: np.ndarray) -> np.ndarray:
+        if not self.canonical:
+            return obs
+        self._perms = canonical_permutations(obs)
+        return permute_observations(obs, self._perms)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        actions = np.asarray(actions)
+        self._actions = restore_actions(actions, self._perms) if self.canonical else actions
+
+    def step_wait(self):
+        game = self.game
+        rows = game.rows
+        acting = game.action_on.copy()
+        game.play(self._actions)
+        self._record_plays(rows, self._actions)
+
+        scored = game.should_score_trick()
+        if scored.any():
+            self._score_tricks(scored)
+        game.redeal(game.needs_redeal())
+
+        dones = game.game_over()
+        if dones.any():
+            leaders = game.leader()[dones]
+            self.rewards[dones, leaders] += WIN_REWARD
+            self.wins[dones, leaders] += 1
+            self._write_records(np.flatnonzero(dones))
+
+        rewards = self.rewards[rows, acting].copy()
+        infos = [
+            {"tricks": int(self.tricks[i, acting[i]]), "wins": int(self.wins[i, acting[i]])}
+            for i in range(self.num_envs)
+        ]
+        obs = vec_game_embedding(game, game.action_on)
+
+        if self.auto_reset and dones.any():
+            done_idx = np.flatnonzero(dones)
+            terminal = obs[done_idx]
+            if self.canonical:
+                terminal = permute_observations(terminal, canonical_permutations(terminal))
+            for i, terminal_obs in zip(done_idx, terminal):
+                infos[i]["terminal_observation"] = terminal_obs
+                infos[i]["TimeLimit.truncated"] = False
+            self._reset_games(done_idx, [None] * len(done_idx))
+            obs[done_idx] = vec_game_embedding(game, game.action_on)[done_idx]
+
+        return self._observe(obs), rewards, dones, infos
+
+    def _record_plays(self, indices: np.ndarray, cards: np.ndarray):
+        if self.recorder is not None:
+            self.records["plays"][indices, self.plays_made[indices]] = cards
+            self.plays_made[indices] += 1
+
+    def _write_records(self, indices: np.ndarray):
+        if self.recorder is not None:
+            self.records["scores"][indices, : self.num_players] = self.game.scores[indices]
+            self.recorder.write(self.records[indices])
+
+    def _score_tricks(self, mask: np.ndarray):
+        game = self.game
+        rows = np.flatnonzero(mask)
+        trick = game.trick[rows]
+        # action_on is back on the seat that led the trick
+        seats = (game.action_on[rows, None] + np.arange(self.num_players)) % self.num_players
+        winners = game.score_tricks(mask)
+
+        # Winner takes the trick points, everyone else loses what they threw away
+        points = SCORE_OF[trick]
+        lost = seats != winners[:, None]
+        self.rewards[rows[:, None], seats] -= points * lost
+        self.rewards[rows, winners] += points.sum(axis=1)
+        self.tricks[rows, winners] += 1
+
+    def action_masks(self) -> np.ndarray:
+        masks = self.game.action_masks()
+        return permute_masks(masks, self._perms) if self.canonical else masks
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        value = getattr(self, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            masks = self.action_masks()
+            return [masks[i] for i in self._get_indices(indices)]
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
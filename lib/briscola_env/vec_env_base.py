@@ -0,0 +1,130 @@
+"""
+Base for vector envs that don't import stable-baselines3.
+
+Importing anything from stable_baselines3 imports torch, so the envs of
+this package implement SB3's VecEnv interface on VecEnvBase instead of
+subclassing VecEnv. `register_vec_env` makes a class count as a VecEnv for
+isinstance and issubclass checks once SB3 is imported, whenever that is.
+"""
+import importlib.abc
+import importlib.util
+import sys
+from copy import deepcopy
+from typing import Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+from gymnasium import spaces
+
+SB3_VEC_ENV = "stable_baselines3.common.vec_env.base_vec_env"
+
+_registered: List[type] = []
+
+
+class _RegisterOnImport(importlib.abc.MetaPathFinder):
+    """
+    Finder that only hooks SB3's VecEnv module, registering the classes of
+    `register_vec_env` with VecEnv right after the module has run.
+    """
+
+    def find_spec(self, name, path, target=None):
+        if name != SB3_VEC_ENV:
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_register(module):
+            exec_module(module)
+            for cls in _registered:
+                module.VecEnv.register(cls)
+
+        spec.loader.exec_module = exec_and_register
+        return spec
+
+
+def register_vec_env(cls: type) -> type:
+    """
+    Make `cls` a virtual subclass of SB3's VecEnv, now if SB3 is loaded or
+    else as soon as it is.
+    """
+    _registered.append(cls)
+    module = sys.modules.get(SB3_VEC_ENV)
+    if module is not None:
+        module.VecEnv.register(cls)
+    elif not any(isinstance(finder, _RegisterOnImport) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _RegisterOnImport())
+    return cls
+
+
+class VecEnvBase:
+    """
+    The concrete part of SB3's VecEnv: spaces, seeds and options for the
+    next reset, `step` and index handling. Subclasses implement reset,
+    step_async, step_wait, close, get_attr, set_attr, env_method and
+    env_is_wrapped like any VecEnv.
+    """
+
+    def __init__(self, num_envs: int, observation_space: spaces.Space, action_space: spaces.Space):
+        self.num_envs = num_envs
+        self.observation_space = observation_space
+        self.action_space = action_space
+        self.reset_infos = [{} for _ in range(num_envs)]
+        self._seeds: List[Optional[int]] = [None for _ in range(num_envs)]
+        self._options: List[dict] = [{} for _ in range(num_envs)]
+        self.render_mode = None
+        self.metadata = {"render_modes": []}
+
+    def _reset_seeds(self) -> None:
+        self._seeds = [None for _ in range(self.num_envs)]
+
+    def _reset_options(self) -> None:
+        self._options = [{} for _ in range(self.num_envs)]
+
+    def step(self, actions: np.ndarray):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def seed(self, seed: Optional[int] = None) -> Sequence[Optional[int]]:
+        if seed is None:
+            seed = int(np.random.randint(0, np.iinfo(np.uint32).max, dtype=np.uint32))
+        self._seeds = [seed + i for i in range(self.num_envs)]
+        return self._seeds
+
+    def set_options(self, options=None) -> None:
+        if options is None:
+            options = {}
+        if isinstance(options, dict):
+            self._options = deepcopy([options] * self.num_envs)
+        else:
+            self._options = deepcopy(options)
+
+    def has_attr(self, attr_name: str) -> bool:
+        try:
+            self.get_attr(attr_name)
+            return True
+        except AttributeError:
+            return False
+
+    def get_images(self) -> Sequence[Optional[np.ndarray]]:
+        raise NotImplementedError()
+
+    def render(self, mode: Optional[str] = None) -> Optional[np.ndarray]:
+        return None
+
+    @property
+    def unwrapped(self) -> "VecEnvBase":
+        return self
+
+    def getattr_depth_check(self, name: str, already_found: bool) -> Optional[str]:
+        if hasattr(self, name) and already_found:
+            return f"{type(self).__module__}.{type(self).__name__}"
+        return None
+
+    def _get_indices(self, indices: Any) -> Iterable[int]:
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
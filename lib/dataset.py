@@ -0,0 +1,222 @@
+"""
+Offline datasets of positions built from game records.
+
+Every play of a recorded game becomes one position: the observation and
+action mask of the seat to act (exactly what BriscolaEnv shows it), the
+card it played and its return, the reward the seat collects from that play
+to the end of the game. Positions are built by replaying many games in
+lockstep on a BriscolaVecEnv and stored as sharded .npy files that are
+memory-mapped on read.
+
+    python -m lib.dataset games.rec datasets/games --shard-size 1000000
+"""
+import argparse
+import json
+import os
+import threading
+from queue import Empty, Full, Queue
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from lib.briscola.core import NUM_CARDS
+from lib.briscola_env.canonical import permute_actions, permute_masks, permute_observations, random_permutations
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.records import read_records
+
+FIELDS = {
+    "observations": (np.uint8, EMBEDDING_SHAPE),
+    "action_masks": (np.int8, (NUM_CARDS,)),
+    "actions": (np.int8, ()),
+    "returns": (np.float32, ()),
+}
+MANIFEST = "manifest.json"
+
+
+def positions(records: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The 40 positions of each game in `records`, game by game, as FIELDS
+    arrays. All records must have the same number of players.
+    """
+    num_players = int(records["num_players"][0])
+    if (records["num_players"] != num_players).any():
+        raise ValueError("records mix player counts")
+    n = len(records)
+    env = BriscolaVecEnv(n, num_players=num_players, auto_reset=False)
+    env.set_options([{"deck": r["deck"], "goes_first": int(r["goes_first"])} for r in records])
+    obs = env.reset()
+
+    plays = np.asarray(records["plays"])
+    out = {name: np.zeros((n, NUM_CARDS) + shape, dtype=dtype) for name, (dtype, shape) in FIELDS.items()}
+    seats = np.zeros((n, NUM_CARDS), dtype=np.intp)
+    before = np.zeros((n, NUM_CARDS), dtype=np.float32)
+    rows = np.arange(n)
+    for step in range(NUM_CARDS):
+        out["observations"][:, step] = obs
+        out["action_masks"][:, step] = env.action_masks()
+        seats[:, step] = env.game.action_on
+        before[:, step] = env.rewards[rows, seats[:, step]]
+        obs, _, _, _ = env.step(plays[:, step])
+    out["actions"][:] = plays
+    out["returns"][:] = env.rewards[rows[:, None], seats] - before
+    return {name: array.reshape((n * NUM_CARDS,) + array.shape[2:]) for name, array in out.items()}
+
+
+def build_dataset(record_path: str, directory: str, shard_size: int = 1_000_000, chunk_games: int = 8192) -> dict:
+    """
+    Write the positions of every game in `record_path` to `directory` in
+    shards of about `shard_size` positions, `chunk_games` games at a time.
+    Returns the manifest.
+    """
+    records = read_records(record_path)
+    if len(records) == 0:
+        raise ValueError(f"no games in {record_path}")
+    os.makedirs(directory, exist_ok=True)
+    games_per_shard = max(shard_size // NUM_CARDS, 1)
+    shards = []
+    for shard, first in enumerate(range(0, len(records), games_per_shard)):
+        games = records[first : first + games_per_shard]
+        name = f"shard-{shard:05d}"
+        arrays = {
+            field: np.lib.format.open_memmap(
+                os.path.join(directory, f"{name}-{field}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(len(games) * NUM_CARDS,) + shape,
+            )
+            for field, (dtype, shape) in FIELDS.items()
+        }
+        for start in range(0, len(games), chunk_games):
+            chunk = positions(games[start : start + chunk_games])
+            for field, array in arrays.items():
+                array[start * NUM_CARDS : start * NUM_CARDS + len(chunk[field])] = chunk[field]
+        for array in arrays.values():
+            array.flush()
+        shards.append({"name": name, "positions": len(games) * NUM_CARDS})
+
+    manifest = {
+        "num_players": int(records["num_players"][0]),
+        "positions": sum(shard["positions"] for shard in shards),
+        "shards": shards,
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+_DONE = object()
+
+
+class OfflineDataset:
+    """
+    Memory-mapped view of a dataset written by `build_dataset`. Only the
+    positions of the batches being read are paged in.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.num_players = self.manifest["num_players"]
+        self.shards: List[Dict[str, np.ndarray]] = [
+            {
+                field: np.load(os.path.join(directory, f"{shard['name']}-{field}.npy"), mmap_mode="r")
+                for field in FIELDS
+            }
+            for shard in self.manifest["shards"]
+        ]
+
+    def __len__(self) -> int:
+        return self.manifest["positions"]
+
+    def _batches(self, batch_size: int, shuffle: bool, rng: np.random.Generator, drop_last: bool, augment: bool):
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        for shard_index in order:
+            shard = self.shards[shard_index]
+            n = len(shard["actions"])
+            indices = rng.permutation(n) if shuffle else np.arange(n)
+            for start in range(0, n, batch_size):
+                batch = indices[start : start + batch_size]
+                if drop_last and len(batch) < batch_size:
+                    break
+                # Sorted reads are far kinder to the page cache than random ones
+                batch = np.sort(batch)
+                batch = {field: array[batch] for field, array in shard.items()}
+                if augment:
+                    perms = random_permutations(len(batch["actions"]), rng)
+                    batch["observations"] = permute_observations(batch["observations"], perms)
+                    batch["action_masks"] = permute_masks(batch["action_masks"], perms)
+                    batch["actions"] = permute_actions(batch["actions"], perms).astype(np.int8)
+                yield batch
+
+    def batches(
+        self,
+        batch_size: int = 1024,
+        shuffle: bool = True,
+        seed=None,
+        prefetch: int = 4,
+        drop_last: bool = False,
+        augment: bool = False,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Mini-batches as dicts of FIELDS arrays, read ahead by a background
+        thread into a queue of at most `prefetch` batches. Shuffling is
+        over shards, then over positions within each shard. With `augment`
+        every position has its suits randomly permuted, trump included.
+        """
+        queue: Queue = Queue(maxsize=prefetch)
+        stop = threading.Event()
+        rng = np.random.default_rng(seed)
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return
+                except Full:
+                    continue
+
+        def produce():
+            try:
+                for batch in self._batches(batch_size, shuffle, rng, drop_last, augment):
+                    if stop.is_set():
+                        return
+                    put(batch)
+            except BaseException as e:
+                put(e)
+            put(_DONE)
+
+        thread = threading.Thread(target=produce, name="dataset-prefetch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Unblock the producer if it is waiting on a full queue
+            try:
+                while True:
+                    queue.get_nowait()
+            except Empty:
+                pass
+            thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m lib.dataset", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("records", help="game record file")
+    parser.add_argument("directory", help="output directory")
+    parser.add_argument("--shard-size", type=int, default=1_000_000, help="positions per shard")
+    parser.add_argument("--chunk-games", type=int, default=8192, help="games replayed at once")
+    args = parser.parse_args()
+    manifest = build_dataset(args.records, args.directory, args.shard_size, args.chunk_games)
+    print(f"{manifest['positions']:,} positions in {len(manifest['shards'])} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import json
+
+from lib.evaluation.harness import duplicate_evaluate, evaluate
+from lib.inference.policy import BACKENDS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m lib.evaluation",
+        description="Evaluate a trained policy against random agents.",
+    )
+    parser.add_argument("--model", default=None, help="policy .zip or .onnx, all seats random if omitted")
+    parser.add_argument("--backend", default="auto", choices=BACKENDS)
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4])
+    parser.add_argument("--seat", type=int, default=None, help="model seat, every seat if omitted")
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--duplicate", action="store_true", help="paired duplicate-deal evaluation against --baseline")
+    parser.add_argument("--baseline", default=None, help="policy to compare with in --duplicate mode, random if omitted")
+    parser.add_argument("--cache-size", type=int, default=0, help="positions in a shared policy action cache, off if 0")
+    parser.add_argument("--record", default=None, help="append the games to this record file")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.duplicate:
+        results = duplicate_evaluate(
+            args.model,
+            args.baseline,
+            num_games=args.games,
+            num_players=args.players,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            first_seed=args.first_seed,
+            backend=args.backend,
+            cache_size=args.cache_size,
+        )
+        if args.output is not None:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return
+
+    seats = range(args.players) if args.seat is None else [args.seat]
+    results = {}
+    for seat in seats:
+        print(f"Model at player_{seat}")
+        results[f"player_{seat}"] = evaluate(
+            seat,
+            args.model,
+            num_games=args.games,
+            num_players=args.players,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            first_seed=args.first_seed,
+            backend=args.backend,
+            record_path=args.record,
+            cache_size=args.cache_size,
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional, Sequence
+
+import numpy as np
+
+from lib.briscola.core import NUM_CARDS, shuffled_deck
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.cache import CachedPolicy, PolicyCache
+from lib.inference.policy import load_policy
+from lib.records import RecordList, RecordWriter
+
+# Random seats draw from their own stream so they don't mirror the deck shuffle
+OPPONENT_STREAM = 1
+
+_policy = None
+_baseline = None
+
+
+def make_results(agents, wins, total_rewards):
+    player_results = []
+    total_wins = sum(wins.values())
+    print("Winrates:")
+    for p in agents:
+        winrate = wins[p] / total_wins
+        print(f"\t{p}: {winrate*100}%")
+        print(f"\tWins: {wins[p]} Rewards: {total_rewards[p]}")
+        player_results.append({"winrate": winrate, "total_rewards": total_rewards[p]})
+    return player_results
+
+
+def opponent_draws(seed: int) -> np.ndarray:
+    """
+    Random numbers a random seat uses at each of the 40 plays of game `seed`.
+    """
+    return np.random.default_rng((seed, OPPONENT_STREAM)).random((NUM_CARDS, NUM_CARDS))
+
+
+def random_actions(draws: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """
+    Uniformly random legal card per row, fixed by `draws`.
+    """
+    return ((draws + 1) * masks).argmax(axis=-1)
+
+
+def deal(seed: int, num_players: int) -> dict:
+    """
+    The deck and starting seat BriscolaEnv.reset(seed=seed) would deal, as
+    explicit reset options.
+    """
+    return {
+        "deck": shuffled_deck(seed),
+        "goes_first": int(np.random.default_rng(seed).choice(num_players)),
+    }
+
+
+def play_lockstep(
+    policy, player: int, seeds: Sequence[int], num_players: int, deals=None, recorder=None
+) -> BriscolaVecEnv:
+    """
+    Play one game per seed in lockstep, `policy` at seat `player` and random
+    play everywhere else, dealing from `deals` (reset options) when given
+    and writing the games to `recorder`. Returns the env with every game
+    finished.
+    """
+    env = BriscolaVecEnv(len(seeds), num_players=num_players, auto_reset=False, recorder=recorder)
+    env.set_seeds(seeds)
+    if deals is not None:
+        env.set_options(deals)
+    obs = env.reset()
+    draws = np.stack([opponent_draws(seed) for seed in seeds])
+
+    # Every game lasts exactly 40 plays, so all of them finish together
+    for step in range(NUM_CARDS):
+        masks = env.action_masks()
+        actions = random_actions(draws[:, step], masks)
+        if policy is not None:
+            rows = np.flatnonzero(env.game.action_on == player)
+            if len(rows) > 0:
+                actions[rows] = policy.predict(
+                    obs[rows], action_masks=masks[rows], deterministic=True
+                )[0]
+        obs, _, dones, _ = env.step(actions)
+    if not dones.all():
+        raise Exception("games did not finish")
+    return env
+
+
+def play_games(policy, player: int, seeds: Sequence[int], num_players: int, recorder=None):
+    """
+    Per-seat win and reward tallies of `play_lockstep`.
+    """
+    env = play_lockstep(policy, player, seeds, num_players, recorder=recorder)
+
+    # Same tally as eval_action_mask: the highest reward takes its win count
+    rewards = env.rewards.astype(np.int64)
+    winners = rewards.argmax(axis=1)
+    wins = np.zeros(num_players, dtype=np.int64)
+    np.add.at(wins, winners, env.wins[np.arange(len(seeds)), winners])
+    return wins, rewards.sum(axis=0)
+
+
+def play_duplicate(policy, baseline, seeds: Sequence[int], num_players: int):
+    """
+    Deal every seed once per seat with `policy` in that seat, then again
+    with `baseline` there instead (None plays randomly), reusing the deck,
+    starting seat and random opponents. Returns (points, wins) per seed and
+    seat for policy and baseline, as (4, N, players) arrays.
+    """
+    deals = [deal(seed, num_players) for seed in seeds]
+    results = np.zeros((4, len(seeds), num_players), dtype=np.int64)
+    for seat in range(num_players):
+        for i, seated in enumerate([policy, baseline]):
+            game = play_lockstep(seated, seat, seeds, num_players, deals).game
+            results[2 * i, :, seat] = game.scores[:, seat]
+            results[2 * i + 1, :, seat] = game.leader() == seat
+    return results
+
+
+def paired_stats(diffs: np.ndarray, resamples: int = 1000, seed: int = 0) -> dict:
+    """
+    Mean, standard error and 95% percentile bootstrap interval of paired
+    differences.
+    """
+    n = len(diffs)
+    means = np.random.default_rng(seed).choice(diffs, size=(resamples, n)).mean(axis=1)
+    low, high = np.percentile(means, [2.5, 97.5])
+    return {
+        "mean": float(diffs.mean()),
+        "stderr": float(diffs.std(ddof=1) / np.sqrt(n)),
+        "ci": [float(low), float(high)],
+    }
+
+
+def independent_stderr(points: np.ndarray, baseline_points: np.ndarray) -> float:
+    """
+    Standard error of the policy minus baseline point differential had the
+    same games been fresh deals, half played by each: points are (N,
+    players) arrays of single games.
+    """
+    variance = points.var(ddof=1) + baseline_points.var(ddof=1)
+    return float(np.sqrt(variance / points.size))
+
+
+def _load(path: Optional[str], backend: str, cache: Optional[PolicyCache]):
+    if path is None:
+        return None
+    if cache is None:
+        return load_policy(path, backend)
+    return CachedPolicy.load(path, cache, backend)
+
+
+def _init_worker(
+    model_path: Optional[str],
+    backend: str,
+    baseline_path: Optional[str] = None,
+    cache: Optional[PolicyCache] = None,
+):
+    global _policy, _baseline
+    _policy = _load(model_path, backend, cache)
+    _baseline = _load(baseline_path, backend, cache)
+
+
+def _play_shard(seeds: Sequence[int], player: int, num_players: int, record: bool = False):
+    records = RecordList() if record else None
+    wins, rewards = play_games(_policy, player, seeds, num_players, records)
+    return wins, rewards, None if records is None else records.array()
+
+
+def _play_duplicate_shard(seeds: Sequence[int], num_players: int):
+    return play_duplicate(_policy, _baseline, seeds, num_players)
+
+
+def _make_cache(cache_size: int, workers: int) -> Optional[PolicyCache]:
+    return PolicyCache(cache_size, shared=workers > 1) if cache_size > 0 else None
+
+
+def _map_shards(play_shard, num_games, batch_size, first_seed, workers, initargs):
+    seeds = list(range(first_seed, first_seed + num_games))
+    shards = [seeds[i : i + batch_size] for i in range(0, num_games, batch_size)]
+    if workers <= 1:
+        _init_worker(*initargs)
+        return list(map(play_shard, shards))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        return list(executor.map(play_shard, shards))
+
+
+def evaluate(
+    player: int,
+    model_path: Optional[str],
+    num_games: int = 100,
+    num_players: int = 4,
+    workers: int = 1,
+    batch_size: int = 128,
+    first_seed: int = 0,
+    backend: str = "auto",
+    record_path: Optional[str] = None,
+    cache_size: int = 0,
+):
+    """
+    Evaluate a trained agent at seat `player` against random agents,
+    appending the games to the record file `record_path` if given.
+
+    Games are dealt from seeds `first_seed` onwards and split into shards of
+    `batch_size` that are played by `workers` processes, each loading the
+    policy once with `backend` (see lib.inference.policy.load_policy).
+    Tallies only depend on the seeds, not on the worker count. With
+    `cache_size` the workers share a PolicyCache of that many positions
+    and print its hit rate.
+    """
+    record = record_path is not None
+    play_shard = partial(_play_shard, player=player, num_players=num_players, record=record)
+    cache = _make_cache(cache_size, workers)
+    initargs = (model_path, backend, None, cache)
+    try:
+        results = _map_shards(play_shard, num_games, batch_size, first_seed, workers, initargs)
+        cache_stats = None if cache is None else cache.stats()
+    finally:
+        if cache is not None:
+            cache.close()
+    if record:
+        with RecordWriter(record_path) as writer:
+            for _wins, _rewards, records in results:
+                writer.write(records)
+
+    agents = [f"player_{i}" for i in range(num_players)]
+    wins = {agent: 0 for agent in agents}
+    total_rewards = {agent: 0 for agent in agents}
+    for shard_wins, shard_rewards, _records in results:
+        for i, agent in enumerate(agents):
+            wins[agent] += int(shard_wins[i])
+            total_rewards[agent] += int(shard_rewards[i])
+    if cache_stats is not None:
+        print(f"Cache hit rate: {cache_stats['hit_rate']:.1%} ({cache_stats['evictions']} evictions)")
+    return make_results(agents, wins, total_rewards)
+
+
+def duplicate_evaluate(
+    model_path: Optional[str],
+    baseline_path: Optional[str] = None,
+    num_games: int = 100,
+    num_players: int = 4,
+    workers: int = 1,
+    batch_size: int = 128,
+    first_seed: int = 0,
+    backend: str = "auto",
+    resamples: int = 1000,
+    cache_size: int = 0,
+) -> dict:
+    """
+    Duplicate-deal evaluation of a policy against a baseline (random if
+    None) with random opponents.
+
+    Each of the `num_games` deals is played with the policy in every seat
+    and again with the baseline in that seat, so the deal's luck cancels in
+    the per-deal point differential. Reports its mean, standard error and
+    bootstrap interval, the standard error the same number of games on
+    independent deals would give for comparison, and both win rates.
+    With `cache_size` the workers share a PolicyCache of that many
+    positions, its stats are reported under "cache".
+    """
+    play_shard = partial(_play_duplicate_shard, num_players=num_players)
+    cache = _make_cache(cache_size, workers)
+    initargs = (model_path, backend, baseline_path, cache)
+    try:
+        results = np.concatenate(_map_shards(play_shard, num_games, batch_size, first_seed, workers, initargs), axis=1)
+        cache_stats = None if cache is None else cache.stats()
+    finally:
+        if cache is not None:
+            cache.close()
+    points, wins, baseline_points, baseline_wins = results.mean(axis=2)
+
+    diffs = points - baseline_points
+    stats = paired_stats(diffs, resamples)
+    independent = independent_stderr(results[0], results[2])
+    summary = {
+        "deals": num_games,
+        "games": 2 * num_players * num_games,
+        "mean_point_diff": stats["mean"],
+        "stderr": stats["stderr"],
+        "ci": stats["ci"],
+        "independent_stderr": independent,
+        "win_rate": float(wins.mean()),
+        "baseline_win_rate": float(baseline_wins.mean()),
+        "win_rate_diff_stderr": float((wins - baseline_wins).std(ddof=1) / np.sqrt(num_games)),
+    }
+    low, high = stats["ci"]
+    print(f"Point differential: {stats['mean']:+.2f} ± {stats['stderr']:.2f} per game")
+    print(f"\t95% CI {low:+.2f} to {high:+.2f}, independent deals ± {independent:.2f}")
+    print(f"Win rate: {summary['win_rate']:.1%} vs baseline {summary['baseline_win_rate']:.1%}")
+    if cache_stats is not None:
+        summary["cache"] = cache_stats
+        print(f"Cache hit rate: {cache_stats['hit_rate']:.1%}")
+    return summary
+
+
+def eval_action_mask(player, model_path, num_games=100, num_players=4, backend="auto"):
+    """
+    Serial reference: the notebook's evaluation loop over BriscolaEnv, one
+    game and one prediction at a time, with seeded random seats.
+    """
+    env = BriscolaEnv(num_players=num_players)
+    model = None if model_path is None else load_policy(model_path, backend)
+
+    wins = {agent: 0 for agent in env.possible_agents}
+    total_rewards = {agent: 0 for agent in env.possible_agents}
+    for i in range(num_games):
+        env.reset(seed=i)
+        draws = opponent_draws(i)
+        for step, agent in enumerate(env.agent_iter()):
+            obs, reward, termination, truncation, info = env.last()
+            observation, action_mask = obs.values()
+            if termination or truncation:
+                winner = max(env.rewards, key=env.rewards.get)
+                wins[winner] += env.infos[winner]["wins"]
+                for a in env.possible_agents:
+                    total_rewards[a] += env.rewards[a]
+                break
+            else:
+                # Act randomly unless it's the agents turn
+                if model is None or agent != env.possible_agents[player]:
+                    act = int(random_actions(draws[step], action_mask))
+                else:
+                    act = int(
+                        model.predict(
+                            observation, action_masks=action_mask, deterministic=True
+                        )[0]
+                    )
+            env.step(act)
+    env.close()
+    return make_results(env.possible_agents, wins, total_rewards)
+
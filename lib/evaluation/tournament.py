@@ -0,0 +1,354 @@
+"""
+Tournament between policies with duplicate deals.
+
+Every pairing plays "sets": one seed dealt once per distinct rotation of
+the seats, so both entrants hold every hand of the deal. A set is won by
+the entrant with more card points over all its games. Ratings are a
+Bradley-Terry fit of the set results on the Elo scale, with 95% intervals.
+
+Finished tasks are appended to a JSONL results file as they come in, and
+a rerun with the same file skips them, so an interrupted run resumes.
+
+    python -m lib.evaluation.tournament random greedy models/a.zip models/b.onnx \\
+        --players 2 --sets 10000 --workers 8 --results tournament.jsonl
+
+Besides policy files, entrants can be "random" or one of the rule-based
+agents of lib.agents.rules by name.
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lib.agents.rules import AGENTS
+from lib.briscola.core import NUM_CARDS
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.evaluation.harness import opponent_draws, random_actions
+from lib.inference.policy import BACKENDS, load_policy
+
+RANDOM = "random"
+FORMATS = ["round-robin", "swiss"]
+ELO_SCALE = 400 / math.log(10)
+
+_backend = "auto"
+_policies: Dict[str, object] = {}
+
+
+def entrant_name(spec: str) -> str:
+    return spec if spec == RANDOM or spec in AGENTS else os.path.basename(spec)
+
+
+def _policy(spec: str):
+    if spec not in _policies:
+        _policies[spec] = AGENTS[spec]() if spec in AGENTS else load_policy(spec, _backend)
+    return _policies[spec]
+
+
+def rotations(lineup: Sequence[str]) -> List[Tuple[str, ...]]:
+    """
+    Distinct seat rotations of `lineup`, e.g. 2 for (a, b, a, b).
+    """
+    seen = []
+    for shift in range(len(lineup)):
+        rotated = tuple(lineup[(seat + shift) % len(lineup)] for seat in range(len(lineup)))
+        if rotated not in seen:
+            seen.append(rotated)
+    return seen
+
+
+def play_lineups(lineups: Sequence[Sequence[str]], seeds: Sequence[int], num_players: int) -> np.ndarray:
+    """
+    Play game i from seeds[i] with lineups[i][seat] at each seat, in
+    lockstep. Random seats use the seeded draws of the evaluation harness
+    and policies play deterministically, so results depend only on the
+    seeds. Returns (N, players) card points.
+    """
+    env = BriscolaVecEnv(len(seeds), num_players=num_players, auto_reset=False)
+    env.set_seeds(list(seeds))
+    obs = env.reset()
+    draws = np.stack([opponent_draws(seed) for seed in seeds])
+    seats = np.array(lineups, dtype=object)
+    rows = np.arange(len(seeds))
+
+    for step in range(NUM_CARDS):
+        masks = env.action_masks()
+        actions = random_actions(draws[:, step], masks)
+        acting = seats[rows, env.game.action_on]
+        for spec in set(acting):
+            if spec == RANDOM:
+                continue
+            group = np.flatnonzero(acting == spec)
+            actions[group] = _policy(spec).predict(
+                obs[group], action_masks=masks[group], deterministic=True
+            )[0]
+        obs, _, dones, _ = env.step(actions)
+    if not dones.all():
+        raise Exception("games did not finish")
+    return env.game.scores.astype(np.int64)
+
+
+def play_sets(a: str, b: str, seeds: Sequence[int], num_players: int) -> Dict:
+    """
+    Duplicate sets of `a` against `b`, one per seed. Tallies are from `a`'s
+    side: set wins, draws and losses plus the sum and sum of squares of its
+    per-set point differential.
+    """
+    lineup = [a, b] * (num_players // 2)
+    rotated = rotations(lineup)
+    games = [(seed, r) for seed in seeds for r in rotated]
+    scores = play_lineups([r for _, r in games], [seed for seed, _ in games], num_players)
+
+    is_a = np.array([[spec == a for spec in r] for _, r in games])
+    diffs = np.where(is_a, scores, -scores).sum(axis=1).reshape(len(seeds), len(rotated)).sum(axis=1)
+    return {
+        "wins": int((diffs > 0).sum()),
+        "draws": int((diffs == 0).sum()),
+        "losses": int((diffs < 0).sum()),
+        "diff": int(diffs.sum()),
+        "diff_sq": int((diffs**2).sum()),
+    }
+
+
+def _init_worker(backend: str):
+    global _backend
+    _backend = backend
+    _policies.clear()
+
+
+def _run_task(task: Dict) -> Dict:
+    seeds = range(task["first_seed"], task["first_seed"] + task["sets"])
+    return dict(task, **play_sets(task["a"], task["b"], seeds, task["players"]))
+
+
+def task_key(task: Dict) -> Tuple:
+    return task["players"], task["round"], task["a"], task["b"], task["first_seed"]
+
+
+def load_results(path: Optional[str]) -> List[Dict]:
+    if path is None or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        # A run killed mid-write can leave a partial last line
+        return [json.loads(line) for line in f if line.endswith("\n")]
+
+
+def trim_partial_line(path: str) -> None:
+    """
+    Cut a partial last line left by a killed run, so appended results start
+    on a line of their own.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as f:
+        data = f.read()
+        f.truncate(data.rfind(b"\n") + 1)
+
+
+def fit_ratings(
+    names: Sequence[str], results: Sequence[Dict], anchor: Optional[str] = None, prior: float = 0.01
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Bradley-Terry ratings from set results, draws counting half to each
+    side, as {name: (elo, 95% half-width)}. `anchor` (the first name by
+    default) is pinned at 1000; a weak Gaussian `prior` keeps entrants that
+    never lost finite.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    wins = np.zeros((n, n))
+    for r in results:
+        i, j = index[r["a"]], index[r["b"]]
+        wins[i, j] += r["wins"] + r["draws"] / 2
+        wins[j, i] += r["losses"] + r["draws"] / 2
+    games = wins + wins.T
+
+    fixed = index[anchor] if anchor is not None else 0
+    free = [i for i in range(n) if i != fixed]
+    theta = np.zeros(n)
+    information = np.eye(len(free)) * prior
+    for _ in range(100):
+        p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+        gradient = (wins - games * p).sum(axis=1) - prior * theta
+        weights = games * p * (1 - p)
+        hessian = np.diag(weights.sum(axis=1) + prior) - weights
+        information = hessian[np.ix_(free, free)]
+        step = np.linalg.solve(information, gradient[free])
+        theta[free] += step
+        if np.abs(step).max() < 1e-9:
+            break
+
+    stderr = np.zeros(n)
+    stderr[free] = np.sqrt(np.diag(np.linalg.inv(information)))
+    return {
+        name: (1000 + ELO_SCALE * theta[i], 1.96 * ELO_SCALE * stderr[i]) for name, i in index.items()
+    }
+
+
+def swiss_pairings(names: Sequence[str], ratings: Dict[str, Tuple[float, float]], played: set) -> List[Tuple[str, str]]:
+    """
+    Pair neighbours by rating, skipping pairs that already met when another
+    unpaired entrant is left. An odd entrant out sits the round.
+    """
+    order = sorted(names, key=lambda name: -ratings[name][0])
+    pairs = []
+    while len(order) > 1:
+        a = order.pop(0)
+        fresh = [name for name in order if (a, name) not in played and (name, a) not in played]
+        b = fresh[0] if fresh else order[0]
+        order.remove(b)
+        pairs.append((a, b))
+    return pairs
+
+
+def run_tournament(
+    specs: Sequence[str],
+    num_players: int = 2,
+    tournament_format: str = "round-robin",
+    sets: int = 1000,
+    rounds: int = 5,
+    workers: int = 1,
+    batch_size: int = 256,
+    first_seed: int = 0,
+    results_path: Optional[str] = None,
+    backend: str = "auto",
+) -> Tuple[Dict[str, Tuple[float, float]], List[Dict]]:
+    """
+    Play the tournament and return (ratings, results). Round robin plays
+    `sets` sets per pair; Swiss plays `rounds` rounds of `sets` sets per
+    pairing, pairing on the ratings so far. Every pairing in a round uses
+    the same seeds, so deals are duplicated across pairings as well.
+    """
+    if tournament_format not in FORMATS:
+        raise ValueError(f"Invalid format: {tournament_format}")
+    if len(set(specs)) != len(specs) or len(specs) < 2:
+        raise ValueError("need at least 2 distinct entrants")
+    names = list(specs)
+    # Results of another player count in the same file are not this run's
+    results = [r for r in load_results(results_path) if r["players"] == num_players]
+    if results_path is not None:
+        trim_partial_line(results_path)
+    done = {task_key(r) for r in results}
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,))
+    else:
+        _init_worker(backend)
+    try:
+        for round_index in range(1 if tournament_format == "round-robin" else rounds):
+            if tournament_format == "round-robin":
+                pairs = list(combinations(names, 2))
+            else:
+                # Only earlier rounds, so a resumed run pairs like the original
+                earlier = [r for r in results if r["round"] < round_index]
+                ratings = fit_ratings(names, earlier)
+                played = {(r["a"], r["b"]) for r in earlier}
+                pairs = swiss_pairings(names, ratings, played)
+
+            round_seed = first_seed + round_index * sets
+            tasks = []
+            for a, b in pairs:
+                for start in range(0, sets, batch_size):
+                    task = {
+                        "round": round_index,
+                        "a": a,
+                        "b": b,
+                        "players": num_players,
+                        "first_seed": round_seed + start,
+                        "sets": min(batch_size, sets - start),
+                    }
+                    if task_key(task) not in done:
+                        tasks.append(task)
+
+            if executor is None:
+                finished = map(_run_task, tasks)
+            else:
+                futures = [executor.submit(_run_task, task) for task in tasks]
+                finished = (future.result() for future in as_completed(futures))
+            for result in finished:
+                results.append(result)
+                done.add(task_key(result))
+                if results_path is not None:
+                    with open(results_path, "a") as f:
+                        f.write(json.dumps(result) + "\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    anchor = RANDOM if RANDOM in names else None
+    return fit_ratings(names, results, anchor=anchor), results
+
+
+def pair_summaries(results: Sequence[Dict]) -> Dict[Tuple[str, str], Dict]:
+    """
+    Per pairing: sets, score of `a` (draws half) and mean point
+    differential per set with its standard error.
+    """
+    totals: Dict[Tuple[str, str], Dict] = {}
+    for r in results:
+        t = totals.setdefault((r["a"], r["b"]), {"sets": 0, "wins": 0, "draws": 0, "diff": 0, "diff_sq": 0})
+        t["sets"] += r["sets"]
+        for key in ["wins", "draws", "diff", "diff_sq"]:
+            t[key] += r[key]
+
+    summaries = {}
+    for pair, t in totals.items():
+        n = t["sets"]
+        mean = t["diff"] / n
+        variance = max(t["diff_sq"] / n - mean**2, 0) * n / max(n - 1, 1)
+        summaries[pair] = {
+            "sets": n,
+            "score": (t["wins"] + t["draws"] / 2) / n,
+            "mean_diff": mean,
+            "stderr": math.sqrt(variance / n),
+        }
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m lib.evaluation.tournament",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument("entrants", nargs="+", help=f"policy files, '{RANDOM}' or {', '.join(AGENTS)}")
+    parser.add_argument("--players", type=int, default=2, choices=[2, 4])
+    parser.add_argument("--format", default="round-robin", choices=FORMATS)
+    parser.add_argument("--sets", type=int, default=1000, help="sets per pairing (per round for swiss)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=256, help="sets per task")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--backend", default="auto", choices=BACKENDS)
+    parser.add_argument("--results", default=None, help="JSONL file to append to and resume from")
+    args = parser.parse_args()
+
+    ratings, results = run_tournament(
+        args.entrants,
+        num_players=args.players,
+        tournament_format=args.format,
+        sets=args.sets,
+        rounds=args.rounds,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        first_seed=args.first_seed,
+        results_path=args.results,
+        backend=args.backend,
+    )
+    print("Ratings:")
+    for spec, (elo, interval) in sorted(ratings.items(), key=lambda item: -item[1][0]):
+        print(f"\t{entrant_name(spec):<50}{elo:8.0f} ± {interval:.0f}")
+    print("Pairings:")
+    for (a, b), s in pair_summaries(results).items():
+        print(
+            f"\t{entrant_name(a)} vs {entrant_name(b)}: {s['score']:.1%} of {s['sets']} sets, "
+            f"{s['mean_diff']:+.2f} ± {s['stderr']:.2f} points/set"
+        )
+
+
+if __name__ == "__main__":
+    main()
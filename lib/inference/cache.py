@@ -0,0 +1,301 @@
+"""
+Cache of deterministic policy actions by observation.
+
+With deterministic=True a policy's action only depends on the observation,
+the action mask and the weights, and positions repeat a lot across seeds,
+duplicate deals and served games. PolicyCache stores actions under a key
+of the observation bytes, the packed mask and a policy version; CachedPolicy
+puts one in front of any Policy.
+"""
+import contextlib
+import hashlib
+import math
+import multiprocessing as mp
+import os
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from lib.briscola.core import NUM_CARDS
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.inference.policy import Policy, load_policy
+from lib.shared_arrays import SharedArrays
+
+VERSION_BYTES = 8
+FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+FNV_PRIME = np.uint64(0x100000001B3)
+MIX = np.uint64(0xFF51AFD7ED558CCD)
+
+
+def row_hash(rows: np.ndarray) -> np.ndarray:
+    """
+    64-bit hash of each row of a (N, W) uint8 array, W a multiple of 8.
+    """
+    words = np.ascontiguousarray(rows).view(np.uint64)
+    h = np.full(len(rows), FNV_OFFSET, dtype=np.uint64)
+    for i in range(words.shape[1]):
+        h ^= words[:, i]
+        h *= FNV_PRIME
+    h ^= h >> np.uint64(33)
+    h *= MIX
+    h ^= h >> np.uint64(33)
+    return h
+
+
+def file_version(path: str) -> bytes:
+    """
+    Version of a policy file, changing whenever the file is rewritten.
+    """
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.blake2b(key.encode(), digest_size=VERSION_BYTES).digest()
+
+
+def name_version(name: str) -> bytes:
+    return hashlib.blake2b(name.encode(), digest_size=VERSION_BYTES).digest()
+
+
+class PolicyCache:
+    """
+    Bounded cache of actions keyed by observation, action mask and policy
+    version, for uint8 observations.
+
+    Entries live in fixed arrays as a set-associative table: a key hashes
+    to a set of `ways` entries and replaces the least recently used one
+    there, so the cache holds `capacity` entries and every batch is looked
+    up with array operations. With `shared=True` the table is in shared
+    memory and the cache can be handed to worker processes (pickled into
+    their initargs); all of them then share hits. Lookups take no lock:
+    every entry carries a hash of itself, so an entry read while another
+    process writes it counts as a miss. `stats()` reports hits, misses and
+    evictions summed over every process using the cache.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1 << 16,
+        obs_size: int = EMBEDDING_SHAPE[0],
+        num_actions: int = NUM_CARDS,
+        ways: int = 8,
+        shared: bool = False,
+    ):
+        if capacity < 1:
+            raise ValueError(f"Invalid capacity: {capacity}")
+        if ways < 1:
+            raise ValueError(f"Invalid ways: {ways}")
+        self.obs_size = obs_size
+        self.num_actions = num_actions
+        self.ways = ways
+        self.num_sets = -(-capacity // ways)
+        self.capacity = self.num_sets * ways
+        # Key, then the action byte, padded to whole words for hashing
+        self.action_byte = obs_size + math.ceil(num_actions / 8) + VERSION_BYTES
+        self.width = -(-(self.action_byte + 1) // 8) * 8
+        self.shared = shared
+        self._lock = mp.Lock() if shared else None
+        # The creating process frees the shared table, even if others fork
+        self._owner = os.getpid()
+        self._attach(None)
+
+    def layout(self) -> dict:
+        return {
+            "rows": (np.uint8, (self.num_sets, self.ways, self.width)),
+            "checks": (np.uint64, (self.num_sets, self.ways)),
+            "stamps": (np.int64, (self.num_sets, self.ways)),
+            # hits, misses, evictions
+            "counters": (np.int64, (3,)),
+        }
+
+    def _attach(self, name: Optional[str]):
+        layout = self.layout()
+        if self.shared:
+            self._arrays = SharedArrays(layout, name)
+            if name is None:
+                for array in self._arrays.arrays.values():
+                    array[...] = 0
+            arrays = self._arrays.arrays
+        else:
+            self._arrays = None
+            arrays = {key: np.zeros(shape, dtype=dtype) for key, (dtype, shape) in layout.items()}
+        self.rows = arrays["rows"]
+        self.checks = arrays["checks"]
+        self.stamps = arrays["stamps"]
+        self.counters = arrays["counters"]
+
+    def __getstate__(self):
+        if not self.shared:
+            raise Exception("only shared caches can be passed to other processes")
+        state = {key: value for key, value in self.__dict__.items() if key not in ["rows", "checks", "stamps", "counters"]}
+        state["_arrays"] = self._arrays.name
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop("_arrays")
+        self.__dict__.update(state)
+        self._attach(name)
+
+    def _locked(self):
+        return self._lock if self._lock is not None else contextlib.nullcontext()
+
+    def keys(self, observations: np.ndarray, action_masks: np.ndarray, version: bytes) -> np.ndarray:
+        """
+        (N, width) key rows, with the action byte left at 0.
+        """
+        if observations.dtype != np.uint8:
+            raise ValueError(f"Expected uint8 observations, got {observations.dtype}")
+        n = len(observations)
+        keys = np.zeros((n, self.width), dtype=np.uint8)
+        keys[:, : self.obs_size] = observations
+        masks = np.packbits(action_masks != 0, axis=1)
+        end = self.obs_size + masks.shape[1]
+        keys[:, self.obs_size : end] = masks
+        keys[:, end : self.action_byte] = np.frombuffer(version, dtype=np.uint8)
+        return keys
+
+    def lookup(self, keys: np.ndarray):
+        """
+        Cached action per key row, -1 for misses, and the set of each key.
+        """
+        sets = (row_hash(keys) % np.uint64(self.num_sets)).astype(np.intp)
+        candidates = self.rows[sets]
+        match = (candidates[:, :, : self.action_byte] == keys[:, None, : self.action_byte]).all(axis=2)
+        way = match.argmax(axis=1)
+        hit = np.flatnonzero(match.any(axis=1))
+        found = candidates[hit, way[hit]]
+        # Entries torn by a concurrent write fail their hash
+        valid = row_hash(found) == self.checks[sets[hit], way[hit]]
+        hit = hit[valid]
+        actions = np.full(len(keys), -1, dtype=np.int64)
+        actions[hit] = found[valid, self.action_byte]
+        self.stamps[sets[hit], way[hit]] = time.monotonic_ns()
+        return actions, sets
+
+    def insert(self, keys: np.ndarray, sets: np.ndarray, actions: np.ndarray) -> int:
+        """
+        Store actions for key rows in their sets, each replacing the least
+        recently used entry. Returns the number of entries evicted.
+        """
+        _, unique = np.unique(keys, axis=0, return_index=True)
+        rows = keys[unique].copy()
+        rows[:, self.action_byte] = actions[unique]
+        sets = sets[unique]
+        checks = row_hash(rows)
+        evicted = 0
+        with self._locked():
+            # One entry per set at a time, so keys of a set get different ways
+            pending = np.arange(len(rows))
+            while len(pending):
+                _, first = np.unique(sets[pending], return_index=True)
+                batch = pending[first]
+                pending = np.delete(pending, first)
+                batch_sets = sets[batch]
+                victims = self.stamps[batch_sets].argmin(axis=1)
+                evicted += int((self.stamps[batch_sets, victims] != 0).sum())
+                self.rows[batch_sets, victims] = rows[batch]
+                self.checks[batch_sets, victims] = checks[batch]
+                self.stamps[batch_sets, victims] = time.monotonic_ns()
+        return evicted
+
+    def get(self, observations: np.ndarray, action_masks: np.ndarray, version: bytes, compute) -> np.ndarray:
+        """
+        Actions for a (N, obs) batch, calling `compute(observations,
+        action_masks)` for the misses only.
+        """
+        keys = self.keys(observations, action_masks, version)
+        actions, sets = self.lookup(keys)
+        miss = np.flatnonzero(actions < 0)
+        evicted = 0
+        if len(miss):
+            actions[miss] = compute(observations[miss], action_masks[miss])
+            evicted = self.insert(keys[miss], sets[miss], actions[miss])
+        with self._locked():
+            self.counters += [len(actions) - len(miss), len(miss), evicted]
+        return actions
+
+    def clear(self) -> None:
+        with self._locked():
+            self.rows[...] = 0
+            self.checks[...] = 0
+            self.stamps[...] = 0
+
+    def stats(self) -> Dict:
+        hits, misses, evictions = (int(c) for c in self.counters)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size": int((self.stamps != 0).sum()),
+            "capacity": self.capacity,
+        }
+
+    def close(self) -> None:
+        """
+        Detach from the shared table, freeing it in the creating process.
+        """
+        if self._arrays is None:
+            return
+        self.rows = self.checks = self.stamps = self.counters = None
+        self._arrays.close()
+        if self._owner == os.getpid():
+            self._arrays.unlink()
+        self._arrays = None
+
+
+class CachedPolicy(Policy):
+    """
+    Policy answering deterministic predictions with masks from a
+    PolicyCache and the rest from `policy`.
+
+    Loaded with `CachedPolicy.load`, the policy file is checked at most
+    every `check_every` seconds and reloaded when it changes; the file's
+    version is part of every key, so entries of the old weights are never
+    hit again and age out of the cache.
+    """
+
+    def __init__(
+        self,
+        policy: Policy,
+        cache: PolicyCache,
+        path: Optional[str] = None,
+        backend: str = "auto",
+        check_every: float = 1.0,
+    ):
+        self.policy = policy
+        self.cache = cache
+        self.path = path
+        self.backend = backend
+        self.check_every = check_every
+        self.version = name_version(type(policy).__name__) if path is None else file_version(path)
+        self.reloads = 0
+        self._next_check = time.monotonic() + check_every
+
+    @classmethod
+    def load(cls, path: str, cache: PolicyCache, backend: str = "auto", check_every: float = 1.0) -> "CachedPolicy":
+        return cls(load_policy(path, backend), cache, path, backend, check_every)
+
+    def _check_file(self):
+        now = time.monotonic()
+        if self.path is None or now < self._next_check:
+            return
+        self._next_check = now + self.check_every
+        version = file_version(self.path)
+        if version != self.version:
+            self.policy = load_policy(self.path, self.backend)
+            self.version = version
+            self.reloads += 1
+
+    def _compute(self, observations: np.ndarray, action_masks: np.ndarray) -> np.ndarray:
+        return self.policy.predict(observations, action_masks=action_masks, deterministic=True)[0]
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        if not deterministic or action_masks is None:
+            return self.policy.predict(observation, state, episode_start, deterministic, action_masks=action_masks)
+        self._check_file()
+        observation = np.asarray(observation)
+        single = observation.ndim == 1
+        observations = observation.reshape(-1, observation.shape[-1])
+        masks = np.asarray(action_masks).reshape(len(observations), -1)
+        actions = self.cache.get(observations, masks, self.version, self._compute)
+        return (actions[0] if single else actions), None
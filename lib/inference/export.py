@@ -0,0 +1,251 @@
+"""
+Export a trained policy to ONNX and check the result.
+
+    python -m lib.inference.export models/briscola_4p.zip
+
+Writes `<name>.onnx` with a dynamic batch axis and an `action_mask` input
+masked inside the graph, after onnxruntime's offline graph optimizations,
+then `<name>-int8.onnx` (dynamic int8 quantization of the weights) and
+`<name>-fp16.onnx` (fp16 weights and activations, fp32 inputs and
+outputs). Each variant is scored on positions from random games: the rate
+at which its deterministic action agrees with the torch policy, and
+predictions/sec at batch sizes 1, 64 and 1024. The report goes next to
+the models as `<name>-export.json`.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+import torch as th
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from onnxruntime.transformers.float16 import convert_float_to_float16
+from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+
+from lib.briscola.core import NUM_CARDS
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.policy import OnnxPolicy, Policy, SB3Policy, TorchPolicy
+from lib.onnxable import OnnxableMaskableACPolicy
+
+VARIANTS = ["fp32", "int8", "fp16"]
+BATCH_SIZES = [1, 64, 1024]
+OPSET = 17
+
+
+def load_reference(path: str) -> Tuple[Policy, MaskableActorCriticPolicy]:
+    """
+    A MaskablePPO checkpoint (.zip) or saved policy (.pt) as a Policy, and
+    its policy network.
+    """
+    if path.endswith(".pt"):
+        policy = TorchPolicy(path)
+        return policy, policy.policy
+    policy = SB3Policy(path)
+    return policy, policy.model.policy
+
+
+def export_onnx(policy: MaskableActorCriticPolicy, path: str, mask: bool = True) -> None:
+    """
+    Export `policy` with a dynamic batch axis, taking an `action_mask`
+    input (1 legal, 0 not) unless `mask` is False.
+    """
+    observation = th.zeros((1,) + policy.observation_space.shape)
+    inputs = ["input"]
+    args: Tuple[th.Tensor, ...] = (observation,)
+    if mask:
+        inputs.append("action_mask")
+        args += (th.ones(1, NUM_CARDS),)
+    policy.set_training_mode(False)
+    with th.no_grad():
+        th.onnx.export(
+            OnnxableMaskableACPolicy(policy),
+            args,
+            path,
+            opset_version=OPSET,
+            input_names=inputs,
+            output_names=["dist", "values"],
+            dynamic_axes={name: {0: "batch"} for name in inputs + ["dist", "values"]},
+            dynamo=False,
+        )
+
+
+def optimize_onnx(path: str, output: str) -> None:
+    """
+    Save the graph after onnxruntime's extended optimizations: constant
+    folding, redundant node removal and operator fusion, which don't
+    depend on the machine. Layout optimizations are left to load time.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = output
+    ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def quantize_int8(path: str, output: str) -> None:
+    """
+    Dynamic quantization: int8 weights, activations quantized per batch.
+    """
+    quantize_dynamic(path, output, weight_type=QuantType.QInt8)
+
+
+def convert_fp16(path: str, output: str) -> None:
+    """
+    fp16 weights and activations, keeping fp32 inputs and outputs so the
+    model drops in for the fp32 one.
+    """
+    onnx.save(convert_float_to_float16(onnx.load(path), keep_io_types=True), output)
+
+
+def sample_positions(num_players: int, count: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `count` observations and action masks from games of random legal moves.
+    """
+    env = BriscolaVecEnv(min(count, 64), num_players=num_players)
+    env.seed(seed)
+    rng = np.random.default_rng(seed)
+    observations = [env.reset()]
+    masks = [env.action_masks()]
+    while len(observations) * env.num_envs < count:
+        obs, _, _, _ = env.step(((rng.random(masks[-1].shape) + 1) * masks[-1]).argmax(axis=1))
+        observations.append(obs)
+        masks.append(env.action_masks())
+    return np.concatenate(observations)[:count], np.concatenate(masks)[:count]
+
+
+def agreement(policy: Policy, expected: np.ndarray, observations: np.ndarray, masks: np.ndarray) -> float:
+    """
+    Fraction of positions where `policy` picks the `expected` action.
+    """
+    actions, _ = policy.predict(observations, action_masks=masks, deterministic=True)
+    return float((actions == expected).mean())
+
+
+def throughput(policy: Policy, observations: np.ndarray, masks: np.ndarray, batch_size: int, min_time: float) -> float:
+    """
+    Deterministic predictions/sec on batches of `batch_size` positions.
+    """
+    starts = range(0, len(observations) - batch_size + 1, batch_size)
+    predictions = 0
+    start = time.perf_counter()
+    while True:
+        for i in starts:
+            policy.predict(observations[i : i + batch_size], action_masks=masks[i : i + batch_size])
+        predictions += len(starts) * batch_size
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return predictions / elapsed
+
+
+def export_policy(
+    path: str,
+    out_dir: str = "models",
+    num_players: int = 4,
+    positions: int = 4096,
+    batch_sizes: Sequence[int] = BATCH_SIZES,
+    min_time: float = 1.0,
+    mask: bool = True,
+) -> Dict:
+    """
+    Export, optimize and quantize the policy at `path`, score every variant
+    against the torch policy and save the report. Returns the report.
+    """
+    if positions < max(batch_sizes):
+        raise ValueError(f"Need at least {max(batch_sizes)} positions, got {positions}")
+    name = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "fp32": os.path.join(out_dir, f"{name}.onnx"),
+        "int8": os.path.join(out_dir, f"{name}-int8.onnx"),
+        "fp16": os.path.join(out_dir, f"{name}-fp16.onnx"),
+    }
+
+    reference, network = load_reference(path)
+    if network.observation_space.shape != EMBEDDING_SHAPE:
+        raise ValueError(f"{path} observes {network.observation_space.shape}, the env gives {EMBEDDING_SHAPE}")
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "raw.onnx")
+        export_onnx(network, raw, mask=mask)
+        onnx.checker.check_model(raw)
+        # Quantize from the plain export, then optimize every variant alike
+        converted = {"fp32": raw, "int8": os.path.join(tmp, "int8.onnx"), "fp16": os.path.join(tmp, "fp16.onnx")}
+        quantize_int8(raw, converted["int8"])
+        convert_fp16(raw, converted["fp16"])
+        for variant in VARIANTS:
+            optimize_onnx(converted[variant], paths[variant])
+
+    observations, masks = sample_positions(num_players, positions)
+    expected, _ = reference.predict(observations, action_masks=masks, deterministic=True)
+    report = {
+        "source": path,
+        "players": num_players,
+        "positions": positions,
+        "masked_in_graph": mask,
+        "batch_sizes": list(batch_sizes),
+        "torch": {"throughput": {str(b): throughput(reference, observations, masks, b, min_time) for b in batch_sizes}},
+        "variants": {},
+    }
+    for variant in VARIANTS:
+        policy = OnnxPolicy(paths[variant])
+        report["variants"][variant] = {
+            "path": paths[variant],
+            "bytes": os.path.getsize(paths[variant]),
+            "agreement": agreement(policy, expected, observations, masks),
+            "throughput": {str(b): throughput(policy, observations, masks, b, min_time) for b in batch_sizes},
+        }
+
+    report_path = os.path.join(out_dir, f"{name}-export.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    report["report"] = report_path
+    return report
+
+
+def format_report(report: Dict) -> List[str]:
+    sizes = report["batch_sizes"]
+    lines = ["variant    size KB  agreement  " + "  ".join(f"{f'batch {b}/s':>12}" for b in sizes)]
+    rates = report["torch"]["throughput"]
+    lines.append(f"{'torch':8s} {'':>9s}  {'':>9s}  " + "  ".join(f"{rates[str(b)]:12,.0f}" for b in sizes))
+    for variant, result in report["variants"].items():
+        rates = result["throughput"]
+        lines.append(
+            f"{variant:8s} {result['bytes'] / 1024:9.1f}  {result['agreement']:9.2%}  "
+            + "  ".join(f"{rates[str(b)]:12,.0f}" for b in sizes)
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m lib.inference.export",
+        description="Export a policy to ONNX with int8 and fp16 variants, and check them.",
+    )
+    parser.add_argument("model", help="MaskablePPO checkpoint .zip or policy .pt")
+    parser.add_argument("--out-dir", default="models")
+    parser.add_argument("--players", type=int, default=4, choices=[2, 4], help="players in the sampled games")
+    parser.add_argument("--positions", type=int, default=4096, help="positions to check accuracy and speed on")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per throughput measurement")
+    parser.add_argument("--no-mask", action="store_true", help="export without the action_mask input")
+    args = parser.parse_args()
+
+    report = export_policy(
+        args.model,
+        out_dir=args.out_dir,
+        num_players=args.players,
+        positions=args.positions,
+        batch_sizes=args.batch_sizes,
+        min_time=args.min_time,
+        mask=not args.no_mask,
+    )
+    print("\n".join(format_report(report)))
+    print(f"Report saved to {report['report']}")
+
+
+if __name__ == "__main__":
+    main()
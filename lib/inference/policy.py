@@ -0,0 +1,214 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from lib.briscola_env.canonical import canonicalize, restore_actions
+
+BACKENDS = ["auto", "sb3", "torch", "onnx"]
+
+
+class Policy:
+    """
+    Maps observations and action masks to actions.
+
+    `predict` follows MaskablePPO.predict, so a Policy can stand in for a
+    loaded model: it takes one observation or a (N, obs) batch and returns
+    (actions, None).
+    """
+
+    def predict(
+        self,
+        observation: np.ndarray,
+        state=None,
+        episode_start=None,
+        deterministic: bool = True,
+        action_masks: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, None]:
+        raise NotImplementedError()
+
+
+class SB3Policy(Policy):
+    """
+    MaskablePPO checkpoint (.zip), imports torch.
+    """
+
+    def __init__(self, path: str, device: str = "cpu"):
+        from sb3_contrib import MaskablePPO
+
+        self.path = path
+        self.model = MaskablePPO.load(path, device=device)
+        self.observation_shape = self.model.observation_space.shape
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        return self.model.predict(
+            observation, state, episode_start, deterministic, action_masks=action_masks
+        )
+
+
+class TorchPolicy(Policy):
+    """
+    Policy network saved on its own with `model.policy.save(path)` (.pt).
+    Loads without the optimizer or rollout settings of a full checkpoint and
+    always runs in eval mode without gradients, imports torch.
+    """
+
+    def __init__(self, path: str, device: str = "cpu"):
+        from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+
+        self.path = path
+        self.policy = MaskableActorCriticPolicy.load(path, device=device)
+        self.policy.set_training_mode(False)
+        self.observation_shape = self.policy.observation_space.shape
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        return self.policy.predict(
+            observation, state, episode_start, deterministic, action_masks=action_masks
+        )
+
+
+class OnnxPolicy(Policy):
+    """
+    ONNX export of OnnxableMaskableACPolicy run through onnxruntime.
+
+    The `dist` output is masked outside the graph, so models exported with
+    or without an `action_mask` input both work. Input and output buffers
+    are bound once and reused across calls, growing with the batch size.
+    """
+
+    def __init__(self, path: str, threads: int = 1, seed: Optional[int] = None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        inputs = {i.name: i for i in self.session.get_inputs()}
+        observation_input = inputs["input"]
+        self.observation_shape = tuple(observation_input.shape[1:])
+        # Older exports have a fixed batch of 1
+        batch = observation_input.shape[0]
+        self.max_batch = batch if isinstance(batch, int) else None
+        self.mask_input = "action_mask" in inputs
+        self.outputs = {o.name: o for o in self.session.get_outputs()}
+        self.num_actions = self.outputs["dist"].shape[-1]
+
+        self.binding = self.session.io_binding()
+        self.capacity = 0
+        self.rng = np.random.default_rng(seed)
+
+    def _reserve(self, n: int):
+        if n <= self.capacity:
+            return
+        capacity = max(1, self.capacity)
+        while capacity < n:
+            capacity *= 2
+        self.observations = np.zeros((capacity,) + self.observation_shape, dtype=np.float32)
+        self.masks = np.ones((capacity, self.num_actions), dtype=np.float32)
+        self.dist = np.zeros((capacity, self.num_actions), dtype=np.float32)
+        self.values = np.zeros((capacity, 1), dtype=np.float32)
+        self.capacity = capacity
+
+    def _run(self, start: int, end: int):
+        binding = self.binding
+        binding.bind_cpu_input("input", self.observations[start:end])
+        if self.mask_input:
+            binding.bind_cpu_input("action_mask", self.masks[start:end])
+        for name, buffer in (("dist", self.dist), ("values", self.values)):
+            if name not in self.outputs:
+                continue
+            out = buffer[start:end]
+            binding.bind_output(name, "cpu", 0, np.float32, list(out.shape), out.ctypes.data)
+        self.session.run_with_iobinding(binding)
+
+    def action_probs(self, observations: np.ndarray, action_masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        (N, actions) probabilities, zeroed for masked actions. The array is
+        reused by the next call.
+        """
+        n = len(observations)
+        self._reserve(n)
+        self.observations[:n] = observations
+        if action_masks is not None:
+            self.masks[:n] = action_masks
+        else:
+            self.masks[:n] = 1
+
+        step = self.max_batch or n
+        for start in range(0, n, step):
+            self._run(start, min(start + step, n))
+
+        probs = self.dist[:n]
+        if action_masks is not None:
+            probs[self.masks[:n] == 0] = 0
+        return probs
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        observation = np.asarray(observation)
+        single = observation.ndim == len(self.observation_shape)
+        observations = observation.reshape((-1,) + self.observation_shape)
+        masks = None
+        if action_masks is not None:
+            masks = np.asarray(action_masks).reshape(len(observations), -1)
+
+        probs = self.action_probs(observations, masks)
+        if deterministic:
+            # Fall back to the first legal action if every legal prob underflowed
+            scores = probs if masks is None else np.where(masks != 0, probs, -1)
+            actions = scores.argmax(axis=1)
+        else:
+            cumulative = probs.cumsum(axis=1)
+            draws = self.rng.random(len(probs)) * cumulative[:, -1]
+            actions = np.minimum((cumulative <= draws[:, None]).sum(axis=1), self.num_actions - 1)
+            if masks is not None:
+                # Like above, the first legal action when no legal prob is left
+                empty = cumulative[:, -1] <= 0
+                actions[empty] = (masks[empty] != 0).argmax(axis=1)
+        return (actions[0] if single else actions), None
+
+
+class CanonicalPolicy(Policy):
+    """
+    Runs `policy` on suit-canonical observations and masks (see
+    lib.briscola_env.canonical) and maps its actions back, for policies
+    trained with `canonical=True` envs. Any other policy then sees
+    relabelled observations and plays differently. In front of a
+    CachedPolicy of a canonically trained policy, positions equal up to
+    suits share cache entries.
+    """
+
+    def __init__(self, policy: Policy):
+        self.policy = policy
+        self.observation_shape = getattr(policy, "observation_shape", None)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        observation = np.asarray(observation)
+        single = observation.ndim == 1
+        observations = observation.reshape(-1, observation.shape[-1])
+        masks = None if action_masks is None else np.asarray(action_masks).reshape(len(observations), -1)
+        observations, masks, perms = canonicalize(observations, masks)
+        actions, _ = self.policy.predict(observations, state, episode_start, deterministic, action_masks=masks)
+        actions = restore_actions(actions, perms)
+        return (actions[0] if single else actions), None
+
+
+def load_policy(path: str, backend: str = "auto", **kwargs) -> Policy:
+    """
+    Load a policy file, picking the backend from the extension for "auto".
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend: {backend}")
+    if backend == "auto":
+        if path.endswith(".onnx"):
+            backend = "onnx"
+        elif path.endswith(".pt"):
+            backend = "torch"
+        else:
+            backend = "sb3"
+    if backend == "onnx":
+        return OnnxPolicy(path, **kwargs)
+    if backend == "torch":
+        return TorchPolicy(path, **kwargs)
+    return SB3Policy(path, **kwargs)
@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from importlib import import_module
+from typing import Dict, List, Optional, Tuple
+
+# (module, class, method, phase). Methods are only wrapped while enabled, so
+# disabled instrumentation costs nothing on the hot path.
+DEFAULT_TARGETS = [
+    ("lib.briscola.game", "BriscolaGame", "play", "game.play"),
+    ("lib.briscola.game", "BriscolaGame", "score_trick", "game.score_trick"),
+    ("lib.briscola.game", "BriscolaGame", "redeal", "game.redeal"),
+    ("lib.briscola_env.briscola_env", "BriscolaEnv", "step", "env.step"),
+    ("lib.briscola_env.briscola_env", "BriscolaEnv", "observe", "env.observe"),
+    ("lib.action_mask_wrapper", "SB3ActionMaskWrapper", "step", "wrapper.step"),
+    ("lib.action_mask_wrapper", "SB3ActionMaskWrapper", "observe", "wrapper.observe"),
+    ("lib.action_mask_wrapper", "SB3ActionMaskWrapper", "action_mask", "wrapper.action_mask"),
+    ("sb3_contrib", "MaskablePPO", "predict", "model.predict"),
+    ("sb3_contrib", "MaskablePPO", "collect_rollouts", "ppo.collect_rollouts"),
+    ("sb3_contrib", "MaskablePPO", "train", "ppo.train"),
+    (
+        "sb3_contrib.common.maskable.policies",
+        "MaskableActorCriticPolicy",
+        "forward",
+        "policy.forward",
+    ),
+]
+
+
+class PhaseStats:
+    """
+    Call counts and cumulative wall-clock seconds per phase. Timings are
+    inclusive, so env.step contains the game.* phases it calls.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.seconds: Dict[str, float] = defaultdict(float)
+
+    def snapshot(self) -> Dict[str, Tuple[int, float]]:
+        return {phase: (self.calls[phase], self.seconds[phase]) for phase in sorted(self.calls)}
+
+    def reset(self):
+        # Cleared in place, the timed wrappers hold on to these dicts
+        self.calls.clear()
+        self.seconds.clear()
+
+
+stats = PhaseStats()
+_patched: List[Tuple[type, str, object]] = []
+
+
+def _timed(fn, phase: str):
+    calls = stats.calls
+    seconds = stats.seconds
+    clock = time.perf_counter
+
+    @wraps(fn)
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds[phase] += clock() - start
+            calls[phase] += 1
+
+    return timed
+
+
+def enable(targets=DEFAULT_TARGETS):
+    """
+    Start timing the methods in `targets`. Targets whose module can't be
+    imported are skipped.
+    """
+    if _patched:
+        return
+    for module_name, class_name, method, phase in targets:
+        try:
+            cls = getattr(import_module(module_name), class_name)
+        except ImportError:
+            continue
+        original = cls.__dict__.get(method)
+        if original is None:
+            original = getattr(cls, method)
+        _patched.append((cls, method, cls.__dict__.get(method)))
+        setattr(cls, method, _timed(original, phase))
+
+
+def disable():
+    """
+    Restore the original methods.
+    """
+    while _patched:
+        cls, method, original = _patched.pop()
+        if original is None:
+            delattr(cls, method)
+        else:
+            setattr(cls, method, original)
+
+
+def is_enabled() -> bool:
+    return bool(_patched)
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval and writes folded
+    stacks ("root;caller;callee count" per line), the input format of
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[fold(frame)] += 1
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name}@{os.path.basename(code.co_filename)}:{code.co_firstlineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
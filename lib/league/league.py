@@ -0,0 +1,128 @@
+from typing import List, Optional
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+from lib.inference.policy import Policy
+from lib.league.pool import SnapshotPool
+from lib.league.ratings import EloTable
+
+LEARNER = "learner"
+RANDOM = "random"
+
+
+class RandomPolicy(Policy):
+    """
+    Uniformly random legal actions, the rating anchor of every league.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        masks = np.asarray(action_masks)
+        single = masks.ndim == 1
+        masks = masks.reshape(-1, masks.shape[-1])
+        actions = ((self.rng.random(masks.shape) + 1) * masks).argmax(axis=1)
+        return (actions[0] if single else actions), None
+
+
+class League:
+    """
+    Frozen past policies for the seats the learner doesn't play.
+
+    Opponents are drawn from the snapshots in `pool` plus a random player,
+    weighted by p * (1 - p) where p is the learner's expected score against
+    them, so evenly matched opponents are picked most. Games only draw from
+    an active set of at most `pool.max_loaded` snapshots, picked the same
+    way and redrawn by `refresh` (every rollout with LeagueCallback), so a
+    rollout never needs more snapshots than the pool keeps loaded. Every
+    finished game updates the learner's Elo against each opponent it faced.
+    """
+
+    def __init__(self, pool: SnapshotPool, ratings: Optional[EloTable] = None, seed=None):
+        self.pool = pool
+        self.ratings = EloTable() if ratings is None else ratings
+        # Independent streams for drawing opponents and the random player's moves
+        sampling, moves = np.random.SeedSequence(seed).spawn(2)
+        self.rng = np.random.default_rng(sampling)
+        self.random_policy = RandomPolicy(moves)
+        self.active: Optional[List[str]] = None
+        for name in [LEARNER, RANDOM] + pool.names:
+            self.ratings.rating(name)
+
+    def snapshot(self, model) -> str:
+        """
+        Add the current learner to the pool, starting at its rating.
+        """
+        name = self.pool.add(model)
+        self.ratings.add(name, self.ratings.rating(LEARNER))
+        self.refresh()
+        return name
+
+    def opponents(self) -> List[str]:
+        return [RANDOM] + self.pool.names
+
+    def _weights(self, names: List[str]) -> np.ndarray:
+        expected = np.array([self.ratings.expected(LEARNER, name) for name in names])
+        weights = expected * (1 - expected) + 1e-3
+        return weights / weights.sum()
+
+    def refresh(self) -> None:
+        """
+        Redraw the active snapshots on the next `sample_opponents`.
+        """
+        self.active = None
+
+    def sample_opponents(self, n: int) -> List[str]:
+        if self.active is None:
+            names = self.pool.names
+            k = min(self.pool.max_loaded, len(names))
+            picks = self.rng.choice(len(names), size=k, replace=False, p=self._weights(names)) if k else []
+            self.active = [names[i] for i in picks]
+        names = [RANDOM] + self.active
+        picks = self.rng.choice(len(names), size=n, p=self._weights(names))
+        return [names[i] for i in picks]
+
+    def policy(self, name: str) -> Policy:
+        if name == RANDOM:
+            return self.random_policy
+        return self.pool.get(name)
+
+    def record(self, opponent: str, score: float):
+        """
+        Result of the learner against `opponent`, 1 for a win down to 0.
+        """
+        self.ratings.update(LEARNER, opponent, score)
+
+
+class LeagueCallback(BaseCallback):
+    """
+    Snapshots the learner into `league` every `snapshot_every` timesteps,
+    redraws the active opponents at the start of each rollout and logs the
+    learner's rating and the pool size at the end of it.
+    """
+
+    def __init__(self, league: League, snapshot_every: int = 50_000, verbose: int = 0):
+        super().__init__(verbose)
+        self.league = league
+        self.snapshot_every = snapshot_every
+        self.last_snapshot = 0
+
+    def _on_rollout_start(self) -> None:
+        self.league.refresh()
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps - self.last_snapshot >= self.snapshot_every:
+            self.league.snapshot(self.model)
+            self.last_snapshot = self.num_timesteps
+        return True
+
+    def _on_rollout_end(self) -> None:
+        ratings = self.league.ratings
+        pool = self.league.pool
+        self.logger.record("league/learner_elo", ratings.rating(LEARNER))
+        self.logger.record("league/random_elo", ratings.rating(RANDOM))
+        self.logger.record("league/snapshots", len(pool))
+        self.logger.record("league/loaded", len(pool.loaded))
+        self.logger.record("league/evictions", pool.evictions)
@@ -0,0 +1,69 @@
+import os
+from collections import OrderedDict
+from typing import List
+
+from lib.inference.policy import Policy, load_policy
+
+SNAPSHOT_EXTENSIONS = (".pt", ".onnx", ".zip")
+
+
+class SnapshotPool:
+    """
+    Policy snapshots stored as files in `directory`, at most `max_loaded` of
+    which are held in memory. `get` loads a snapshot on first use and evicts
+    the least recently used one, so memory stays bounded however many
+    snapshots are on disk.
+
+    New snapshots are saved policy-only (`model.policy.save`), which loads in
+    a fraction of the time of a full MaskablePPO checkpoint. ONNX and .zip
+    files dropped into the directory are picked up as well.
+    """
+
+    def __init__(self, directory: str, max_loaded: int = 8, backend: str = "auto", **load_kwargs):
+        if max_loaded < 1:
+            raise ValueError(f"Invalid max_loaded: {max_loaded}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self.backend = backend
+        self.load_kwargs = load_kwargs
+        self.names: List[str] = sorted(
+            name for name in os.listdir(directory) if name.endswith(SNAPSHOT_EXTENSIONS)
+        )
+        self.loaded: "OrderedDict[str, Policy]" = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def add(self, model) -> str:
+        """
+        Save the policy of a MaskablePPO `model` as a new snapshot.
+        """
+        index = len(self.names)
+        while f"snapshot_{index:06d}.pt" in self.names:
+            index += 1
+        name = f"snapshot_{index:06d}.pt"
+        model.policy.save(self.path(name))
+        self.names.append(name)
+        return name
+
+    def get(self, name: str) -> Policy:
+        policy = self.loaded.get(name)
+        if policy is not None:
+            self.loaded.move_to_end(name)
+            return policy
+        if name not in self.names:
+            raise KeyError(name)
+
+        while len(self.loaded) >= self.max_loaded:
+            self.loaded.popitem(last=False)
+            self.evictions += 1
+        policy = load_policy(self.path(name), self.backend, **self.load_kwargs)
+        self.loaded[name] = policy
+        self.loads += 1
+        return policy
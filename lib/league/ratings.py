@@ -0,0 +1,48 @@
+from typing import Dict, List, Optional, Tuple
+
+
+class EloTable:
+    """
+    Elo ratings of named players, updated one pairwise result at a time.
+    Unknown names start at `initial`.
+    """
+
+    def __init__(self, k: float = 16.0, initial: float = 1000.0):
+        self.k = k
+        self.initial = initial
+        self.ratings: Dict[str, float] = {}
+        self.games: Dict[str, int] = {}
+
+    def add(self, name: str, rating: Optional[float] = None):
+        self.ratings[name] = self.initial if rating is None else rating
+        self.games.setdefault(name, 0)
+
+    def rating(self, name: str) -> float:
+        if name not in self.ratings:
+            self.add(name)
+        return self.ratings[name]
+
+    def expected(self, a: str, b: str) -> float:
+        """
+        Expected score of `a` against `b`.
+        """
+        return 1 / (1 + 10 ** ((self.rating(b) - self.rating(a)) / 400))
+
+    def update(self, a: str, b: str, score: float):
+        """
+        Record a result of `a` against `b`: 1 for a win, 0.5 a draw, 0 a loss.
+        """
+        change = self.k * (score - self.expected(a, b))
+        self.ratings[a] += change
+        self.ratings[b] -= change
+        self.games[a] += 1
+        self.games[b] += 1
+
+    def table(self) -> List[Tuple[str, float, int]]:
+        """
+        (name, rating, games) from the highest rating down.
+        """
+        return sorted(
+            ((name, rating, self.games[name]) for name, rating in self.ratings.items()),
+            key=lambda row: -row[1],
+        )
@@ -0,0 +1,122 @@
+from typing import List, Optional
+
+import numpy as np
+
+from lib.briscola_env.embedding import vec_game_embedding
+from lib.briscola_env.vec_env import WIN_REWARD, BriscolaVecEnv
+from lib.league.league import League
+
+
+class LeagueVecEnv(BriscolaVecEnv):
+    """
+    N games where the learner plays one seat and league opponents the rest.
+
+    The learner's seat and the opponent of every other seat are drawn when
+    a game starts. Opponent moves are played in lockstep across games: each
+    round, the games waiting on an opponent are grouped by snapshot and each
+    snapshot predicts its whole group in one batched call. Observations,
+    rewards and infos are all for the learner's seat, with rewards as the
+    learner's running total like BriscolaTrainingEnv.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        league: League,
+        num_players: int = 4,
+        deterministic_opponents: bool = True,
+        recorder=None,
+    ):
+        self.league = league
+        self.deterministic_opponents = deterministic_opponents
+        self.seats = np.zeros(num_envs, dtype=np.int8)
+        self.opponents = np.full((num_envs, num_players), None, dtype=object)
+        super().__init__(num_envs, num_players=num_players, auto_reset=True, recorder=recorder)
+
+    def _reset_games(self, indices: np.ndarray, seeds: List[Optional[int]], options: Optional[List[dict]] = None):
+        super()._reset_games(indices, seeds, options)
+        players = self.num_players
+        for i in indices:
+            self.seats[i] = self._rng.integers(players)
+            names = iter(self.league.sample_opponents(players - 1))
+            for seat in range(players):
+                self.opponents[i, seat] = None if seat == self.seats[i] else next(names)
+        self._play_opponents(np.asarray(indices))
+
+    def reset(self) -> np.ndarray:
+        super().reset()
+        return vec_game_embedding(self.game, self.seats)
+
+    def _advance(self, indices: np.ndarray, actions: np.ndarray):
+        game = self.game
+        game.play(actions, indices)
+        self._record_plays(indices, actions)
+        scored = game.should_score_trick()
+        if scored.any():
+            self._score_tricks(scored)
+        game.redeal(game.needs_redeal())
+
+    def _play_opponents(self, indices: np.ndarray):
+        game = self.game
+        while True:
+            waiting = ~game.game_over()[indices] & (game.action_on[indices] != self.seats[indices])
+            rows = indices[waiting]
+            if len(rows) == 0:
+                return
+            names = self.opponents[rows, game.action_on[rows]]
+            observations = vec_game_embedding(game, game.action_on)[rows]
+            masks = game.action_masks()[rows]
+            actions = np.zeros(len(rows), dtype=np.int8)
+            for name in set(names):
+                group = names == name
+                actions[group], _ = self.league.policy(name).predict(
+                    observations[group],
+                    action_masks=masks[group],
+                    deterministic=self.deterministic_opponents,
+                )
+            self._advance(rows, actions)
+
+    def step_wait(self):
+        game = self.game
+        rows = game.rows
+        seats = self.seats.copy()
+        self._advance(rows, self._actions)
+        self._play_opponents(rows)
+
+        dones = game.game_over()
+        if dones.any():
+            leaders = game.leader()[dones]
+            self.rewards[dones, leaders] += WIN_REWARD
+            self.wins[dones, leaders] += 1
+            self._write_records(np.flatnonzero(dones))
+
+        rewards = self.rewards[rows, seats].copy()
+        infos = [
+            {"tricks": int(self.tricks[i, seats[i]]), "wins": int(self.wins[i, seats[i]])}
+            for i in range(self.num_envs)
+        ]
+        obs = vec_game_embedding(game, seats)
+
+        if dones.any():
+            done_idx = np.flatnonzero(dones)
+            for i in done_idx:
+                self._record_result(i)
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = False
+            self._reset_games(done_idx, [None] * len(done_idx))
+            obs[done_idx] = vec_game_embedding(game, self.seats)[done_idx]
+
+        return obs, rewards, dones, infos
+
+    def _record_result(self, i: int):
+        # Pairwise against each opponent seat, on final points
+        scores = self.game.scores[i]
+        seat = self.seats[i]
+        for other, name in enumerate(self.opponents[i]):
+            if name is None:
+                continue
+            score = 0.5 if scores[seat] == scores[other] else float(scores[seat] > scores[other])
+            self.league.record(name, score)
+
+    def action_masks(self) -> np.ndarray:
+        return self.game.hand_masks(self.seats)
@@ -1,8 +1,11 @@
 from typing import Any, cast
 import mlflow
 import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.logger import KVWriter
 
+from lib import instrumentation
+
 
 class MLflowOutputFormat(KVWriter):
     """
@@ -23,3 +26,31 @@ class MLflowOutputFormat(KVWriter):
 
             if isinstance(value, np.ScalarType) and not isinstance(value, str):
                 mlflow.log_metric(key, float(cast(np.generic, value)), step)
+
+
+class PhaseTimingCallback(BaseCallback):
+    """
+    Records lib.instrumentation phase timings into the model's logger every
+    `log_every` rollouts, so they are dumped next to the PPO metrics through
+    the same output formats (MLflowOutputFormat included).
+    """
+
+    def __init__(self, log_every: int = 1, reset: bool = True, verbose: int = 0):
+        super().__init__(verbose)
+        self.log_every = log_every
+        self.reset = reset
+        self.rollouts = 0
+
+    def _on_rollout_end(self) -> None:
+        self.rollouts += 1
+        if self.rollouts % self.log_every != 0:
+            return
+        for phase, (calls, seconds) in instrumentation.stats.snapshot().items():
+            self.logger.record(f"phases/{phase}/calls", calls)
+            self.logger.record(f"phases/{phase}/total_s", seconds)
+            self.logger.record(f"phases/{phase}/us_per_call", 1e6 * seconds / max(calls, 1))
+        if self.reset:
+            instrumentation.stats.reset()
+
+    def _on_step(self) -> bool:
+        return True
@@ -1,8 +1,11 @@
 import torch as th
-from typing import Tuple
+from typing import Optional, Tuple
 
 from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
 
+# Logit of masked actions: exp underflows to 0, and it still fits in fp16
+MASKED_LOGIT = -1e4
+
 
 class OnnxableMaskableACPolicy(th.nn.Module):
     def __init__(
@@ -14,7 +17,7 @@ class OnnxableMaskableACPolicy(th.nn.Module):
         self.policy = policy
         self.share_features_extractor = share_features_extractor
 
-    def forward(self, obs: th.Tensor) -> Tuple[th.Tensor, th.Tensor]:
+    def forward(self, obs: th.Tensor, action_mask: Optional[th.Tensor] = None) -> Tuple[th.Tensor, th.Tensor]:
         features = self.policy.extract_features(obs)
         if self.share_features_extractor:
             latent_pi, latent_vf = self.policy.mlp_extractor(features)
@@ -25,7 +28,13 @@ class OnnxableMaskableACPolicy(th.nn.Module):
 
         # Evaluate the values for the given observations
         values = self.policy.value_net(latent_vf)
-        distribution = self.policy._get_action_dist_from_latent(latent_pi)
-        action_likelihoods = distribution.distribution.probs
+        if action_mask is None:
+            distribution = self.policy._get_action_dist_from_latent(latent_pi)
+            action_likelihoods = distribution.distribution.probs
+        else:
+            # Masked in the graph: illegal actions get probability 0
+            logits = self.policy.action_net(latent_pi)
+            logits = th.where(action_mask > 0, logits, th.full_like(logits, MASKED_LOGIT))
+            action_likelihoods = th.softmax(logits, dim=-1)
 
         return action_likelihoods, values
@@ -0,0 +1,145 @@
+"""
+Fixed-width binary game records.
+
+A record file is MAGIC followed by back to back RECORD_DTYPE records, one
+per finished game. A record holds everything needed to replay the game:
+the deck in dealing order, the starting seat and every card played.
+"""
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+
+from lib.briscola.core import NO_CARD, NUM_CARDS, BriscolaState
+from lib.briscola.game import BriscolaGame
+
+MAGIC = b"BRISREC1"
+MAX_PLAYERS = 4
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("deck", np.int8, NUM_CARDS),
+        ("num_players", np.uint8),
+        ("goes_first", np.uint8),
+        # Card ids in the order they were played, every game lasts 40 plays
+        ("plays", np.int8, NUM_CARDS),
+        # Card points per seat, 0 past num_players
+        ("scores", np.int16, MAX_PLAYERS),
+    ]
+)
+
+
+def new_records(n: int) -> np.ndarray:
+    records = np.zeros(n, dtype=RECORD_DTYPE)
+    records["plays"] = NO_CARD
+    return records
+
+
+class RecordWriter:
+    """
+    Appends records to a file through a fixed buffer of `buffer_size`
+    records, written out when full and on `flush`/`close`. A record cut
+    short by a crashed writer is dropped before appending, so new records
+    start on a record boundary.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 4096):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "r+b") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"not a game record file: {path}")
+                count = (os.path.getsize(path) - len(MAGIC)) // RECORD_DTYPE.itemsize
+                f.truncate(len(MAGIC) + count * RECORD_DTYPE.itemsize)
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(MAGIC)
+        self.buffer = new_records(buffer_size)
+        self.size = 0
+        self.written = 0
+
+    def write(self, records: np.ndarray):
+        """
+        Append RECORD_DTYPE records.
+        """
+        start = 0
+        while start < len(records):
+            n = min(len(records) - start, len(self.buffer) - self.size)
+            self.buffer[self.size : self.size + n] = records[start : start + n]
+            self.size += n
+            start += n
+            if self.size == len(self.buffer):
+                self.flush()
+
+    def write_game(self, deck, num_players: int, goes_first: int, plays, scores):
+        record = new_records(1)
+        record["deck"] = deck
+        record["num_players"] = num_players
+        record["goes_first"] = goes_first
+        record["plays"][0, : len(plays)] = plays
+        record["scores"][0, :num_players] = scores
+        self.write(record)
+
+    def flush(self):
+        self.file.write(self.buffer[: self.size].tobytes())
+        self.file.flush()
+        self.written += self.size
+        self.size = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordList(list):
+    """
+    In-memory stand-in for a RecordWriter, e.g. to send the records of a
+    worker process back to the one writing the file.
+    """
+
+    def write(self, records: np.ndarray):
+        self.append(np.array(records))
+
+    def array(self) -> np.ndarray:
+        return np.concatenate(self) if self else new_records(0)
+
+
+def read_records(path: str) -> np.ndarray:
+    """
+    Memory-mapped, read-only structured array of the records in `path`.
+    A record cut short by a crashed writer is left out.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"not a game record file: {path}")
+    count = (os.path.getsize(path) - len(MAGIC)) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return new_records(0)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=len(MAGIC), shape=(count,))
+
+
+def replay(record: np.void, steps: Optional[int] = None) -> Iterator[BriscolaGame]:
+    """
+    The game of `record` before the first play and after every play
+    (tricks scored and cards dealt as the env does), up to `steps` plays.
+    The same BriscolaGame is yielded each time, updated in place, so use
+    `game.clone()` to keep a position.
+    """
+    num_players = int(record["num_players"])
+    state = BriscolaState(num_players, record["deck"], int(record["goes_first"]))
+    game = BriscolaGame.from_state(state)
+    yield game
+    plays = record["plays"]
+    for step in range(NUM_CARDS if steps is None else steps):
+        if plays[step] == NO_CARD:
+            return
+        state.apply(int(plays[step]))
+        yield game
@@ -0,0 +1,216 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lib.briscola.core import CARD_SCORE, CARD_STRENGTH, CARD_SUIT, NUM_CARDS, NUM_SUITS, BriscolaState, winning_index
+from lib.briscola.suits import canonical_suits, inverse, relabel_bits, relabel_card
+from lib.inference.policy import Policy
+
+MAX_PLAYERS = 4
+
+
+def _zobrist_keys(rng: np.random.Generator, *shape: int) -> List:
+    keys = rng.integers(1, 2**63, size=shape, dtype=np.int64)
+    return keys.tolist()
+
+
+# One random 63-bit key per (seat, card) in a hand, per (position, card) in
+# the trick, per trick leader, per trump suit and per root seat. A position's
+# hash is the XOR of the keys of everything in it, updated as cards move.
+_rng = np.random.default_rng(0x5EED)
+HAND_KEYS = _zobrist_keys(_rng, MAX_PLAYERS, NUM_CARDS)
+TRICK_KEYS = _zobrist_keys(_rng, MAX_PLAYERS, NUM_CARDS)
+LEADER_KEYS = _zobrist_keys(_rng, MAX_PLAYERS)
+TRUMP_KEYS = _zobrist_keys(_rng, NUM_SUITS)
+ROOT_KEYS = _zobrist_keys(_rng, MAX_PLAYERS)
+del _rng
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def position_hash(hands: List[int], trick: List[int], leader: int, trump: int, root: int) -> int:
+    """
+    Zobrist hash of a position, `hands` as card bitmasks per seat.
+    """
+    key = LEADER_KEYS[leader] ^ TRUMP_KEYS[trump] ^ ROOT_KEYS[root]
+    for seat, hand in enumerate(hands):
+        for card in range(NUM_CARDS):
+            if hand >> card & 1:
+                key ^= HAND_KEYS[seat][card]
+    for position, card in enumerate(trick):
+        key ^= TRICK_KEYS[position][card]
+    return key
+
+
+class EndgameSolver:
+    """
+    Alpha-beta search over the tricks left once the deck is empty.
+
+    The value of a position is the points the root seat will still take.
+    With 2 players that is an exact minimax solution. With 4 players the other
+    three seats are assumed to play against the root seat together (paranoid
+    search), which is exact for that objective and a lower bound otherwise.
+
+    At most 3 tricks remain, so a solve visits at most a few thousand nodes.
+    The transposition table is kept between solves, positions from earlier
+    searches of the same game are found again on later moves. It is cleared
+    once it holds `max_entries` positions. With `canonical` every solve
+    relabels suits first (see lib.briscola.suits), so positions of other
+    games or determinizations that only differ by suits share entries.
+    """
+
+    def __init__(self, max_entries: int = 1 << 20, canonical: bool = True):
+        self.max_entries = max_entries
+        self.canonical = canonical
+        self.table: Dict[int, Tuple[int, int, int]] = {}
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self.table.clear()
+
+    def solve(self, state: BriscolaState, root: Optional[int] = None) -> Tuple[int, int]:
+        """
+        (points `root` still takes, best card for the seat to act) under
+        perfect play. `root` defaults to the seat to act.
+        """
+        if state.deck_size() != 0:
+            raise Exception("deck not empty")
+        if state.should_score_trick():
+            raise Exception("trick over")
+        if state.game_over():
+            raise Exception("game over")
+
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        players = state.num_players
+        self.num_players = players
+        self.trump = CARD_SUIT[state.briscola]
+        self.root = state.action_on if root is None else root
+        hands = state.hand_bits[:]
+        trick = state.trick_cards()
+        leader = (state.action_on - state.trick_len) % players
+        if self.canonical:
+            perm = canonical_suits(self.trump, hands, trick)
+            hands = [relabel_bits(hand, perm) for hand in hands]
+            trick = [relabel_card(card, perm) for card in trick]
+            self.trump = 0
+
+        key = position_hash(hands, trick, leader, self.trump, self.root)
+        value = self._search(hands, trick, leader, key, -1, 121)
+        best_card = self.table[key][2]
+        if self.canonical:
+            best_card = relabel_card(best_card, inverse(perm))
+        return value, best_card
+
+    def _search(self, hands: List[int], trick: List[int], leader: int, key: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        players = self.num_players
+        seat = (leader + len(trick)) % players
+        hand = hands[seat]
+        if not hand:
+            return 0
+
+        self.probes += 1
+        entry = self.table.get(key)
+        best_card = -1
+        if entry is not None:
+            flag, value, best_card = entry
+            if flag == EXACT:
+                self.hits += 1
+                return value
+            if flag == LOWER and value >= beta:
+                self.hits += 1
+                return value
+            if flag == UPPER and value <= alpha:
+                self.hits += 1
+                return value
+
+        maximizing = seat == self.root
+        position = len(trick)
+        last = position == players - 1
+        hand_keys = HAND_KEYS[seat]
+        trick_keys = TRICK_KEYS[position]
+
+        cards = []
+        rest = hand
+        while rest:
+            low = rest & -rest
+            cards.append(low.bit_length() - 1)
+            rest ^= low
+        # Previous best move first, then points and strength high to low
+        cards.sort(key=lambda c: (c != best_card, -CARD_SCORE[c], -CARD_STRENGTH[c]))
+
+        original_alpha = alpha
+        original_beta = beta
+        best = -1 if maximizing else 121
+        for card in cards:
+            hands[seat] = hand ^ (1 << card)
+            trick.append(card)
+            child_key = key ^ hand_keys[card] ^ trick_keys[card]
+            if last:
+                winner = (leader + winning_index(trick, self.trump)) % players
+                gained = sum(CARD_SCORE[c] for c in trick) if winner == self.root else 0
+                for i, played in enumerate(trick):
+                    child_key ^= TRICK_KEYS[i][played]
+                child_key ^= LEADER_KEYS[leader] ^ LEADER_KEYS[winner]
+                value = gained + self._search(hands, [], winner, child_key, alpha - gained, beta - gained)
+            else:
+                value = self._search(hands, trick, leader, child_key, alpha, beta)
+            trick.pop()
+
+            if maximizing:
+                if value > best:
+                    best, best_card = value, card
+                    alpha = max(alpha, value)
+            elif value < best:
+                best, best_card = value, card
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        hands[seat] = hand
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (flag, best, best_card)
+        return best
+
+
+class EndgamePolicy(Policy):
+    """
+    Plays `policy` until the deck runs out, then the solver's move.
+
+    The solver needs the full game state, which the observation doesn't
+    carry for 4 players, so `state_fn` returns the BriscolaState the
+    observation was taken from, e.g. `lambda: env.game.state`. Batched
+    observations always go to `policy`.
+    """
+
+    def __init__(self, policy, state_fn: Callable[[], BriscolaState], solver: Optional[EndgameSolver] = None):
+        self.policy = policy
+        self.state_fn = state_fn
+        self.solver = EndgameSolver() if solver is None else solver
+        self.observation_shape = getattr(policy, "observation_shape", None)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        observation = np.asarray(observation)
+        if observation.ndim == 1:
+            game = self.state_fn()
+            if game.deck_size() == 0:
+                _value, card = self.solver.solve(game)
+                return np.array(card), None
+        return self.policy.predict(
+            observation, state, episode_start, deterministic, action_masks=action_masks
+        )
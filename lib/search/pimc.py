@@ -0,0 +1,201 @@
+import time
+from concurrent.futures import Executor
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from lib.briscola.core import HAND_SIZE, BriscolaState
+from lib.briscola.vec_game import BriscolaVecGame
+from lib.inference.policy import Policy
+
+
+def hidden_cards(state: BriscolaState, seat: int) -> np.ndarray:
+    """
+    Cards `seat` can't see: the rest of the deck and every other hand. The
+    turned up briscola is known, so it is never hidden, not even once the
+    last deal puts it in someone's hand. Sorted, so nothing about where
+    they really are leaks into the samples.
+    """
+    hidden = state.deck_cards()
+    for other in range(state.num_players):
+        if other != seat:
+            hidden += [c for c in state.hand(other) if c != state.briscola]
+    return np.array(sorted(hidden), dtype=np.int8)
+
+
+def hidden_slots(state: BriscolaState, seat: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (seats, slots) of the hand slots holding hidden cards: every card of
+    the other seats but a drawn briscola, which stays with whoever drew it.
+    """
+    seats, slots = [], []
+    for other in range(state.num_players):
+        if other == seat:
+            continue
+        for j in range(state.hand_len[other]):
+            if state.hands[other * HAND_SIZE + j] != state.briscola:
+                seats.append(other)
+                slots.append(j)
+    return np.array(seats, dtype=np.intp), np.array(slots, dtype=np.intp)
+
+
+def determinize(state: BriscolaState, seat: int, samples: int, rng: np.random.Generator) -> BriscolaVecGame:
+    """
+    `samples` games of `state` with the cards `seat` can't see dealt at
+    random to the other hands and the deck.
+    """
+    game = BriscolaVecGame(samples, players=state.num_players)
+    game.load(game.rows, state)
+    deals = rng.permuted(np.tile(hidden_cards(state, seat), (samples, 1)), axis=1)
+    _deal(game, state, hidden_slots(state, seat), deals)
+    return game
+
+
+def _deal(game: BriscolaVecGame, state: BriscolaState, hidden_at: Tuple[np.ndarray, np.ndarray], deals: np.ndarray):
+    seats, slots = hidden_at
+    game.hands[:, seats, slots] = deals[:, : len(seats)]
+    game.deck[:, state.deck_pos :] = deals[:, len(seats) :]
+
+
+def playouts(
+    state: BriscolaState,
+    budget: float,
+    max_playouts: Optional[int] = None,
+    batch_size: int = 256,
+    seed=None,
+    rollout_policy=None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Determinized playouts for the seat to act in `state`, run for `budget`
+    seconds or until `max_playouts`, whichever comes first.
+
+    Each batch deals `batch_size` samples of the hidden cards to the other
+    hands and the deck, then plays every legal card against each sample to
+    the end of the game, randomly or with `rollout_policy`. Returns
+    (cards, total final points of the seat per card, playouts per card).
+    """
+    seat = state.action_on
+    cards = np.array(state.hand(seat), dtype=np.int8)
+    hidden = hidden_cards(state, seat)
+    moves = len(cards)
+    rng = np.random.default_rng(seed)
+
+    # Where the hidden cards go: other seats' hand slots, then the deck
+    hidden_at = hidden_slots(state, seat)
+
+    game = BriscolaVecGame(batch_size * moves, players=state.num_players)
+    rows = game.rows
+    first = np.tile(cards, batch_size)
+    totals = np.zeros(moves, dtype=np.int64)
+    counts = np.zeros(moves, dtype=np.int64)
+
+    deadline = time.perf_counter() + budget
+    while True:
+        game.load(rows, state)
+        # One sample per batch row, shared by every candidate card
+        deals = np.repeat(rng.permuted(np.tile(hidden, (batch_size, 1)), axis=1), moves, axis=0)
+        _deal(game, state, hidden_at, deals)
+
+        _step(game, first)
+        while not game.game_over()[0]:
+            if rollout_policy is None:
+                held = game.hand_len[rows, game.action_on]
+                slots = (rng.random(len(rows)) * held).astype(np.intp)
+                actions = game.hands[rows, game.action_on, slots]
+            else:
+                from lib.briscola_env.embedding import vec_game_embedding
+
+                observations = vec_game_embedding(game, game.action_on)
+                actions, _ = rollout_policy.predict(
+                    observations, action_masks=game.action_masks(), deterministic=False
+                )
+            _step(game, actions)
+
+        totals += game.scores[:, seat].reshape(batch_size, moves).sum(axis=0)
+        counts += batch_size
+        if time.perf_counter() >= deadline:
+            break
+        if max_playouts is not None and counts.sum() >= max_playouts:
+            break
+    return cards, totals, counts
+
+
+def _step(game: BriscolaVecGame, actions: np.ndarray):
+    game.play(actions)
+    scored = game.should_score_trick()
+    if scored.any():
+        game.score_tricks(scored)
+    game.redeal(game.needs_redeal())
+
+
+class PIMCPlayer:
+    """
+    Perfect Information Monte Carlo: samples the hidden cards consistently
+    with what the seat to act has seen, plays every legal card against each
+    sample and picks the card with the best mean final points.
+
+    Playouts run in lockstep on a BriscolaVecGame. With an `executor` the
+    budget is split into `workers` shards searched concurrently; a process
+    pool needs a picklable `rollout_policy` (or none).
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.05,
+        max_playouts: Optional[int] = None,
+        batch_size: int = 256,
+        rollout_policy=None,
+        executor: Optional[Executor] = None,
+        workers: int = 1,
+        seed=None,
+    ):
+        self.budget = budget
+        self.max_playouts = max_playouts
+        self.batch_size = batch_size
+        self.rollout_policy = rollout_policy
+        self.executor = executor
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+
+    def search(self, state: BriscolaState) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (cards, mean final points, playouts) for each card the seat to act
+        holds. The means are a distillation target as well as a move choice.
+        """
+        if state.game_over() or state.should_score_trick() or state.needs_redeal():
+            raise Exception("no card to play")
+        shards = self.workers if self.executor is not None else 1
+        max_playouts = None if self.max_playouts is None else -(-self.max_playouts // shards)
+        args = (state, self.budget, max_playouts, self.batch_size)
+        seeds = self.rng.integers(2**63, size=shards)
+        if shards == 1:
+            results = [playouts(*args, seeds[0], self.rollout_policy)]
+        else:
+            futures = [
+                self.executor.submit(playouts, *args, seed, self.rollout_policy) for seed in seeds
+            ]
+            results = [future.result() for future in futures]
+
+        cards = results[0][0]
+        totals = sum(result[1] for result in results)
+        counts = sum(result[2] for result in results)
+        return cards, totals / counts, counts
+
+    def choose(self, state: BriscolaState) -> int:
+        cards, means, _counts = self.search(state)
+        return int(cards[means.argmax()])
+
+
+class PIMCPolicy(Policy):
+    """
+    PIMCPlayer behind the Policy interface. Like EndgamePolicy, `state_fn`
+    returns the BriscolaState the observation was taken from; the search
+    only reads the seat's own hand and the public cards from it.
+    """
+
+    def __init__(self, player: PIMCPlayer, state_fn: Callable[[], BriscolaState]):
+        self.player = player
+        self.state_fn = state_fn
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        return np.array(self.player.choose(self.state_fn())), None
@@ -0,0 +1,135 @@
+"""
+Micro-batching of single-position policy requests.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+
+from lib.inference.policy import Policy
+
+
+class MicroBatcher:
+    """
+    Queues single observations from concurrent requests and runs them
+    through `policy` as one batch: a batch closes at `max_batch` requests
+    or `max_wait` seconds after its first one. Forward passes run one at a
+    time on a worker thread, so the event loop keeps accepting requests
+    and the next batch fills while the current one runs.
+
+    Latency, from queueing to result, is kept for the last `window`
+    requests.
+    """
+
+    def __init__(self, policy: Policy, max_batch: int = 256, max_wait: float = 0.002, window: int = 10000):
+        if max_batch < 1:
+            raise ValueError(f"Invalid max_batch: {max_batch}")
+        if max_wait < 0:
+            raise ValueError(f"Invalid max_wait: {max_wait}")
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="policy")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def predict(self, observation: np.ndarray, action_mask: np.ndarray) -> int:
+        """
+        Card the policy plays for one observation and action mask.
+        """
+        if self._task is None:
+            raise Exception("batcher not started")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((observation, action_mask, time.perf_counter(), future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _next_batch(self) -> list:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _forward(self, observations: np.ndarray, action_masks: np.ndarray) -> np.ndarray:
+        actions, _ = self.policy.predict(observations, action_masks=action_masks, deterministic=True)
+        return np.asarray(actions)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            observations = np.stack([item[0] for item in batch])
+            action_masks = np.stack([item[1] for item in batch])
+            try:
+                actions = await loop.run_in_executor(self._executor, self._forward, observations, action_masks)
+            except asyncio.CancelledError:
+                for *_, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            now = time.perf_counter()
+            for (_, _, queued, future), action in zip(batch, actions):
+                if not future.done():
+                    future.set_result(int(action))
+                self.latencies.append(now - queued)
+            self.requests += len(batch)
+            self.batches += 1
+
+    def metrics(self) -> Dict:
+        latencies = np.array(self.latencies) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "latency_p50_ms": float(p50),
+            "latency_p99_ms": float(p99),
+        }
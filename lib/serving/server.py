@@ -0,0 +1,264 @@
+"""
+HTTP and WebSocket service that plays AI moves.
+
+    python -m lib.serving.server models/briscola.onnx --port 8080
+
+POST /move takes {"state": {...}}, a seat's view of a game (see
+lib.serving.views), or {"game_id": ..., "play": true} for a stored game,
+and answers {"card": id}. POST /games starts a stored game, GET
+/games/{id} shows it and POST /games/{id}/play plays a card for the seat
+to act. /ws takes the /move bodies as JSON messages, each with an "id"
+echoed in its reply. GET /metrics reports latency and queue depth.
+Moves from concurrent requests go through the policy in one batch.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+from typing import Dict
+
+from aiohttp import WSMsgType, web
+
+from lib.agents.rules import AGENTS
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.embedding import game_embedding
+from lib.inference.cache import CachedPolicy, PolicyCache
+from lib.inference.policy import BACKENDS, Policy, load_policy
+from lib.serving.batcher import MicroBatcher
+from lib.serving.sessions import SessionStore
+from lib.serving.views import action_mask, game_view, view_embedding
+
+BATCHER = web.AppKey("batcher", MicroBatcher)
+SESSIONS = web.AppKey("sessions", SessionStore)
+
+
+class Conflict(Exception):
+    """
+    The stored game changed while its move was being computed.
+    """
+
+
+def load_player(spec: str, backend: str = "auto", cache_size: int = 0) -> Policy:
+    """
+    A rule-based agent by name, else a policy file, behind a PolicyCache
+    of `cache_size` positions if given.
+    """
+    if spec in AGENTS:
+        policy = AGENTS[spec]()
+        return CachedPolicy(policy, PolicyCache(cache_size)) if cache_size else policy
+    if cache_size:
+        return CachedPolicy.load(spec, PolicyCache(cache_size), backend)
+    return load_policy(spec, backend)
+
+
+async def move(app: web.Application, body: Dict) -> Dict:
+    """
+    Answer one /move body. Raises ValueError for bad requests, KeyError
+    for unknown games and Conflict when the game moved on meanwhile.
+    """
+    if not isinstance(body, dict):
+        raise ValueError(f"Invalid request: {body}")
+    batcher = app[BATCHER]
+    if "state" in body:
+        observation, mask = view_embedding(body["state"])
+        return {"card": await batcher.predict(observation, mask)}
+
+    if "game_id" not in body:
+        raise ValueError("Expected state or game_id")
+    game_id = body["game_id"]
+    game = app[SESSIONS].get(game_id)
+    state = game.state
+    if state.game_over():
+        raise ValueError("Game over")
+    player = state.action_on
+    card = await batcher.predict(game_embedding(game, player), action_mask(state, player))
+    if not body.get("play", False):
+        return {"card": card}
+    if state.action_on != player or not state.playable(card):
+        raise Conflict(f"Game {game_id} changed")
+    state.apply(card)
+    return {"card": card, "game": game_view(game_id, state)}
+
+
+# Status for each error `move` raises
+STATUS = {ValueError: 400, KeyError: 404, Conflict: 409}
+
+
+def _message(e: Exception) -> str:
+    message = str(e.args[0]) if e.args else type(e).__name__
+    return f"Unknown game: {message}" if isinstance(e, KeyError) else message
+
+
+def _error(e: Exception) -> web.Response:
+    status = next(status for error, status in STATUS.items() if isinstance(e, error))
+    return web.json_response({"error": _message(e)}, status=status)
+
+
+async def _json(request: web.Request):
+    try:
+        return await request.json()
+    except json.JSONDecodeError as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": str(e)}), content_type="application/json")
+
+
+async def handle_move(request: web.Request) -> web.Response:
+    try:
+        return web.json_response(await move(request.app, await _json(request)))
+    except tuple(STATUS) as e:
+        return _error(e)
+
+
+async def handle_new_game(request: web.Request) -> web.Response:
+    body = await _json(request) if request.can_read_body else {}
+    if not isinstance(body, dict):
+        return _error(ValueError(f"Invalid request: {body}"))
+    try:
+        game = BriscolaGame(
+            players=body.get("players", 2),
+            goes_first=body.get("goes_first", 0),
+            seed=body.get("seed"),
+        )
+    except (ValueError, TypeError) as e:
+        return _error(ValueError(str(e)))
+    game_id = request.app[SESSIONS].create(game)
+    return web.json_response(game_view(game_id, game.state), status=201)
+
+
+async def handle_get_game(request: web.Request) -> web.Response:
+    game_id = request.match_info["game_id"]
+    try:
+        game = request.app[SESSIONS].get(game_id)
+    except KeyError as e:
+        return _error(e)
+    return web.json_response(game_view(game_id, game.state))
+
+
+async def handle_delete_game(request: web.Request) -> web.Response:
+    request.app[SESSIONS].delete(request.match_info["game_id"])
+    return web.Response(status=204)
+
+
+async def handle_play(request: web.Request) -> web.Response:
+    game_id = request.match_info["game_id"]
+    body = await _json(request)
+    try:
+        state = request.app[SESSIONS].get(game_id).state
+    except KeyError as e:
+        return _error(e)
+    card = body.get("card") if isinstance(body, dict) else None
+    if not isinstance(card, int) or not state.playable(card):
+        return _error(ValueError(f"Card not playable: {card}"))
+    state.apply(card)
+    return web.json_response(game_view(game_id, state))
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    sessions = request.app[SESSIONS]
+    metrics = request.app[BATCHER].metrics()
+    metrics.update(sessions=len(sessions), evicted_sessions=sessions.evicted)
+    policy = request.app[BATCHER].policy
+    if isinstance(policy, CachedPolicy):
+        metrics["cache"] = dict(policy.cache.stats(), reloads=policy.reloads)
+    return web.json_response(metrics)
+
+
+async def handle_ws(request: web.Request) -> web.WebSocketResponse:
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    send_lock = asyncio.Lock()
+    pending = set()
+
+    async def answer(message: Dict):
+        request_id = message.get("id") if isinstance(message, dict) else None
+        try:
+            reply = await move(request.app, message)
+        except tuple(STATUS) as e:
+            reply = {"error": _message(e)}
+        reply["id"] = request_id
+        async with send_lock:
+            if not ws.closed:
+                await ws.send_json(reply)
+
+    async for msg in ws:
+        if msg.type != WSMsgType.TEXT:
+            continue
+        try:
+            message = json.loads(msg.data)
+        except json.JSONDecodeError as e:
+            async with send_lock:
+                await ws.send_json({"id": None, "error": str(e)})
+            continue
+        # Answer messages concurrently so they share batches
+        task = asyncio.create_task(answer(message))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    for task in list(pending):
+        task.cancel()
+    return ws
+
+
+async def _evict_expired(sessions: SessionStore):
+    while True:
+        await asyncio.sleep(max(sessions.ttl / 4, 1.0))
+        sessions.evict_expired()
+
+
+async def _background(app: web.Application):
+    await app[BATCHER].start()
+    evictor = asyncio.create_task(_evict_expired(app[SESSIONS]))
+    yield
+    evictor.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await evictor
+    await app[BATCHER].stop()
+
+
+def create_app(
+    policy: Policy,
+    max_batch: int = 256,
+    max_wait: float = 0.002,
+    ttl: float = 1800.0,
+    max_sessions: int = 10000,
+) -> web.Application:
+    app = web.Application()
+    app[BATCHER] = MicroBatcher(policy, max_batch=max_batch, max_wait=max_wait)
+    app[SESSIONS] = SessionStore(ttl=ttl, max_sessions=max_sessions)
+    app.cleanup_ctx.append(_background)
+    app.router.add_post("/move", handle_move)
+    app.router.add_post("/games", handle_new_game)
+    app.router.add_get("/games/{game_id}", handle_get_game)
+    app.router.add_delete("/games/{game_id}", handle_delete_game)
+    app.router.add_post("/games/{game_id}/play", handle_play)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/ws", handle_ws)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m lib.serving.server",
+        description="Serve AI moves over HTTP and WebSocket.",
+    )
+    parser.add_argument("policy", help="policy .zip, .pt or .onnx, or a rule-based agent name")
+    parser.add_argument("--backend", default="auto", choices=BACKENDS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="longest a move waits for its batch to fill")
+    parser.add_argument("--ttl", type=float, default=1800.0, help="seconds before an idle game is evicted")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--cache-size", type=int, default=0, help="positions in the policy action cache, off if 0")
+    args = parser.parse_args()
+
+    app = create_app(
+        load_player(args.policy, args.backend, args.cache_size),
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        ttl=args.ttl,
+        max_sessions=args.max_sessions,
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+In-memory game sessions with TTL eviction.
+"""
+import secrets
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from lib.briscola.game import BriscolaGame
+
+
+class SessionStore:
+    """
+    Games by id. A game not touched for `ttl` seconds is evicted, and the
+    least recently used one makes room once `max_sessions` are stored.
+    Sessions are kept in access order, so eviction only looks at the
+    oldest entries.
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 10000, clock: Callable[[], float] = time.monotonic):
+        if ttl <= 0:
+            raise ValueError(f"Invalid ttl: {ttl}")
+        if max_sessions < 1:
+            raise ValueError(f"Invalid max_sessions: {max_sessions}")
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, game_id: str) -> bool:
+        return self._live(game_id) is not None
+
+    def create(self, game: BriscolaGame) -> str:
+        self.evict_expired()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        game_id = secrets.token_urlsafe(12)
+        self._sessions[game_id] = (game, self.clock())
+        return game_id
+
+    def get(self, game_id: str) -> BriscolaGame:
+        """
+        The game stored as `game_id`, refreshing its TTL. Raises KeyError
+        for unknown or expired ids.
+        """
+        game = self._live(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        self._sessions[game_id] = (game, self.clock())
+        self._sessions.move_to_end(game_id)
+        return game
+
+    def delete(self, game_id: str) -> None:
+        self._sessions.pop(game_id, None)
+
+    def evict_expired(self) -> int:
+        """
+        Drop every session idle for longer than the TTL, returning how many.
+        """
+        cutoff = self.clock() - self.ttl
+        evicted = 0
+        while self._sessions:
+            game_id, (_, touched) = next(iter(self._sessions.items()))
+            if touched > cutoff:
+                break
+            del self._sessions[game_id]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def _live(self, game_id: str):
+        entry = self._sessions.get(game_id)
+        if entry is None:
+            return None
+        game, touched = entry
+        if touched <= self.clock() - self.ttl:
+            del self._sessions[game_id]
+            self.evicted += 1
+            return None
+        return game
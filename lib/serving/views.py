@@ -0,0 +1,119 @@
+"""
+Games as seen by one seat, to and from JSON.
+
+Cards are ids in [0, 40), suit * 10 + rank - 1. `deck_size` counts the
+cards still to be drawn including the face-up briscola, as a player sees
+the table, so it is 0 once the briscola has been dealt.
+"""
+from array import array
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from lib.briscola.core import HAND_SIZE, NO_CARD, NUM_CARDS, BriscolaState
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.embedding import game_embedding
+
+
+def _card_list(name: str, cards, limit: int) -> List[int]:
+    if not isinstance(cards, list) or len(cards) > limit:
+        raise ValueError(f"Invalid {name}: {cards}")
+    for card in cards:
+        if not isinstance(card, int) or not 0 <= card < NUM_CARDS:
+            raise ValueError(f"Invalid card in {name}: {card}")
+    return cards
+
+
+def game_from_view(
+    num_players: int,
+    hand: Sequence[int],
+    trick: Sequence[int],
+    briscola: int,
+    played: Sequence[int],
+    deck_size: int,
+) -> BriscolaGame:
+    """
+    Game whose seat 0 sees `hand`, `trick`, `briscola` and the cards
+    already `played` into piles. Opponents' hands are unknown, so the
+    unseen cards sit in the deck: the game embeds like the real one for
+    `game_embedding(game, 0)` but is not meant to be played on.
+    """
+    if num_players not in [2, 4]:
+        raise ValueError(f"Invalid number of players: {num_players}")
+    hand = _card_list("hand", hand, HAND_SIZE)
+    trick = _card_list("trick", trick, num_players - 1)
+    played = _card_list("played", played, NUM_CARDS)
+    if not hand:
+        raise ValueError("Empty hand")
+    if not isinstance(briscola, int) or not 0 <= briscola < NUM_CARDS:
+        raise ValueError(f"Invalid briscola: {briscola}")
+    if not isinstance(deck_size, int) or not 0 <= deck_size < NUM_CARDS:
+        raise ValueError(f"Invalid deck_size: {deck_size}")
+    seen = hand + trick + played + ([briscola] if deck_size else [])
+    if len(set(seen)) != len(seen):
+        raise ValueError("Card seen twice")
+
+    unseen = [c for c in range(NUM_CARDS) if c not in set(seen)]
+    hidden = [c for c in unseen if c != briscola]
+    state = BriscolaState.__new__(BriscolaState)
+    state.num_players = num_players
+    state.briscola = briscola
+    rest = [c for c in range(NUM_CARDS) if c != briscola and c not in set(hidden)]
+    state.deck = array("b", [briscola] + rest + hidden)
+    state.deck_pos = NUM_CARDS - len(hidden)
+    hands = [hand] + [[] for _ in range(num_players - 1)]
+    if briscola in unseen:
+        # Dealt to someone else
+        hands[1] = [briscola]
+    state.hands = array("b", [c for h in hands for c in h + [NO_CARD] * (HAND_SIZE - len(h))])
+    state.hand_len = [len(h) for h in hands]
+    state.trick = array("b", trick + [NO_CARD] * (num_players - len(trick)))
+    state.trick_len = len(trick)
+    state.piles = [0] * num_players
+    state.scores = [0] * num_players
+    state.action_on = 0
+    state.sync_bits()
+    return BriscolaGame.from_state(state)
+
+
+def view_embedding(view: Dict):
+    """
+    Observation and action mask for a seat's view given as JSON, with the
+    fields of `game_from_view` ("players" for num_players, "trick" and
+    "played" optional). Raises ValueError for malformed views.
+    """
+    if not isinstance(view, dict):
+        raise ValueError(f"Invalid state: {view}")
+    for field in ["players", "hand", "briscola", "deck_size"]:
+        if field not in view:
+            raise ValueError(f"Missing state field: {field}")
+    game = game_from_view(
+        view["players"],
+        view["hand"],
+        view.get("trick", []),
+        view["briscola"],
+        view.get("played", []),
+        view["deck_size"],
+    )
+    return game_embedding(game, 0), action_mask(game.state, 0)
+
+
+def action_mask(state: BriscolaState, player: int) -> np.ndarray:
+    return state.action_mask(player)
+
+
+def game_view(game_id: str, state: BriscolaState) -> Dict:
+    """
+    JSON for a session's game, with every hand.
+    """
+    return {
+        "game_id": game_id,
+        "players": state.num_players,
+        "action_on": state.action_on,
+        "briscola": state.briscola,
+        "deck_size": state.deck_size() + 1 if state.deck_size() else 0,
+        "hands": [state.hand(p) for p in range(state.num_players)],
+        "trick": state.trick_cards(),
+        "scores": list(state.scores),
+        "game_over": state.game_over(),
+    }
@@ -0,0 +1,38 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class SharedArrays:
+    """
+    NumPy arrays laid out back to back in one shared memory block. Create
+    with a `layout` of {name: (dtype, shape)}, attach from another process
+    with the same layout and the block's `name`.
+    """
+
+    def __init__(self, layout: Dict[str, Tuple[Any, tuple]], name: Optional[str] = None):
+        self.layout = layout
+        offsets = {}
+        size = 0
+        for key, (dtype, shape) in layout.items():
+            offsets[key] = size
+            # Cache line aligned so arrays written by different processes don't share lines
+            size += -(-np.dtype(dtype).itemsize * int(np.prod(shape)) // 64) * 64
+        self.shm = SharedMemory(name=name, create=name is None, size=max(size, 1))
+        self.name = self.shm.name
+        self.arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offsets[key])
+            for key, (dtype, shape) in layout.items()
+        }
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def close(self):
+        # The block can't be closed while arrays still point into it
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
@@ -0,0 +1,129 @@
+from typing import Optional
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+from lib.briscola.core import CARD_SCORE, NUM_CARDS, BriscolaState, shuffled_deck
+from lib.briscola.game import deck_ids
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.briscola_env.encoder import ObservationEncoder
+
+WIN_REWARD = 120
+
+
+class BriscolaTrainingEnv(gym.Env):
+    """Single-agent Briscola env for SB3 that skips the AEC and wrapper layers.
+
+    Observation and action mask come from one encoding of the seat to act.
+    Rewards follow BriscolaEnv and, like SB3ActionMaskWrapper, the reward of
+    a step is the acting seat's running reward for the game.
+
+    With `opponents` set, only `learner_seat` is exposed to SB3 and every
+    other seat is played internally by `opponents.predict` (any Policy or
+    MaskablePPO). Without it every seat is the learner, as in self-play.
+    """
+
+    metadata = {"name": "briscola", "render_modes": []}
+
+    def __init__(
+        self,
+        num_players: int = 4,
+        opponents=None,
+        learner_seat: Optional[int] = None,
+        deterministic_opponents: bool = True,
+    ):
+        super().__init__()
+        self.num_players = num_players
+        self.opponents = opponents
+        self.learner_seat = learner_seat
+        self.deterministic_opponents = deterministic_opponents
+        self.observation_space = spaces.Box(low=0, high=255, shape=EMBEDDING_SHAPE, dtype=np.uint8)
+        self.action_space = spaces.Discrete(NUM_CARDS)
+        self.encoder = ObservationEncoder(num_players)
+        self.seat = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if seed is None:
+            seed = int(self.np_random.integers(2**31))
+        # Same deal and starting seat as BriscolaEnv.reset(seed=..., options=...)
+        options = options or {}
+        goes_first = options.get("goes_first")
+        if goes_first is None:
+            goes_first = np.random.default_rng(seed).choice(self.num_players)
+        deck = options.get("deck")
+        deck = shuffled_deck(seed) if deck is None else deck_ids(deck)
+        self.state = BriscolaState(self.num_players, deck, int(goes_first))
+        self.encoder.reset(self.state)
+        self.rewards = [0] * self.num_players
+        self.tricks = [0] * self.num_players
+        self.wins = [0] * self.num_players
+
+        if self.opponents is not None:
+            if self.learner_seat is None:
+                self.seat = int(self.np_random.integers(self.num_players))
+            else:
+                self.seat = self.learner_seat
+            self._play_opponents()
+        else:
+            self.seat = self.state.action_on
+        return self._observe(), {}
+
+    def step(self, action):
+        acting = self.seat
+        self._play(int(action))
+        if self.opponents is not None:
+            self._play_opponents()
+        else:
+            self.seat = self.state.action_on
+
+        terminated = self.state.game_over()
+        info = {"tricks": self.tricks[acting], "wins": self.wins[acting]}
+        return self._observe(), self.rewards[acting], terminated, False, info
+
+    def action_masks(self) -> np.ndarray:
+        return self._mask
+
+    def _observe(self) -> np.ndarray:
+        observation = self.encoder.observe(self.seat).copy()
+        self._mask = observation[:NUM_CARDS] == 1
+        return observation
+
+    def _play_opponents(self):
+        state = self.state
+        while not state.game_over() and state.action_on != self.seat:
+            observation = self.encoder.observe(state.action_on)
+            mask = observation[:NUM_CARDS]
+            action, _ = self.opponents.predict(
+                observation, action_masks=mask, deterministic=self.deterministic_opponents
+            )
+            self._play(int(action))
+
+    def _play(self, card: int):
+        state = self.state
+        player = state.action_on
+        state.play(card)
+        self.encoder.on_play(player, card, state.trick_len - 1)
+
+        if state.should_score_trick():
+            leader = state.action_on
+            trick = state.trick_cards()
+            winner = state.score_trick()
+            self.encoder.on_trick_scored()
+            # Winner takes the trick points, everyone else loses what they threw away
+            for i, played in enumerate(trick):
+                seat = (leader + i) % self.num_players
+                if seat != winner:
+                    self.rewards[seat] -= CARD_SCORE[played]
+            self.rewards[winner] += sum(CARD_SCORE[c] for c in trick)
+            self.tricks[winner] += 1
+
+        if state.needs_redeal():
+            state.redeal()
+            self.encoder.on_redeal(state)
+
+        if state.game_over():
+            _score, leader = state.leaders()[0]
+            self.rewards[leader] += WIN_REWARD
+            self.wins[leader] += 1
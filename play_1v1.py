@@ -1,12 +1,11 @@
+import argparse
 import glob
 import os
 import time
 
-from pettingzoo.test import api_test
-from sb3_contrib import MaskablePPO
-
 from lib.briscola_env.briscola_env import BriscolaEnv
 from lib.briscola_env.embedding import card_embedding, card_reverse_embedding
+from lib.inference.policy import BACKENDS, load_policy
 
 
 PLAYER_COUNT = 2
@@ -16,22 +15,22 @@ def make_env():
     return BriscolaEnv(num_players=PLAYER_COUNT)
 
 
-api_test(make_env(), num_cycles=1000)
-
-
-def play_1v1(player_position):
+def play_1v1(player_position, policy_path=None, backend="auto"):
     # Evaluate a trained agent vs a random agent
     env = make_env()
     print("Starting 1v1 game with player at position", player_position)
-    try:
-        latest_policy = max(
-            glob.glob(f"{env.metadata['name']}*.zip"), key=os.path.getctime
-        )
-    except ValueError:
-        print("Policy not found.")
-        raise
+    latest_policy = policy_path
+    if latest_policy is None:
+        extension = "onnx" if backend == "onnx" else "zip"
+        try:
+            latest_policy = max(
+                glob.glob(f"{env.metadata['name']}*.{extension}"), key=os.path.getctime
+            )
+        except ValueError:
+            print("Policy not found.")
+            raise
     print("Using policy:", latest_policy)
-    model = MaskablePPO.load(latest_policy)
+    model = load_policy(latest_policy, backend)
 
     env.reset()
 
@@ -66,4 +65,14 @@ def play_1v1(player_position):
 
 
 if __name__ == "__main__":
-    play_1v1(0)
+    parser = argparse.ArgumentParser(description="Play a 1v1 game against a trained policy.")
+    parser.add_argument("--position", type=int, default=0, help="your seat, 0 or 1")
+    parser.add_argument("--policy", default=None, help="policy file, latest briscola*.zip if omitted")
+    parser.add_argument("--backend", default="auto", choices=BACKENDS)
+    parser.add_argument("--api-test", action="store_true", help="run the PettingZoo API check first")
+    args = parser.parse_args()
+    if args.api_test:
+        from pettingzoo.test import api_test
+
+        api_test(make_env(), num_cycles=1000)
+    play_1v1(args.position, args.policy, args.backend)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from lib.actor_learner import ActorPool, AsyncMaskablePPO, segment_layout
+from lib.shared_arrays import SharedArrays
+
+
+def test_shared_arrays_attach_by_name():
+    layout = segment_layout(slots=2, n_steps=3, num_envs=4)
+    owner = SharedArrays(layout)
+    try:
+        owner["actions"][1, 2] = [1, 2, 3, 4]
+        owner["versions"][:] = [7, 8]
+        other = SharedArrays(layout, owner.name)
+        assert_array_equal(other["actions"][1, 2], [1, 2, 3, 4])
+        assert_array_equal(other["versions"], [7, 8])
+        other["rewards"][0, 0, 0] = 1.5
+        assert owner["rewards"][0, 0, 0] == 1.5
+        other.close()
+    finally:
+        owner.close()
+        owner.unlink()
+
+
+def test_invalid_pool():
+    with pytest.raises(ValueError):
+        ActorPool(0, 4)
+    with pytest.raises(ValueError):
+        ActorPool(1, 4, max_policy_lag=-1)
+
+
+def test_learns_from_actor_segments():
+    pool = ActorPool(num_actors=2, envs_per_actor=4, num_players=2, slots=2, max_policy_lag=1, seed=0)
+    try:
+        model = AsyncMaskablePPO(
+            "MlpPolicy", pool, n_steps=50, batch_size=100, n_epochs=1, seed=0, device="cpu"
+        )
+        model.learn(3 * 50 * 8)
+        assert model.num_timesteps == 3 * 50 * 8
+        assert pool.version == 2
+
+        buffer = model.rollout_buffer
+        assert buffer.full
+        # Training flattens the buffer env by env, except episode starts
+        actions = buffer.actions.astype(np.intp)
+        # Every stored action was legal under its stored mask
+        assert (np.take_along_axis(buffer.action_masks, actions, axis=1) == 1).all()
+        # Games last 40 plays, so every env started a new game within 50 steps
+        assert (buffer.episode_starts.sum(axis=0) >= 1).all()
+        assert len(model.ep_info_buffer) > 0
+        assert all(info["l"] == 40 for info in model.ep_info_buffer)
+
+        # One segment per actor per update, none past the lag bound
+        assert len(pool.lags) == 3 * 2
+        assert max(pool.lags) <= 1
+    finally:
+        pool.close()
+    assert not pool.processes
+
+
+def test_pool_cannot_be_stepped():
+    pool = ActorPool(1, 2)
+    with pytest.raises(NotImplementedError):
+        pool.step(np.zeros(2, dtype=np.int64))
+    pool.close()
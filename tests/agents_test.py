@@ -0,0 +1,108 @@
+from array import array
+
+import numpy as np
+import pytest
+
+from lib.agents.rules import AGENTS, GreedyAgent, PartnerAgent, TrumpHoarderAgent
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.embedding import game_embedding
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.evaluation.tournament import play_sets
+
+
+def position(players, briscola, hand, trick):
+    """
+    Observation and mask of the seat to act, holding `hand` after `trick`
+    was played, with every card given as an id.
+    """
+    deck = [briscola] + [c for c in range(40) if c != briscola]
+    game = BriscolaGame(players, deck=deck)
+    state = game.state
+    seat = len(trick) % players
+    state.hands[seat * 3 : seat * 3 + 3] = array("b", hand + [-1] * (3 - len(hand)))
+    state.hand_len[seat] = len(hand)
+    for i, card in enumerate(trick):
+        state.trick[i] = card
+    state.trick_len = len(trick)
+    state.action_on = seat
+    state.sync_bits()
+    mask = np.zeros(40, dtype=np.int8)
+    mask[hand] = 1
+    return game_embedding(game, seat), mask
+
+
+# Card ids: suit * 10 + rank - 1, suits cups, coins, swords, batons
+ACE, TWO, THREE, FOUR, KING = 0, 1, 2, 3, 9
+
+
+def card(suit, rank):
+    return suit * 10 + rank
+
+
+@pytest.mark.parametrize("name", list(AGENTS))
+@pytest.mark.parametrize("players", [2, 4])
+def test_agents_play_legal_cards(name, players):
+    agent = AGENTS[name]()
+    env = BriscolaVecEnv(64, num_players=players)
+    env.seed(0)
+    obs = env.reset()
+    for _ in range(80):
+        masks = env.action_masks()
+        actions, _ = agent.predict(obs, action_masks=masks)
+        assert masks[np.arange(64), actions].all()
+        obs, _, _, _ = env.step(actions)
+
+
+def test_single_observation():
+    obs, mask = position(2, card(3, TWO), [card(0, TWO), card(1, KING), card(2, FOUR)], [])
+    action, _ = GreedyAgent().predict(obs, action_masks=mask)
+    assert np.ndim(action) == 0
+    assert action == card(0, TWO)
+
+
+def test_greedy_wins_cheaply_or_dumps():
+    agent = GreedyAgent()
+    # Takes the king of cups with the three, not the ace
+    obs, mask = position(2, card(3, TWO), [card(0, ACE), card(0, THREE), card(1, TWO)], [card(0, KING)])
+    assert agent.predict(obs, action_masks=mask)[0] == card(0, THREE)
+    # Can't win without a trump on an empty trick, so throws the two away
+    obs, mask = position(2, card(3, TWO), [card(3, FOUR), card(1, TWO), card(2, ACE)], [card(0, FOUR)])
+    assert agent.predict(obs, action_masks=mask)[0] == card(1, TWO)
+    # An ace is worth a trump
+    obs, mask = position(2, card(3, TWO), [card(3, FOUR), card(1, TWO), card(2, ACE)], [card(0, ACE)])
+    assert agent.predict(obs, action_masks=mask)[0] == card(3, FOUR)
+
+
+def test_hoarder_keeps_trumps():
+    obs, mask = position(2, card(3, TWO), [card(3, FOUR), card(1, KING)], [card(0, FOUR)])
+    assert GreedyAgent(trump_cost=0).predict(obs, action_masks=mask)[0] == card(3, FOUR)
+    assert TrumpHoarderAgent().predict(obs, action_masks=mask)[0] == card(1, KING)
+
+
+def test_partner_loads_points():
+    # Seat 3 plays last after its partner at seat 1 took the lead with an ace
+    trick = [card(0, FOUR), card(0, ACE), card(0, TWO)]
+    obs, mask = position(4, card(3, TWO), [card(1, THREE), card(2, TWO), card(3, FOUR)], trick)
+    assert PartnerAgent().predict(obs, action_masks=mask)[0] == card(1, THREE)
+    assert GreedyAgent().predict(obs, action_masks=mask)[0] == card(3, FOUR)
+    # Not safe yet with an opponent still to play: dump instead of overtaking
+    obs, mask = position(4, card(3, TWO), [card(1, THREE), card(2, TWO), card(0, THREE)], trick[:2])
+    assert PartnerAgent().predict(obs, action_masks=mask)[0] == card(2, TWO)
+
+
+def test_partner_trump_safe_only_above_hidden_trumps():
+    # Seat 2 plays third after its partner at seat 0 led a trump
+    hand = [card(1, THREE), card(2, TWO), card(0, FOUR)]
+    # The four of trumps can be over-trumped by the opponent still to play
+    obs, mask = position(4, card(3, TWO), hand, [card(3, FOUR), card(0, KING)])
+    assert PartnerAgent().predict(obs, action_masks=mask)[0] == card(2, TWO)
+    # Nothing beats the ace of trumps
+    obs, mask = position(4, card(3, TWO), hand, [card(3, ACE), card(0, KING)])
+    assert PartnerAgent().predict(obs, action_masks=mask)[0] == card(1, THREE)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_agents_beat_random(players):
+    for name in AGENTS:
+        result = play_sets(name, "random", range(100), players)
+        assert result["wins"] > 80, name
@@ -0,0 +1,9 @@
+import pytest
+from pettingzoo.test import api_test
+
+from lib.briscola_env.briscola_env import BriscolaEnv
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_pettingzoo_api(players):
+    api_test(BriscolaEnv(num_players=players), num_cycles=1000)
@@ -0,0 +1,13 @@
+from benchmarks.suite import compare, measure
+
+
+def test_compare_flags_drops_beyond_threshold():
+    baseline = {"a": 100.0, "b": 100.0, "c": 100.0, "gone": 5.0}
+    metrics = {"a": 85.0, "b": 75.0, "c": 300.0}
+    regressions = compare(metrics, baseline, threshold=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b:")
+
+
+def test_measure_reports_rate():
+    assert measure(lambda: 10, min_time=0.01, repeats=2) > 0
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from lib.agents.rules import GreedyAgent
+from lib.briscola.core import BriscolaState, shuffled_deck
+from lib.briscola.suits import relabel_card
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.canonical import (
+    canonicalize,
+    permute_actions,
+    permute_masks,
+    permute_observations,
+    random_permutations,
+    restore_actions,
+)
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.cache import CachedPolicy, PolicyCache
+from lib.inference.policy import CanonicalPolicy
+from lib.search.endgame import EndgameSolver
+
+
+def random_actions(rng, masks):
+    return ((rng.random(masks.shape) + 1) * masks).argmax(axis=1)
+
+
+def played_positions(players: int, num_envs: int = 64):
+    env = BriscolaVecEnv(num_envs, num_players=players)
+    env.seed(players)
+    obs = env.reset()
+    rng = np.random.default_rng(players)
+    for _ in range(40):
+        masks = env.action_masks()
+        yield obs, masks
+        obs, *_ = env.step(random_actions(rng, masks))
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_same_canonical_form_under_any_relabelling(players):
+    rng = np.random.default_rng(0)
+    for obs, masks in played_positions(players):
+        canonical, canonical_masks, perms = canonicalize(obs, masks)
+        assert (canonical[:, 46] == 1).all()
+        assert_array_equal(canonical_masks, canonical[:, :40])
+
+        relabel = random_permutations(len(obs), rng)
+        again, again_masks, _ = canonicalize(permute_observations(obs, relabel), permute_masks(masks, relabel))
+        assert_array_equal(again, canonical)
+        assert_array_equal(again_masks, canonical_masks)
+
+        actions = random_actions(rng, masks)
+        moved = permute_actions(actions, perms)
+        assert canonical_masks[np.arange(len(obs)), moved].all()
+        assert_array_equal(restore_actions(moved, perms), actions)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_canonical_vec_env_plays_the_same_games(players):
+    env = BriscolaVecEnv(16, num_players=players, canonical=True)
+    reference = BriscolaVecEnv(16, num_players=players)
+    for e in [env, reference]:
+        e.set_seeds(list(range(16)))
+    obs, expected = env.reset(), reference.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        assert_array_equal(obs, canonicalize(expected)[0])
+        masks = reference.action_masks()
+        assert_array_equal(env.action_masks(), canonicalize(expected, masks)[1])
+        actions = random_actions(rng, masks)
+        obs, rewards, dones, infos = env.step(permute_actions(actions, canonicalize(expected)[2]))
+        expected, expected_rewards, _, expected_infos = reference.step(actions)
+        assert_array_equal(rewards, expected_rewards)
+    assert dones.all()
+    for info, expected_info in zip(infos, expected_infos):
+        assert_array_equal(info["terminal_observation"], canonicalize(expected_info["terminal_observation"][None])[0][0])
+
+
+def test_canonical_env_maps_actions():
+    env = BriscolaEnv(num_players=2, canonical=True)
+    raw = BriscolaEnv(num_players=2)
+    env.reset(seed=5)
+    raw.reset(seed=5)
+    rng = np.random.default_rng(0)
+    for agent in raw.agent_iter():
+        expected, _, termination, _, _ = raw.last()
+        if termination:
+            break
+        observation, action_mask = env.observe(agent).values()
+        canonical, canonical_masks, perms = canonicalize(expected["observation"][None], expected["action_mask"][None])
+        assert_array_equal(observation, canonical[0])
+        assert_array_equal(action_mask, canonical_masks[0])
+        action = int(rng.choice(np.flatnonzero(expected["action_mask"])))
+        env.step(int(permute_actions([action], perms)[0]))
+        raw.step(action)
+        assert env.rewards == raw.rewards
+    assert env.game.state.scores == raw.game.state.scores
+
+
+def test_canonical_policy_shares_cache_entries():
+    cached = CachedPolicy(GreedyAgent(), PolicyCache(1 << 12))
+    policy = CanonicalPolicy(cached)
+    obs, masks = list(played_positions(2))[10]
+    actions = policy.predict(obs, action_masks=masks)[0]
+    assert masks[np.arange(len(obs)), actions].all()
+
+    relabel = random_permutations(len(obs), np.random.default_rng(1))
+    hits = cached.cache.stats()["hits"]
+    moved = policy.predict(permute_observations(obs, relabel), action_masks=permute_masks(masks, relabel))[0]
+    assert cached.cache.stats()["hits"] == hits + len(obs)
+    assert_array_equal(moved, permute_actions(actions, relabel))
+
+
+def endgame(players: int, seed: int, perm=(0, 1, 2, 3)) -> BriscolaState:
+    deck = [relabel_card(int(c), perm) for c in shuffled_deck(seed)]
+    state = BriscolaState(players, deck, goes_first=seed % players)
+    rng = np.random.default_rng(seed)
+    while state.deck_size():
+        state.apply(int(rng.choice(state.hand(state.action_on))))
+    return state
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_canonical_solver_matches_raw_suits(players):
+    canonical = EndgameSolver()
+    raw = EndgameSolver(canonical=False)
+    for seed in range(30):
+        state = endgame(players, seed)
+        value, card = canonical.solve(state)
+        assert state.playable(card)
+        assert value == raw.solve(state)[0]
+
+        # The same game with its suits relabelled is found in the table
+        perm = tuple(np.random.default_rng(seed).permutation(4))
+        relabelled = endgame(players, seed, perm)
+        nodes = canonical.nodes
+        assert canonical.solve(relabelled) == (value, relabel_card(card, perm))
+        assert canonical.nodes - nodes == 1
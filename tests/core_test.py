@@ -0,0 +1,218 @@
+import numpy as np
+import pytest
+
+from lib.briscola.briscola import CARDS, BriscolaCard, BriscolaDeck
+from lib.briscola.core import (
+    CARD_BEATS,
+    CARD_SCORE,
+    CARD_STRENGTH,
+    CARD_SUIT,
+    BriscolaState,
+    bits_cards,
+    bits_mask,
+    cards_bits,
+    winning_index,
+)
+from lib.briscola.game import BriscolaGame
+from tests.reference_game import ReferenceBriscolaGame
+
+
+def assert_same_state(game: BriscolaGame, ref: ReferenceBriscolaGame):
+    assert game.action_on == ref.action_on
+    assert game.briscola == ref.briscola
+    assert game.trick == ref.trick
+    assert game.deck.cards == ref.deck.cards
+    for p, r in zip(game.players, ref.players):
+        assert p.hand == r.hand
+        assert p.score() == r.score()
+    assert game.needs_redeal() == ref.needs_redeal()
+    assert game.should_score_trick() == ref.should_score_trick()
+    assert game.game_over() == ref.game_over()
+
+
+def play_parity_game(players, goes_first, seed):
+    game = BriscolaGame(players, goes_first=goes_first, seed=seed)
+    ref = ReferenceBriscolaGame(players, goes_first=goes_first, seed=seed)
+    rng = np.random.default_rng(seed)
+    assert_same_state(game, ref)
+    while not ref.game_over():
+        hand = ref.players[ref.action_on].hand
+        card = hand[rng.integers(len(hand))]
+        game.play(card)
+        ref.play(card)
+        if ref.should_score_trick():
+            assert game.trick_winner() == ref.trick_winner()
+            assert game.score_trick() == ref.score_trick()
+        if ref.needs_redeal():
+            game.redeal()
+            ref.redeal()
+        assert_same_state(game, ref)
+    assert game.leaders() == ref.leaders()
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_move_for_move_parity(players):
+    for seed in range(300):
+        play_parity_game(players, seed % players, seed)
+
+
+def test_card_tables_match_card_objects():
+    for card in BriscolaDeck().cards:
+        assert CARDS[card.id] == card
+        score = {1: 11, 3: 10, 10: 4, 9: 3, 8: 2}.get(card.rank, 0)
+        assert CARD_SCORE[card.id] == score
+        assert CARD_STRENGTH[card.id] == (score + 20 if score else card.rank)
+        assert card.strength() == CARD_STRENGTH[card.id]
+
+
+def reference_winner(trick, trump):
+    ref = ReferenceBriscolaGame(4, seed=0)
+    ref.briscola = CARDS[trump * 10]
+    ref.trick = [CARDS[card] for card in trick]
+    ref.action_on = 0
+    return ref.trick_winner()[0]
+
+
+def test_every_two_card_trick():
+    for trump in range(4):
+        for a in range(40):
+            for b in range(40):
+                if a != b:
+                    assert winning_index([a, b], trump) == reference_winner([a, b], trump)
+
+
+def test_beats_table_every_trump_lead_and_pair():
+    for trump in range(4):
+        for lead in range(4):
+            for card in range(40):
+                for winner in range(40):
+                    if card == winner:
+                        continue
+                    # A low card sets the lead suit without outranking either card by accident
+                    first = next(lead * 10 + r for r in [1, 3, 4] if lead * 10 + r not in (card, winner))
+                    trick = [first, winner, card]
+                    beats = CARD_BEATS[trump][lead]
+                    index = 1 if beats[winner][first] else 0
+                    if beats[card][trick[index]]:
+                        index = 2
+                    assert index == reference_winner(trick, trump)
+                    assert index == winning_index(trick, trump)
+                    assert CARD_SUIT[first] == lead
+
+
+def test_play_by_hand_index():
+    game = BriscolaGame(2, seed=7)
+    first = game.players[0].hand[1]
+    game.play(1)
+    assert game.trick == [first]
+    assert first not in game.players[0].hand
+
+
+def test_unplayable_card_raises():
+    game = BriscolaGame(2, seed=3)
+    other = game.players[1].hand[0]
+    assert not game.playable(other)
+    with pytest.raises(Exception):
+        game.play(other)
+
+
+def test_invalid_setup():
+    with pytest.raises(ValueError):
+        BriscolaState.new(3)
+    with pytest.raises(ValueError):
+        BriscolaGame(2, goes_first=2)
+
+
+def test_trick_setter_round_trip():
+    game = BriscolaGame()
+    game.trick = [BriscolaCard("coins", 3), BriscolaCard("coins", 1)]
+    assert game.lead_suit() == "coins"
+    assert game.trick_winner() == (1, BriscolaCard("coins", 1))
+
+
+def snapshot(state):
+    return (
+        state.deck_pos,
+        state.hands.tolist(),
+        list(state.hand_len),
+        state.trick.tolist(),
+        state.trick_len,
+        list(state.piles),
+        list(state.scores),
+        state.action_on,
+        list(state.hand_bits),
+        state.deck_bits,
+    )
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_apply_undo_round_trip(players):
+    for seed in range(50):
+        state = BriscolaState.new(players, goes_first=seed % players, seed=seed)
+        rng = np.random.default_rng(seed)
+        history = []
+        while not state.game_over():
+            card = int(rng.choice(state.hand(state.action_on)))
+            history.append((snapshot(state), state.apply(card)))
+        for before, record in reversed(history):
+            state.undo(record)
+            assert snapshot(state) == before
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_apply_matches_play_score_redeal(players):
+    for seed in range(50):
+        state = BriscolaState.new(players, goes_first=seed % players, seed=seed)
+        stepped = state.clone()
+        rng = np.random.default_rng(seed)
+        while not state.game_over():
+            card = int(rng.choice(state.hand(state.action_on)))
+            state.apply(card)
+            stepped.play(card)
+            if stepped.should_score_trick():
+                stepped.score_trick()
+            if stepped.needs_redeal():
+                stepped.redeal()
+            assert snapshot(state) == snapshot(stepped)
+
+
+def test_clone_is_independent():
+    state = BriscolaState.new(4, seed=0)
+    clone = state.clone()
+    clone.apply(clone.hand(clone.action_on)[0])
+    assert snapshot(state) == snapshot(BriscolaState.new(4, seed=0))
+    game = BriscolaGame(2, seed=1)
+    copy = game.clone()
+    copy.play(0)
+    assert len(game.players[0].hand) == 3
+
+
+def test_bits_round_trip():
+    cards = [0, 7, 21, 39]
+    bits = cards_bits(cards)
+    assert bits_cards(bits) == cards
+    assert np.flatnonzero(bits_mask(bits)).tolist() == cards
+    assert bits_mask(0).shape == (40,)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_bitboards_track_hands_and_deck(players):
+    for seed in range(20):
+        game = BriscolaGame(players, seed=seed)
+        state = game.state
+        rng = np.random.default_rng(seed)
+        while not state.game_over():
+            unseen = state.deck_cards()
+            for p in range(players):
+                assert bits_cards(state.hand_bits[p]) == sorted(state.hand(p))
+                assert game.players[p].hand_bits == cards_bits(card.id for card in game.players[p].hand)
+                unseen += state.hand(p)
+            assert state.deck_bits == cards_bits(state.deck_cards()) == game.deck.bits
+            assert bits_cards(state.unseen_bits()) == sorted(unseen)
+            mask = state.action_mask(state.action_on)
+            assert np.flatnonzero(mask).tolist() == sorted(state.hand(state.action_on))
+            game.play(0)
+            if game.should_score_trick():
+                game.score_trick()
+            if game.needs_redeal():
+                game.redeal()
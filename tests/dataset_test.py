@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.canonical import canonicalize
+from lib.dataset import OfflineDataset, build_dataset, positions
+from lib.records import RecordWriter, read_records
+
+
+def record_games(path, players, games):
+    """
+    Play random games on BriscolaEnv, recording them, and return what the
+    env showed the acting seat at every play plus its return.
+    """
+    rng = np.random.default_rng(0)
+    expected = {"observations": [], "action_masks": [], "actions": [], "returns": []}
+    with RecordWriter(path) as writer:
+        env = BriscolaEnv(num_players=players, recorder=writer)
+        for seed in range(games):
+            env.reset(seed=seed)
+            acting, before = [], []
+            for agent in env.agent_iter():
+                obs, _, termination, truncation, _ = env.last()
+                if termination or truncation:
+                    break
+                action = int(rng.choice(np.flatnonzero(obs["action_mask"])))
+                expected["observations"].append(obs["observation"])
+                expected["action_masks"].append(obs["action_mask"])
+                expected["actions"].append(action)
+                acting.append(agent)
+                before.append(env.rewards[agent])
+                env.step(action)
+            expected["returns"] += [env.rewards[a] - b for a, b in zip(acting, before)]
+    return {name: np.array(values) for name, values in expected.items()}
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_positions_match_env(players, tmp_path):
+    path = str(tmp_path / "games.rec")
+    expected = record_games(path, players, 8)
+    actual = positions(read_records(path))
+    for name, values in expected.items():
+        assert_array_equal(actual[name], values)
+
+
+def test_build_and_stream_batches(tmp_path):
+    path = str(tmp_path / "games.rec")
+    expected = record_games(path, 2, 12)
+    manifest = build_dataset(path, str(tmp_path / "dataset"), shard_size=200, chunk_games=2)
+    assert manifest["positions"] == 480
+    assert [shard["positions"] for shard in manifest["shards"]] == [200, 200, 80]
+
+    dataset = OfflineDataset(str(tmp_path / "dataset"))
+    assert len(dataset) == 480
+    ordered = list(dataset.batches(batch_size=64, shuffle=False))
+    for name, values in expected.items():
+        assert_array_equal(np.concatenate([batch[name] for batch in ordered]), values)
+
+    shuffled = list(dataset.batches(batch_size=64, seed=0, prefetch=1))
+    assert sum(len(batch["actions"]) for batch in shuffled) == 480
+    returns = np.concatenate([batch["returns"] for batch in shuffled])
+    assert_array_equal(np.sort(returns), np.sort(expected["returns"]))
+    assert len(list(dataset.batches(batch_size=64, seed=0, drop_last=True))) == 3 + 3 + 1
+
+
+def test_abandoned_generator_stops_prefetch_thread(tmp_path):
+    path = str(tmp_path / "games.rec")
+    record_games(path, 4, 4)
+    build_dataset(path, str(tmp_path / "dataset"))
+    batches = OfflineDataset(str(tmp_path / "dataset")).batches(batch_size=1, prefetch=2)
+    next(batches)
+    batches.close()
+    assert not any(t.name == "dataset-prefetch" for t in threading.enumerate())
+
+
+def test_augmented_batches_relabel_suits(tmp_path):
+    path = str(tmp_path / "games.rec")
+    record_games(path, 4, 4)
+    build_dataset(path, str(tmp_path / "dataset"))
+    dataset = OfflineDataset(str(tmp_path / "dataset"))
+    plain = next(dataset.batches(batch_size=160, shuffle=False))
+    augmented = next(dataset.batches(batch_size=160, shuffle=False, seed=0, augment=True))
+    assert (augmented["observations"] != plain["observations"]).any()
+    assert_array_equal(canonicalize(augmented["observations"])[0], canonicalize(plain["observations"])[0])
+    assert augmented["action_masks"][np.arange(160), augmented["actions"]].all()
+    assert_array_equal(augmented["returns"], plain["returns"])
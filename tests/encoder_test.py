@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.embedding import full_cards_embedding, game_embedding
+from lib.briscola_env.encoder import ObservationEncoder
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_encoder_matches_game_embedding(players):
+    for seed in range(100):
+        game = BriscolaGame(players, goes_first=seed % players, seed=seed)
+        encoder = ObservationEncoder(players)
+        encoder.reset(game.state)
+        rng = np.random.default_rng(seed)
+        while not game.game_over():
+            for p in range(players):
+                assert_array_equal(game_embedding(game, p), encoder.observe(p))
+                assert_array_equal(full_cards_embedding(game.players[p].hand), encoder.action_mask(p))
+            player = game.action_on
+            hand = game.players[player].hand
+            card = hand[rng.integers(len(hand))]
+            game.play(card)
+            encoder.on_play(player, card.id, game.state.trick_len - 1)
+            if game.should_score_trick():
+                game.score_trick()
+                encoder.on_trick_scored()
+            if game.needs_redeal():
+                game.redeal()
+                encoder.on_redeal(game.state)
+
+
+def test_encoder_reset_mid_trick():
+    game = BriscolaGame(4, seed=5)
+    for _ in range(2):
+        game.play(0)
+    encoder = ObservationEncoder(4)
+    encoder.reset(game.state)
+    for p in range(4):
+        assert_array_equal(game_embedding(game, p), encoder.observe(p))
+
+
+def test_env_observations_match_game_embedding():
+    env = BriscolaEnv(num_players=4)
+    env.reset(seed=11)
+    for agent in env.agent_iter():
+        obs, _, termination, truncation, _ = env.last()
+        if termination or truncation:
+            break
+        agent_id = int(agent.replace("player_", ""))
+        assert_array_equal(game_embedding(env.game, agent_id), obs["observation"])
+        env.step(int(np.flatnonzero(obs["action_mask"])[0]))
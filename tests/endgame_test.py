@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from lib.briscola.core import BriscolaState
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.search.endgame import EndgamePolicy, EndgameSolver
+
+
+def play_to_endgame(players, seed, extra_plays=0):
+    state = BriscolaState.new(players, goes_first=seed % players, seed=seed)
+    rng = np.random.default_rng(seed)
+    while state.deck_size() or extra_plays:
+        if not state.deck_size():
+            extra_plays -= 1
+        state.play(int(rng.choice(state.hand(state.action_on))))
+        if state.should_score_trick():
+            state.score_trick()
+        if state.needs_redeal():
+            state.redeal()
+    return state
+
+
+def minimax(state, root):
+    """
+    Plain minimax with apply/undo, points `root` still takes.
+    """
+    if state.game_over():
+        return 0
+    maximizing = state.action_on == root
+    values = []
+    for card in state.hand(state.action_on):
+        score = state.scores[root]
+        record = state.apply(card)
+        values.append(state.scores[root] - score + minimax(state, root))
+        state.undo(record)
+    return max(values) if maximizing else min(values)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+@pytest.mark.parametrize("extra_plays", [0, 1, 3])
+def test_matches_minimax(players, extra_plays):
+    solver = EndgameSolver()
+    for seed in range(15):
+        state = play_to_endgame(players, seed, extra_plays)
+        value, card = solver.solve(state)
+        assert value == minimax(state, state.action_on)
+        assert state.in_hand(state.action_on, card)
+
+
+def test_best_card_reaches_value():
+    solver = EndgameSolver()
+    for seed in range(30):
+        state = play_to_endgame(2, seed)
+        root = state.action_on
+        value, _ = solver.solve(state)
+        taken = state.scores[root]
+        while not state.game_over():
+            _, card = solver.solve(state, root)
+            state.play(card)
+            if state.should_score_trick():
+                state.score_trick()
+        # Both sides play the solver's moves, so the root seat gets exactly the value
+        assert state.scores[root] - taken == value
+
+
+def test_transposition_table_hits():
+    solver = EndgameSolver()
+    state = play_to_endgame(4, 0)
+    solver.solve(state)
+    nodes = solver.nodes
+    solver.solve(state)
+    assert solver.hits > 0
+    assert solver.nodes - nodes == 1
+
+
+def test_rejects_non_endgame():
+    with pytest.raises(Exception, match="deck not empty"):
+        EndgameSolver().solve(BriscolaState.new(2, seed=0))
+
+
+class FirstCardPolicy:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        self.calls += 1
+        return np.array(int(np.flatnonzero(action_masks)[0])), None
+
+
+def test_policy_switches_to_solver_when_deck_empty():
+    env = BriscolaEnv(num_players=4)
+    env.reset(seed=0)
+    network = FirstCardPolicy()
+    policy = EndgamePolicy(network, lambda: env.game.state)
+    solver = EndgameSolver()
+    for agent in env.agent_iter():
+        obs, _, termination, truncation, _ = env.last()
+        if termination or truncation:
+            break
+        deck_empty = len(env.game.deck.cards) == 0
+        expected = solver.solve(env.game.state)[1] if deck_empty else None
+        calls = network.calls
+        action, _ = policy.predict(obs["observation"], action_masks=obs["action_mask"])
+        assert network.calls == calls + (not deck_empty)
+        if deck_empty:
+            assert action == expected
+        env.step(int(action))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from sb3_contrib import MaskablePPO
+
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.evaluation.harness import duplicate_evaluate, eval_action_mask, evaluate, independent_stderr
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    # The checkpoints in models/ predate the current embedding, use an untrained policy
+    model = MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=2), seed=0, device="cpu")
+    path = tmp_path_factory.mktemp("models") / "policy.zip"
+    model.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_random_baseline_matches_serial(players):
+    serial = eval_action_mask(-1, None, num_games=60, num_players=players)
+    batched = evaluate(-1, None, num_games=60, num_players=players, batch_size=16)
+    assert batched == serial
+
+
+def test_results_do_not_depend_on_worker_count(model_path):
+    one = evaluate(0, model_path, num_games=48, num_players=2, workers=1, batch_size=16)
+    two = evaluate(0, model_path, num_games=48, num_players=2, workers=2, batch_size=16)
+    assert one == two
+
+
+def test_model_matches_serial(model_path):
+    serial = eval_action_mask(1, model_path, num_games=24, num_players=2)
+    batched = evaluate(1, model_path, num_games=24, num_players=2, batch_size=8)
+    assert batched == serial
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_explicit_deal_matches_seeded_reset(players):
+    from lib.briscola.briscola import BriscolaDeck
+    from lib.briscola_env.briscola_env import BriscolaEnv
+    from lib.evaluation.harness import deal
+
+    seeded = BriscolaEnv(num_players=players)
+    explicit = BriscolaEnv(num_players=players)
+    for seed in range(10):
+        seeded.reset(seed=seed)
+        options = deal(seed, players)
+        explicit.reset(options=options)
+        assert explicit.game.state.hands == seeded.game.state.hands
+        assert explicit.agent_selection == seeded.agent_selection
+
+        # The same shuffled BriscolaDeck deals the same game
+        deck = BriscolaDeck()
+        deck.shuffle(seed)
+        explicit.reset(options={"deck": deck, "goes_first": options["goes_first"]})
+        assert explicit.game.state.hands == seeded.game.state.hands
+
+
+def test_duplicate_random_against_itself_is_exact():
+    summary = duplicate_evaluate(None, num_games=20, num_players=4, batch_size=8)
+    assert summary["mean_point_diff"] == 0
+    assert summary["stderr"] == 0
+    assert summary["ci"] == [0, 0]
+    assert summary["games"] == 160
+
+
+def test_independent_stderr_of_difference():
+    # Policy and baseline each play 1000 x 4 fresh games, variances 4 and 9
+    rng = np.random.default_rng(0)
+    points = rng.normal(60, 2, size=(1000, 4))
+    baseline_points = rng.normal(55, 3, size=(1000, 4))
+    assert independent_stderr(points, baseline_points) == pytest.approx(np.sqrt(13 / 4000), rel=0.05)
+
+
+def test_duplicate_statistics(model_path):
+    one = duplicate_evaluate(model_path, num_games=40, num_players=2, batch_size=16)
+    two = duplicate_evaluate(model_path, num_games=40, num_players=2, batch_size=16, workers=2)
+    assert one == two
+    low, high = one["ci"]
+    assert low <= one["mean_point_diff"] <= high
+    assert one["baseline_win_rate"] == 0.5
+
+
+def test_cache_does_not_change_results(model_path):
+    plain = duplicate_evaluate(model_path, num_games=16, num_players=2, workers=2, batch_size=8)
+    cached = duplicate_evaluate(model_path, num_games=16, num_players=2, workers=2, batch_size=8, cache_size=4096)
+    stats = cached.pop("cache")
+    assert cached == plain
+    assert stats["hits"] + stats["misses"] > 0
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import onnxruntime as ort
+import pytest
+import torch as th
+from numpy.testing import assert_allclose
+from sb3_contrib import MaskablePPO
+
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.export import VARIANTS, export_policy, sample_positions
+from lib.inference.policy import OnnxPolicy
+from lib.onnxable import OnnxableMaskableACPolicy
+
+
+@pytest.fixture(scope="module")
+def checkpoint(tmp_path_factory):
+    path = tmp_path_factory.mktemp("checkpoint") / "policy.zip"
+    MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=4), seed=3, device="cpu").save(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def exported(checkpoint, tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("models")
+    return export_policy(str(checkpoint), str(out_dir), positions=1024, batch_sizes=[1, 64], min_time=0.01)
+
+
+def test_report_saved_next_to_models(exported):
+    with open(exported["report"]) as f:
+        saved = json.load(f)
+    assert saved["variants"].keys() == set(VARIANTS)
+    assert saved["variants"]["fp32"]["agreement"] == 1.0
+    for variant in VARIANTS:
+        result = saved["variants"][variant]
+        assert result["agreement"] > 0.9
+        assert set(result["throughput"]) == {"1", "64"}
+    assert saved["variants"]["int8"]["bytes"] < saved["variants"]["fp32"]["bytes"]
+
+
+def test_exports_mask_in_graph_with_dynamic_batch(exported):
+    observations, masks = sample_positions(4, 100, seed=1)
+    for variant in VARIANTS:
+        path = exported["variants"][variant]["path"]
+        policy = OnnxPolicy(path)
+        assert policy.max_batch is None and policy.mask_input
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        dist, values = session.run(
+            None, {"input": observations.astype(np.float32), "action_mask": masks.astype(np.float32)}
+        )
+        assert dist.shape == (100, 40) and values.shape == (100, 1)
+        assert (dist[masks == 0] == 0).all()
+        assert_allclose(dist.sum(axis=1), 1, atol=1e-3)
+
+
+def test_masked_forward_renormalizes_legal_actions(checkpoint):
+    module = OnnxableMaskableACPolicy(MaskablePPO.load(checkpoint, device="cpu").policy)
+    observations, masks = sample_positions(4, 10)
+    observations = th.as_tensor(observations, dtype=th.float32)
+    with th.no_grad():
+        probs, _ = module(observations)
+        masked, _ = module(observations, th.as_tensor(masks, dtype=th.float32))
+    expected = probs.numpy() * masks
+    assert_allclose(masked.numpy(), expected / expected.sum(axis=1, keepdims=True), atol=1e-5)
+
+
+def test_needs_enough_positions_for_batches(checkpoint, tmp_path):
+    with pytest.raises(ValueError):
+        export_policy(str(checkpoint), str(tmp_path), positions=100, batch_sizes=[1, 1024])
@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+# Modules the game, envs, evaluation and inference front ends may import
+LIGHT_MODULES = [
+    "lib.briscola.game",
+    "lib.briscola.vec_game",
+    "lib.briscola_env.briscola_env",
+    "lib.briscola_env.vec_env",
+    "lib.briscola_env.subproc_vec_env",
+    "lib.agents.rules",
+    "lib.evaluation.harness",
+    "lib.evaluation.tournament",
+    "lib.inference.policy",
+    "lib.records",
+    "lib.serving.server",
+    "play_1v1",
+]
+HEAVY_MODULES = ["torch", "stable_baselines3", "sb3_contrib", "mlflow", "onnxruntime"]
+# Seconds, several times what the imports take on a laptop
+IMPORT_BUDGET = 1.0
+
+
+def run(code: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_light_imports_skip_heavy_dependencies():
+    result = run(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in LIGHT_MODULES)
+        + "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))"
+    )
+    assert result["heavy"] == []
+    assert result["elapsed"] < IMPORT_BUDGET
+
+
+def test_vec_env_is_sb3_vec_env_whenever_sb3_loads():
+    result = run(
+        "import json\n"
+        "from lib.briscola_env.vec_env import BriscolaVecEnv\n"
+        "env = BriscolaVecEnv(2)\n"
+        "from stable_baselines3.common.vec_env import VecEnv\n"
+        "from lib.league.vec_env import LeagueVecEnv\n"
+        "print(json.dumps([isinstance(env, VecEnv), issubclass(LeagueVecEnv, VecEnv)]))"
+    )
+    assert result == [True, True]
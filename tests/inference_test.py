@@ -0,0 +1,109 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import torch as th
+from numpy.testing import assert_array_equal
+from sb3_contrib import MaskablePPO
+
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.embedding import EMBEDDING_SHAPE
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.policy import OnnxPolicy, SB3Policy, load_policy
+from lib.onnxable import OnnxableMaskableACPolicy
+
+
+def export(model, path, dynamic_batch):
+    th.onnx.export(
+        OnnxableMaskableACPolicy(model.policy),
+        th.randn(1, *EMBEDDING_SHAPE),
+        path,
+        opset_version=17,
+        input_names=["input"],
+        output_names=["dist", "values"],
+        dynamic_axes={"input": {0: "batch"}, "dist": {0: "batch"}, "values": {0: "batch"}}
+        if dynamic_batch
+        else None,
+        dynamo=False,
+    )
+
+
+@pytest.fixture(scope="module")
+def policy_files(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("models")
+    model = MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=4), seed=3, device="cpu")
+    model.save(folder / "policy.zip")
+    export(model, str(folder / "policy.onnx"), dynamic_batch=True)
+    export(model, str(folder / "policy-fixed.onnx"), dynamic_batch=False)
+    return folder
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    env = BriscolaEnv(num_players=4)
+    rng = np.random.default_rng(0)
+    observations, masks = [], []
+    for seed in range(10):
+        env.reset(seed=seed)
+        for agent in env.agent_iter():
+            obs, _, termination, truncation, _ = env.last()
+            if termination or truncation:
+                break
+            observations.append(obs["observation"])
+            masks.append(obs["action_mask"])
+            env.step(int(rng.choice(np.flatnonzero(obs["action_mask"]))))
+    return np.array(observations), np.array(masks)
+
+
+@pytest.mark.parametrize("name", ["policy.onnx", "policy-fixed.onnx"])
+def test_onnx_matches_torch_policy(policy_files, recorded, name):
+    observations, masks = recorded
+    torch_policy = SB3Policy(str(policy_files / "policy.zip"))
+    onnx_policy = OnnxPolicy(str(policy_files / name))
+    expected, _ = torch_policy.predict(observations, action_masks=masks, deterministic=True)
+    actions, _ = onnx_policy.predict(observations, action_masks=masks, deterministic=True)
+    assert_array_equal(expected, actions)
+    # Buffers are reused, so smaller batches must not see stale rows
+    actions, _ = onnx_policy.predict(observations[:5], action_masks=masks[:5])
+    assert_array_equal(expected[:5], actions)
+    single, _ = onnx_policy.predict(observations[7], action_masks=masks[7])
+    assert single == expected[7]
+
+
+def test_sampled_actions_are_legal(policy_files, recorded):
+    observations, masks = recorded
+    policy = OnnxPolicy(str(policy_files / "policy.onnx"), seed=0)
+    actions, _ = policy.predict(observations, action_masks=masks, deterministic=False)
+    assert masks[np.arange(len(actions)), actions].all()
+
+
+def test_sampling_falls_back_to_legal_action(policy_files, recorded):
+    observations, _ = recorded
+    policy = OnnxPolicy(str(policy_files / "policy.onnx"), seed=0)
+    # Every legal probability underflowed
+    policy.action_probs = lambda observations, masks: np.zeros((len(observations), 40), dtype=np.float32)
+    masks = np.zeros((3, 40), dtype=np.int8)
+    masks[:, [5, 12]] = 1
+    actions, _ = policy.predict(observations[:3], action_masks=masks, deterministic=False)
+    assert_array_equal(actions, [5, 5, 5])
+
+
+def test_load_policy_by_extension(policy_files):
+    assert isinstance(load_policy(str(policy_files / "policy.onnx")), OnnxPolicy)
+    assert isinstance(load_policy(str(policy_files / "policy.zip")), SB3Policy)
+    with pytest.raises(ValueError):
+        load_policy(str(policy_files / "policy.zip"), backend="tf")
+
+
+def test_onnx_loads_fast_without_torch(policy_files):
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "from lib.inference.policy import OnnxPolicy\n"
+        f"OnnxPolicy({str(policy_files / 'policy.onnx')!r})\n"
+        "assert 'torch' not in sys.modules\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert float(out.stdout) < 1.0
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+from stable_baselines3.common.logger import KVWriter, Logger
+
+from lib import instrumentation
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.mlflow_logging import PhaseTimingCallback
+from lib.training_env import BriscolaTrainingEnv
+
+
+class CaptureOutputFormat(KVWriter):
+    def __init__(self):
+        self.rows = []
+
+    def write(self, key_values, key_excluded, step=0):
+        self.rows.append(dict(key_values))
+
+
+def play_env_game(players=2):
+    env = BriscolaEnv(num_players=players)
+    env.reset(seed=0)
+    for agent in env.agent_iter():
+        obs, _, termination, truncation, _ = env.last()
+        if termination or truncation:
+            break
+        env.step(int(np.flatnonzero(obs["action_mask"])[0]))
+
+
+def test_enable_times_phases_and_disable_restores():
+    original = BriscolaGame.play
+    instrumentation.stats.reset()
+    instrumentation.enable()
+    try:
+        assert instrumentation.is_enabled()
+        play_env_game()
+        snapshot = instrumentation.stats.snapshot()
+        assert snapshot["game.play"][0] == 40
+        assert snapshot["env.step"][0] == 40
+        assert snapshot["game.score_trick"][0] == 20
+        assert snapshot["env.step"][1] >= snapshot["game.play"][1]
+    finally:
+        instrumentation.disable()
+    assert BriscolaGame.play is original
+    assert not instrumentation.is_enabled()
+
+    instrumentation.stats.reset()
+    play_env_game()
+    assert instrumentation.stats.snapshot() == {}
+
+
+def test_callback_logs_phases_with_ppo_metrics():
+    capture = CaptureOutputFormat()
+    model = MaskablePPO("MlpPolicy", BriscolaTrainingEnv(num_players=2), n_steps=40, batch_size=20, seed=0)
+    model.set_logger(Logger(folder=None, output_formats=[capture]))
+    instrumentation.enable()
+    try:
+        model.learn(total_timesteps=80, callback=PhaseTimingCallback())
+    finally:
+        instrumentation.disable()
+    keys = set().union(*capture.rows)
+    assert "phases/policy.forward/calls" in keys
+    assert "phases/ppo.collect_rollouts/us_per_call" in keys
+    assert "time/fps" in keys
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_stack_sampler_writes_folded_stacks(tmp_path):
+    with instrumentation.StackSampler(interval=0.001) as sampler:
+        busy(0.2)
+    path = tmp_path / "stacks.folded"
+    sampler.write(str(path))
+    lines = path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy@instrumentation_test.py" in line for line in lines)
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from sb3_contrib import MaskablePPO
+
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.policy import TorchPolicy, load_policy
+from lib.league.league import LEARNER, RANDOM, League, LeagueCallback
+from lib.league.pool import SnapshotPool
+from lib.league.ratings import EloTable
+from lib.league.vec_env import LeagueVecEnv
+
+
+@pytest.fixture(scope="module")
+def model():
+    return MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=4), seed=0, device="cpu")
+
+
+def test_elo_update_is_zero_sum():
+    table = EloTable(k=32)
+    assert table.expected("a", "b") == 0.5
+    table.update("a", "b", 1)
+    assert table.rating("a") == 1016 and table.rating("b") == 984
+    assert table.expected("a", "b") > 0.5
+    assert [row[0] for row in table.table()] == ["a", "b"]
+
+
+def test_torch_snapshot_matches_model(model, tmp_path):
+    path = str(tmp_path / "policy.pt")
+    model.policy.save(path)
+    policy = load_policy(path)
+    assert isinstance(policy, TorchPolicy)
+    env = BriscolaVecEnv(16, num_players=4)
+    env.seed(0)
+    obs = env.reset()
+    masks = env.action_masks()
+    expected, _ = model.predict(obs, action_masks=masks, deterministic=True)
+    actual, _ = policy.predict(obs, action_masks=masks, deterministic=True)
+    assert_array_equal(expected, actual)
+
+
+def test_pool_keeps_loaded_policies_bounded(model, tmp_path):
+    pool = SnapshotPool(str(tmp_path), max_loaded=2)
+    names = [pool.add(model) for _ in range(3)]
+    assert len(set(names)) == 3
+    for name in [names[0], names[1], names[0], names[2]]:
+        pool.get(name)
+    # names[1] was least recently used when names[2] came in
+    assert list(pool.loaded) == [names[0], names[2]]
+    assert (pool.loads, pool.evictions) == (3, 1)
+
+    # Snapshots on disk are found again by a new pool
+    assert SnapshotPool(str(tmp_path)).names == names
+
+
+def test_league_env_only_exposes_learner_seat(model, tmp_path):
+    league = League(SnapshotPool(str(tmp_path), max_loaded=1), seed=0)
+    league.snapshot(model)
+    env = LeagueVecEnv(6, league, num_players=4)
+    env.seed(0)
+    obs = env.reset()
+    rng = np.random.default_rng(0)
+    finished = 0
+    for _ in range(60):
+        game = env.game
+        masks = env.action_masks()
+        assert (game.action_on == env.seats).all()
+        assert_array_equal(obs[:, :40], masks)
+        actions = ((rng.random(masks.shape) + 1) * masks).argmax(axis=1)
+        obs, rewards, dones, infos = env.step(actions)
+        finished += dones.sum()
+        for i in np.flatnonzero(dones):
+            assert infos[i]["terminal_observation"][:40].sum() == 0
+    assert finished > 0
+    # Every finished game rated the learner against its 3 opponents
+    assert league.ratings.games[LEARNER] == 3 * finished
+    assert league.ratings.games[RANDOM] + league.ratings.games["snapshot_000000.pt"] == 3 * finished
+
+
+def test_callback_snapshots_during_training(tmp_path):
+    league = League(SnapshotPool(str(tmp_path), max_loaded=2), seed=0)
+    env = LeagueVecEnv(4, league, num_players=2)
+    model = MaskablePPO("MlpPolicy", env, n_steps=32, batch_size=32, n_epochs=1, seed=0, device="cpu")
+    model.learn(256, callback=LeagueCallback(league, snapshot_every=64))
+    assert len(league.pool) == 4
+    assert len(league.pool.loaded) <= 2
+
+
+def test_loads_stay_bounded_with_more_snapshots_than_loaded(model, tmp_path):
+    league = League(SnapshotPool(str(tmp_path), max_loaded=3), seed=0)
+    for _ in range(12):
+        league.snapshot(model)
+    env = LeagueVecEnv(32, league, num_players=4)
+    env.seed(0)
+    env.reset()
+    rng = np.random.default_rng(0)
+
+    def play(steps):
+        for _ in range(steps):
+            masks = env.action_masks()
+            env.step(((rng.random(masks.shape) + 1) * masks).argmax(axis=1))
+
+    play(40)
+    # Games finished and restarted, all against the same active snapshots
+    assert len(set(league.active)) == 3
+    assert league.pool.loads == 3 and league.pool.evictions == 0
+    league.refresh()
+    play(20)
+    assert league.pool.loads <= 6
+
+
+def test_league_streams_are_independent(tmp_path):
+    league = League(SnapshotPool(str(tmp_path)), seed=0)
+    first = (league.rng.random(), league.random_policy.rng.random())
+    assert first[0] != first[1]
+    # Still reproducible from the seed
+    again = League(SnapshotPool(str(tmp_path)), seed=0)
+    assert (again.rng.random(), again.random_policy.rng.random()) == first
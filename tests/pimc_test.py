@@ -0,0 +1,99 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from lib.briscola.core import BriscolaState
+from lib.briscola.vec_game import BriscolaVecGame
+from lib.search.pimc import PIMCPlayer, PIMCPolicy, determinize, hidden_cards, playouts
+
+
+def advance(state, plays, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(plays):
+        state.apply(int(rng.choice(state.hand(state.action_on))))
+    return state
+
+
+def test_load_matches_state():
+    state = advance(BriscolaState.new(4, seed=3), 11)
+    game = BriscolaVecGame(2, players=4)
+    game.load([1], state)
+    assert game.hands[1].tolist() == np.reshape(state.hands.tolist(), (4, 3)).tolist()
+    assert game.trick[1].tolist() == state.trick.tolist()
+    assert game.scores[1].tolist() == state.scores
+    for seat in range(4):
+        assert sum(1 << int(c) for c in np.flatnonzero(game.piles[1, seat])) == state.piles[seat]
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_hidden_cards_exclude_own_hand_and_briscola(players):
+    state = advance(BriscolaState.new(players, seed=5), 7)
+    hidden = set(hidden_cards(state, state.action_on).tolist())
+    assert not hidden & set(state.hand(state.action_on))
+    assert state.briscola not in hidden
+    seen = set(state.trick_cards()) | set(state.hand(state.action_on)) | {state.briscola}
+    for pile in state.piles:
+        seen |= {c for c in range(40) if pile >> c & 1}
+    assert hidden | seen == set(range(40))
+
+
+@pytest.mark.parametrize("players, seed", [(2, 2), (4, 1)])
+def test_determinizations_keep_drawn_briscola_with_its_seat(players, seed):
+    # The last deal handed the turned up briscola to the last seat
+    state = advance(BriscolaState.new(players, seed=seed), 40 - 3 * players)
+    holder = players - 1
+    assert not state.deck_cards() and state.briscola in state.hand(holder) and state.action_on != holder
+    assert state.briscola not in hidden_cards(state, state.action_on)
+    game = determinize(state, state.action_on, 64, np.random.default_rng(0))
+    assert (game.hands[:, holder] == state.briscola).any(axis=1).all()
+    for seat in range(players):
+        counts = (game.hands[:, seat] >= 0).sum(axis=1)
+        assert (counts == state.hand_len[seat]).all()
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_playouts_cover_every_card_and_finish(players):
+    state = advance(BriscolaState.new(players, seed=1), 5)
+    cards, totals, counts = playouts(state, budget=0, batch_size=32, seed=0)
+    assert sorted(cards.tolist()) == sorted(state.hand(state.action_on))
+    assert counts.tolist() == [32] * len(cards)
+    # Final points of the seat never drop below what it already took
+    assert (totals >= counts * state.scores[state.action_on]).all()
+    assert (totals <= counts * 120).all()
+
+
+def test_search_ignores_hidden_placement():
+    state = advance(BriscolaState.new(4, seed=4), 6)
+    seat = state.action_on
+    # Swap a card between another seat's hand and the deck
+    other = (seat + 1) % 4
+    moved = state.clone()
+    moved.deck = moved.deck[:]
+    slot = other * 3
+    moved.hands[slot], moved.deck[moved.deck_pos] = moved.deck[moved.deck_pos], moved.hands[slot]
+    moved.sync_bits()
+    assert moved.hand(other) != state.hand(other)
+
+    expected = PIMCPlayer(budget=10, max_playouts=128, batch_size=64, seed=0).search(state)
+    actual = PIMCPlayer(budget=10, max_playouts=128, batch_size=64, seed=0).search(moved)
+    for e, a in zip(expected, actual):
+        np.testing.assert_array_equal(e, a)
+
+
+def test_pool_shards_add_up():
+    state = advance(BriscolaState.new(4, seed=2), 3)
+    with ThreadPoolExecutor(2) as executor:
+        player = PIMCPlayer(budget=10, max_playouts=256, batch_size=64, executor=executor, workers=2, seed=0)
+        cards, means, counts = player.search(state)
+    assert counts.tolist() == [128] * len(cards)
+    with ProcessPoolExecutor(2) as executor:
+        player = PIMCPlayer(budget=10, max_playouts=256, batch_size=64, executor=executor, workers=2, seed=0)
+        assert player.search(state)[2].tolist() == [128] * len(cards)
+
+
+def test_policy_returns_held_card():
+    state = BriscolaState.new(4, seed=0)
+    policy = PIMCPolicy(PIMCPlayer(budget=0, batch_size=16, seed=0), lambda: state)
+    action, _ = policy.predict(np.zeros(87, dtype=np.uint8))
+    assert state.in_hand(state.action_on, int(action))
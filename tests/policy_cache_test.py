@@ -0,0 +1,148 @@
+import multiprocessing as mp
+import os
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from sb3_contrib import MaskablePPO
+
+from lib.agents.rules import GreedyAgent
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.inference.cache import CachedPolicy, PolicyCache, file_version
+from lib.inference.policy import Policy
+
+
+class CountingPolicy(Policy):
+    """
+    Plays the highest legal card, counting the positions it is asked.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        self.calls += len(observation)
+        return 39 - np.asarray(action_masks)[:, ::-1].argmax(axis=1), None
+
+
+def positions(num_envs: int, steps: int, seed: int = 0):
+    env = BriscolaVecEnv(num_envs, num_players=2)
+    env.seed(seed)
+    obs = env.reset()
+    rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        masks = env.action_masks()
+        yield obs, masks
+        obs, *_ = env.step(((rng.random(masks.shape) + 1) * masks).argmax(axis=1))
+
+
+def test_matches_policy_and_counts():
+    agent = GreedyAgent()
+    cached = CachedPolicy(agent, PolicyCache(1 << 10))
+    for obs, masks in positions(64, 40):
+        assert_array_equal(cached.predict(obs, action_masks=masks)[0], agent.predict(obs, action_masks=masks)[0])
+    stats = cached.cache.stats()
+    assert stats["hits"] + stats["misses"] == 64 * 40
+    assert stats["capacity"] == 1 << 10 and 0.9 * stats["capacity"] < stats["size"] <= stats["capacity"]
+    assert stats["evictions"] > 0
+
+    obs, masks = next(positions(8, 1))
+    assert cached.predict(obs[0], action_masks=masks[0])[0] == agent.predict(obs, action_masks=masks)[0][0]
+
+
+def test_hits_skip_the_policy():
+    policy = CountingPolicy()
+    cached = CachedPolicy(policy, PolicyCache(1024))
+    obs, masks = next(positions(16, 1))
+    first = cached.predict(obs, action_masks=masks)[0]
+    second = cached.predict(obs, action_masks=masks)[0]
+    assert_array_equal(first, second)
+    assert policy.calls == 16
+    assert cached.cache.stats()["hits"] == 16
+    # Sampling is never cached
+    cached.predict(obs, action_masks=masks, deterministic=False)
+    assert policy.calls == 32
+
+
+def test_least_recently_used_is_evicted():
+    cache = PolicyCache(capacity=2, ways=2)
+    obs = np.zeros((3, 87), dtype=np.uint8)
+    obs[:, 0] = [1, 2, 3]
+    masks = np.ones((3, 40), dtype=np.int8)
+    version = b"v" * 8
+    compute = lambda o, m: o[:, 0].astype(np.int64)
+    cache.get(obs[:1], masks[:1], version, compute)
+    cache.get(obs[1:2], masks[1:2], version, compute)
+    # Touch the first entry, so the second is the one replaced
+    cache.get(obs[:1], masks[:1], version, compute)
+    cache.get(obs[2:], masks[2:], version, compute)
+    assert cache.stats()["evictions"] == 1
+    hits = cache.stats()["hits"]
+    cache.get(obs[:1], masks[:1], version, compute)
+    assert cache.stats()["hits"] == hits + 1
+    cache.get(obs[1:2], masks[1:2], version, compute)
+    assert cache.stats()["hits"] == hits + 1
+    # Another version never hits
+    cache.get(obs[:1], masks[:1], b"w" * 8, compute)
+    assert cache.stats()["hits"] == hits + 1
+
+
+def _fill(cache: PolicyCache, seed: int):
+    policy = CachedPolicy(CountingPolicy(), cache)
+    for obs, masks in positions(32, 10, seed):
+        policy.predict(obs, action_masks=masks)
+    cache.close()
+
+
+def test_shared_between_processes():
+    cache = PolicyCache(1 << 14, shared=True)
+    try:
+        process = mp.get_context("fork").Process(target=_fill, args=(cache, 3))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        assert cache.stats()["misses"] == 320
+
+        policy = CountingPolicy()
+        cached = CachedPolicy(policy, cache)
+        for obs, masks in positions(32, 10, 3):
+            cached.predict(obs, action_masks=masks)
+        assert policy.calls < 32 * 10 / 2
+        assert cache.stats()["hits"] == 320 - policy.calls
+    finally:
+        cache.close()
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    path = str(tmp_path / "policy.zip")
+    MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=2), seed=0, device="cpu").save(path)
+    cached = CachedPolicy.load(path, PolicyCache(1024), check_every=0)
+    obs, masks = next(positions(16, 1))
+    cached.predict(obs, action_masks=masks)
+    version = cached.version
+
+    other = MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=2), seed=1, device="cpu")
+    other.save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    actions = cached.predict(obs, action_masks=masks)[0]
+    assert cached.reloads == 1 and cached.version == file_version(path) != version
+    assert cached.cache.stats()["hits"] == 0
+    assert_array_equal(actions, other.predict(obs, action_masks=masks, deterministic=True)[0])
+
+
+def test_batch_misses_sharing_a_set_are_all_stored():
+    cache = PolicyCache(64, ways=8)
+    rng = np.random.default_rng(0)
+    observations = rng.integers(0, 2, size=(512, 87)).astype(np.uint8)
+    masks = np.ones((512, 40), dtype=np.int8)
+    version = b"\0" * 8
+    _, sets = cache.lookup(cache.keys(observations, masks, version))
+    same = np.flatnonzero(sets == sets[0])[:5]
+    assert len(same) == 5
+
+    policy = CountingPolicy()
+    compute = lambda obs, m: policy.predict(obs, action_masks=m)[0]
+    cache.get(observations[same], masks[same], version, compute)
+    cache.get(observations[same], masks[same], version, compute)
+    assert policy.calls == 5
+    assert cache.stats()["hits"] == 5
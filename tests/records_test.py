@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.evaluation.harness import evaluate
+from lib.records import MAGIC, RECORD_DTYPE, RecordWriter, new_records, read_records, replay
+
+
+def assert_replays_to_scores(record):
+    games = list(replay(record))
+    assert len(games) == 41
+    players = int(record["num_players"])
+    assert games[-1].game_over()
+    assert [p.score() for p in games[-1].players] == record["scores"][:players].tolist()
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_env_records_replay(players, tmp_path):
+    path = str(tmp_path / "games.rec")
+    rng = np.random.default_rng(0)
+    with RecordWriter(path, buffer_size=4) as writer:
+        env = BriscolaEnv(num_players=players, recorder=writer)
+        for seed in range(10):
+            env.reset(seed=seed)
+            for agent in env.agent_iter():
+                obs, _, termination, truncation, _ = env.last()
+                if termination or truncation:
+                    break
+                env.step(int(rng.choice(np.flatnonzero(obs["action_mask"]))))
+
+    records = read_records(path)
+    assert isinstance(records, np.memmap)
+    assert records.dtype == RECORD_DTYPE and len(records) == 10
+    for seed, record in enumerate(records):
+        env.reset(seed=seed)
+        assert record["deck"].tolist() == env.game.state.deck.tolist()
+        assert record["goes_first"] == env.goes_first
+        assert_replays_to_scores(record)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_vec_env_records_finished_games(players, tmp_path):
+    path = str(tmp_path / "games.rec")
+    with RecordWriter(path) as writer:
+        env = BriscolaVecEnv(3, num_players=players, recorder=writer)
+        env.seed(0)
+        env.reset()
+        rng = np.random.default_rng(0)
+        for _ in range(100):
+            masks = env.action_masks()
+            env.step(((rng.random(masks.shape) + 1) * masks).argmax(axis=1))
+        assert writer.written + writer.size == 6
+    for record in read_records(path):
+        assert_replays_to_scores(record)
+
+
+def test_replay_steps_match_env(tmp_path):
+    path = str(tmp_path / "games.rec")
+    with RecordWriter(path) as writer:
+        env = BriscolaEnv(num_players=4, recorder=writer)
+        env.reset(seed=3)
+        states = []
+        for agent in env.agent_iter():
+            obs, _, termination, truncation, _ = env.last()
+            if termination or truncation:
+                break
+            states.append(repr(env.game.state))
+            env.step(int(np.flatnonzero(obs["action_mask"])[-1]))
+    replayed = [repr(game.state) for game in replay(read_records(path)[0])]
+    assert replayed[:-1] == states
+    assert len(list(replay(read_records(path)[0], steps=5))) == 6
+
+
+def test_reader_skips_partial_record_and_checks_magic(tmp_path):
+    path = tmp_path / "games.rec"
+    records = new_records(5)
+    records["num_players"] = 2
+    records["goes_first"] = np.arange(5)
+    with RecordWriter(str(path), buffer_size=2) as writer:
+        writer.write(records)
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 10)
+    assert_array_equal(read_records(str(path))["goes_first"], np.arange(5))
+
+    # Appending to an existing file keeps its header
+    with RecordWriter(str(path)) as writer:
+        writer.write(records[:1])
+    assert path.read_bytes().count(MAGIC) == 1
+
+    # Appending after a partial record drops it, keeping later records aligned
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 10)
+    with RecordWriter(str(path)) as writer:
+        writer.write(records[1:])
+    assert_array_equal(read_records(str(path))["goes_first"], np.concatenate([np.arange(5), np.arange(5)]))
+    assert (path.stat().st_size - len(MAGIC)) % RECORD_DTYPE.itemsize == 0
+
+    other = tmp_path / "other.rec"
+    other.write_bytes(b"not records")
+    with pytest.raises(ValueError):
+        read_records(str(other))
+
+
+def test_evaluate_records_games_in_seed_order(tmp_path):
+    one, two = str(tmp_path / "one.rec"), str(tmp_path / "two.rec")
+    evaluate(-1, None, num_games=30, num_players=2, batch_size=8, record_path=one)
+    evaluate(-1, None, num_games=30, num_players=2, batch_size=8, workers=2, record_path=two)
+    assert_array_equal(read_records(one), read_records(two))
+    env = BriscolaEnv(num_players=2)
+    for seed, record in enumerate(read_records(one)):
+        env.reset(seed=seed)
+        assert record["deck"].tolist() == env.game.state.deck.tolist()
+        assert_replays_to_scores(record)
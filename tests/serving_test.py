@@ -0,0 +1,155 @@
+import asyncio
+
+import numpy as np
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from numpy.testing import assert_array_equal
+
+from lib.agents.rules import GreedyAgent
+from lib.briscola.game import BriscolaGame
+from lib.briscola_env.embedding import game_embedding
+from lib.inference.policy import Policy
+from lib.serving.batcher import MicroBatcher
+from lib.serving.server import create_app
+from lib.serving.sessions import SessionStore
+from lib.serving.views import game_from_view, view_embedding
+
+
+class CountingPolicy(Policy):
+    """
+    Plays the lowest legal card and records the size of every batch.
+    """
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        self.batch_sizes.append(len(observation))
+        return np.asarray(action_masks).argmax(axis=1), None
+
+
+def seat_view(game: BriscolaGame) -> dict:
+    state = game.state
+    played = [c for c in range(40) if any(pile >> c & 1 for pile in state.piles)]
+    return {
+        "players": state.num_players,
+        "hand": state.hand(state.action_on),
+        "trick": state.trick_cards(),
+        "briscola": state.briscola,
+        "played": played,
+        "deck_size": state.deck_size() + 1 if state.deck_size() else 0,
+    }
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_view_embeds_like_the_game(players):
+    rng = np.random.default_rng(players)
+    for seed in range(5):
+        game = BriscolaGame(players=players, seed=seed)
+        state = game.state
+        while not state.game_over():
+            view = seat_view(game)
+            observation, mask = view_embedding(view)
+            assert_array_equal(observation, game_embedding(game, state.action_on))
+            assert_array_equal(np.flatnonzero(mask), sorted(view["hand"]))
+            state.apply(int(rng.choice(view["hand"])))
+
+
+def test_bad_views():
+    with pytest.raises(ValueError):
+        game_from_view(2, [1, 2], [], 1, [], 30)
+    with pytest.raises(ValueError):
+        game_from_view(3, [1], [], 5, [], 30)
+    with pytest.raises(ValueError):
+        game_from_view(2, [40], [], 5, [], 30)
+    with pytest.raises(ValueError):
+        view_embedding({"players": 2, "hand": [1]})
+    # The briscola may be in hand once it has been dealt
+    game = game_from_view(2, [1, 2], [], 1, [], 0)
+    assert game_embedding(game, 0)[[1, 45, 47 + 1]].tolist() == [1, 1, 1]
+
+
+def test_batches_concurrent_requests():
+    policy = CountingPolicy()
+
+    async def run():
+        batcher = MicroBatcher(policy, max_batch=32, max_wait=0.05)
+        await batcher.start()
+        masks = np.eye(40, dtype=np.int8)
+        try:
+            cards = await asyncio.gather(*[batcher.predict(np.zeros(87, np.uint8), masks[i]) for i in range(40)])
+        finally:
+            await batcher.stop()
+        return cards, batcher.metrics()
+
+    cards, metrics = asyncio.run(run())
+    assert cards == list(range(40))
+    assert policy.batch_sizes == [32, 8]
+    assert metrics["requests"] == 40 and metrics["batches"] == 2
+    assert metrics["max_queue_depth"] == 40
+    assert 0 < metrics["latency_p50_ms"] <= metrics["latency_p99_ms"]
+
+
+def test_sessions_expire():
+    now = [0.0]
+    store = SessionStore(ttl=10, max_sessions=2, clock=lambda: now[0])
+    a = store.create(BriscolaGame(players=2, seed=0))
+    now[0] = 5
+    b = store.create(BriscolaGame(players=2, seed=1))
+    now[0] = 12
+    assert a not in store
+    assert store.get(b).state.num_players == 2
+    c = store.create(BriscolaGame(players=2, seed=2))
+    d = store.create(BriscolaGame(players=2, seed=3))
+    # Least recently used makes room
+    assert b not in store and c in store and d in store
+    now[0] = 30
+    assert store.evict_expired() == 2
+    assert len(store) == 0
+    with pytest.raises(KeyError):
+        store.get(c)
+
+
+def test_http_and_websocket():
+    async def run():
+        async with TestClient(TestServer(create_app(GreedyAgent(), max_wait=0.01))) as client:
+            response = await client.post("/games", json={"players": 2, "seed": 3})
+            assert response.status == 201
+            game = await response.json()
+            game_id = game["game_id"]
+            human = game["hands"][0][0]
+
+            response = await client.post(f"/games/{game_id}/play", json={"card": human})
+            assert (await response.json())["trick"] == [human]
+            response = await client.post(f"/games/{game_id}/play", json={"card": human})
+            assert response.status == 400
+
+            response = await client.post("/move", json={"game_id": game_id, "play": True})
+            move = await response.json()
+            assert move["card"] in game["hands"][1]
+            assert move["game"]["trick"] == []
+
+            view = {"players": 4, "hand": [0, 11, 25], "trick": [4, 5], "briscola": 30, "deck_size": 20}
+            responses = await asyncio.gather(*[client.post("/move", json={"state": view}) for _ in range(20)])
+            cards = {(await response.json())["card"] for response in responses}
+            assert len(cards) == 1 and cards <= {0, 11, 25}
+
+            assert (await client.post("/move", json={"game_id": "missing"})).status == 404
+            assert (await client.post("/move", json={"state": {"players": 2}})).status == 400
+
+            async with client.ws_connect("/ws") as ws:
+                for i in range(3):
+                    await ws.send_json({"id": i, "state": dict(view, hand=[i])})
+                await ws.send_json({"id": "x", "game_id": "missing"})
+                replies = {}
+                for _ in range(4):
+                    reply = await ws.receive_json()
+                    replies[reply["id"]] = reply
+            assert [replies[i]["card"] for i in range(3)] == [0, 1, 2]
+            assert "error" in replies["x"]
+
+            metrics = await (await client.get("/metrics")).json()
+            assert metrics["requests"] == 24 and metrics["sessions"] == 1
+            assert metrics["batches"] < metrics["requests"]
+
+    asyncio.run(run())
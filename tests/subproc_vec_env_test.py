@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.utils import get_action_masks, is_masking_supported
+
+from lib.briscola_env.subproc_vec_env import SubprocBriscolaVecEnv
+from lib.briscola_env.vec_env import BriscolaVecEnv
+
+
+def random_actions(rng, masks):
+    return ((rng.random(masks.shape) + 1) * masks).argmax(axis=1)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_matches_vec_env(players):
+    seeds = list(range(100, 110))
+    env = SubprocBriscolaVecEnv(len(seeds), num_players=players, num_workers=3, start_method="fork")
+    reference = BriscolaVecEnv(len(seeds), num_players=players)
+    try:
+        env.set_seeds(seeds)
+        reference.set_seeds(seeds)
+        assert_array_equal(env.reset(), reference.reset())
+        rng = np.random.default_rng(0)
+        for step in range(40):
+            masks = env.action_masks()
+            assert_array_equal(masks, reference.action_masks())
+            actions = random_actions(rng, masks)
+            obs, rewards, dones, infos = env.step(actions)
+            expected_obs, expected_rewards, expected_dones, expected_infos = reference.step(actions)
+            assert_array_equal(rewards, expected_rewards)
+            assert_array_equal(dones, expected_dones)
+            for info, expected in zip(infos, expected_infos):
+                assert info.keys() == expected.keys()
+                assert info["tricks"] == expected["tricks"] and info["wins"] == expected["wins"]
+            if step < 39:
+                assert_array_equal(obs, expected_obs)
+        # Every game ended on the 40th play and was dealt again
+        assert dones.all()
+        for info, expected in zip(infos, expected_infos):
+            assert_array_equal(info["terminal_observation"], expected["terminal_observation"])
+    finally:
+        env.close()
+
+
+def test_masks_for_maskable_ppo():
+    env = SubprocBriscolaVecEnv(4, num_players=2, num_workers=2)
+    try:
+        assert is_masking_supported(env)
+        env.reset()
+        masks = get_action_masks(env)
+        assert masks.shape == (4, 40)
+        assert (masks.sum(axis=1) == 3).all()
+
+        model = MaskablePPO("MlpPolicy", env, n_steps=16, batch_size=32, n_epochs=1, seed=0, device="cpu")
+        model.learn(64)
+        assert model.num_timesteps == 64
+    finally:
+        env.close()
+    env.close()
+    assert not any(process.is_alive() for process in env.processes)
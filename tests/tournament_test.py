@@ -0,0 +1,103 @@
+import math
+import shutil
+
+import pytest
+from sb3_contrib import MaskablePPO
+
+from lib.briscola_env.vec_env import BriscolaVecEnv
+from lib.evaluation.tournament import fit_ratings, load_results, rotations, run_tournament
+
+
+@pytest.fixture(scope="module")
+def model_paths(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("models")
+    model = MaskablePPO("MlpPolicy", BriscolaVecEnv(1, num_players=4), seed=0, device="cpu")
+    model.save(folder / "a.zip")
+    shutil.copy(folder / "a.zip", folder / "a_copy.zip")
+    return str(folder / "a.zip"), str(folder / "a_copy.zip")
+
+
+def test_rotations():
+    assert rotations(["a", "b"]) == [("a", "b"), ("b", "a")]
+    assert rotations(["a", "b", "a", "b"]) == [("a", "b", "a", "b"), ("b", "a", "b", "a")]
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_identical_policies_always_draw(model_paths, players):
+    # Duplicate deals swap the hands, so a policy against itself cancels out
+    ratings, results = run_tournament(list(model_paths), num_players=players, sets=32, batch_size=16)
+    assert sum(r["draws"] for r in results) == 32
+    assert sum(r["diff"] for r in results) == 0
+    assert ratings[model_paths[1]][0] == pytest.approx(1000)
+
+
+def test_resume_matches_uninterrupted_run(model_paths, tmp_path):
+    specs = ["random", model_paths[0]]
+    _, expected = run_tournament(specs, sets=64, batch_size=16, results_path=str(tmp_path / "full.jsonl"))
+
+    path = tmp_path / "partial.jsonl"
+    lines = (tmp_path / "full.jsonl").read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:2]) + lines[2][:10])
+    assert len(load_results(str(path))) == 2
+
+    ratings, results = run_tournament(specs, sets=64, batch_size=16, results_path=str(path), workers=2)
+    key = lambda r: r["first_seed"]
+    assert sorted(results, key=key) == sorted(expected, key=key)
+    assert ratings["random"] == (1000, 0)
+
+
+def test_resume_after_partial_line_keeps_file_readable(tmp_path):
+    specs = ["random", "greedy"]
+    _, expected = run_tournament(specs, sets=64, batch_size=16, results_path=str(tmp_path / "full.jsonl"))
+
+    path = tmp_path / "partial.jsonl"
+    lines = (tmp_path / "full.jsonl").read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:2]) + lines[2][:10])
+    run_tournament(specs, sets=64, batch_size=16, results_path=str(path))
+    # Every line parses, so a second resume loads the whole run and plays nothing
+    key = lambda r: r["first_seed"]
+    assert sorted(load_results(str(path)), key=key) == sorted(expected, key=key)
+    _, results = run_tournament(specs, sets=64, batch_size=16, results_path=str(path))
+    assert len(path.read_text().splitlines()) == len(expected) == len(results)
+
+
+def test_results_of_other_player_counts_are_not_reused(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    run_tournament(["random", "greedy"], sets=16, batch_size=16, results_path=path)
+    _, results = run_tournament(["random", "greedy"], num_players=4, sets=16, batch_size=16, results_path=path)
+    assert [r["players"] for r in results] == [4]
+    assert len(load_results(path)) == 2
+
+
+def test_fit_ratings_recovers_elo_gap():
+    results = [{"a": "x", "b": "y", "wins": 750, "draws": 0, "losses": 250}]
+    ratings = fit_ratings(["y", "x"], results, prior=1e-9)
+    assert ratings["x"][0] - 1000 == pytest.approx(400 * math.log10(3), abs=0.5)
+    assert ratings["y"] == (1000, 0)
+    assert 0 < ratings["x"][1] < 100
+
+
+def test_swiss_rounds_pair_everyone(model_paths):
+    specs = ["random", *model_paths]
+    ratings, results = run_tournament(specs, tournament_format="swiss", rounds=3, sets=16, batch_size=16)
+    assert {r["round"] for r in results} == {0, 1, 2}
+    # 3 entrants: one pairing per round, the second avoids a rematch
+    pairs = {r["round"]: {r["a"], r["b"]} for r in results}
+    assert pairs[0] != pairs[1]
+    assert set(ratings) == set(specs)
+
+
+def test_swiss_resume_matches_uninterrupted_run(tmp_path):
+    specs = ["random", "greedy", "hoarder", "partner"]
+    kwargs = dict(tournament_format="swiss", rounds=3, sets=16, batch_size=16)
+    _, expected = run_tournament(specs, results_path=str(tmp_path / "full.jsonl"), **kwargs)
+
+    # Interrupted part way through the last round
+    path = tmp_path / "partial.jsonl"
+    lines = (tmp_path / "full.jsonl").read_text().splitlines(keepends=True)
+    last = [i for i, r in enumerate(expected) if r["round"] == 2]
+    path.write_text("".join(lines[: last[0] + 1]))
+
+    _, results = run_tournament(specs, results_path=str(path), **kwargs)
+    key = lambda r: (r["round"], r["a"], r["b"], r["first_seed"])
+    assert sorted(results, key=key) == sorted(expected, key=key)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from sb3_contrib.common.wrappers import ActionMasker
+
+from lib.action_mask_wrapper import SB3ActionMaskWrapper
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.training_env import BriscolaTrainingEnv
+
+
+class FirstCardPolicy:
+    def predict(self, observation, action_masks=None, deterministic=True):
+        return int(np.flatnonzero(action_masks)[0]), None
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_self_play_matches_wrapper_stack(players):
+    lean = BriscolaTrainingEnv(num_players=players)
+    wrapped = ActionMasker(SB3ActionMaskWrapper(BriscolaEnv(num_players=players)), lambda env: env.action_mask())
+    rng = np.random.default_rng(0)
+    for seed in range(20):
+        obs, _ = lean.reset(seed=seed)
+        expected, _ = wrapped.reset(seed=seed)
+        assert_array_equal(expected, obs)
+        terminated = False
+        while not terminated:
+            mask = lean.action_masks()
+            assert_array_equal(wrapped.action_masks(), mask)
+            action = rng.choice(np.flatnonzero(mask))
+            obs, reward, terminated, truncated, info = lean.step(action)
+            expected, expected_reward, expected_terminated, _, expected_info = wrapped.step(action)
+            assert_array_equal(expected, obs)
+            assert (reward, terminated, info) == (expected_reward, expected_terminated, expected_info)
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_fixed_opponents_only_expose_learner(players):
+    env = BriscolaTrainingEnv(num_players=players, opponents=FirstCardPolicy(), learner_seat=1)
+    for seed in range(20):
+        env.reset(seed=seed)
+        steps = 0
+        terminated = False
+        while not terminated:
+            assert env.state.action_on == 1
+            mask = env.action_masks()
+            _, reward, terminated, _, _ = env.step(np.flatnonzero(mask)[-1])
+            steps += 1
+        assert steps == 40 // players
+        assert reward == env.rewards[1]
+
+
+def test_random_learner_seat_is_seeded():
+    env = BriscolaTrainingEnv(num_players=4, opponents=FirstCardPolicy())
+    seats = []
+    for seed in range(10):
+        env.reset(seed=seed)
+        seats.append(env.seat)
+    env.reset(seed=0)
+    assert env.seat == seats[0]
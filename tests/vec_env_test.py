@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from sb3_contrib.common.maskable.utils import get_action_masks, is_masking_supported
+from sb3_contrib.common.wrappers import ActionMasker
+
+from lib.action_mask_wrapper import SB3ActionMaskWrapper
+from lib.briscola.game import BriscolaGame
+from lib.briscola.vec_game import BriscolaVecGame
+from lib.briscola_env.briscola_env import BriscolaEnv
+from lib.briscola_env.embedding import game_embedding, vec_game_embedding
+from lib.briscola_env.vec_env import BriscolaVecEnv
+
+
+def make_wrapped_env(players):
+    env = SB3ActionMaskWrapper(BriscolaEnv(num_players=players))
+    return ActionMasker(env, lambda env: env.action_mask())
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_vec_game_matches_game(players):
+    seeds = list(range(64))
+    games = [BriscolaGame(players, goes_first=s % players, seed=s) for s in seeds]
+    vec = BriscolaVecGame(len(seeds), players=players)
+    vec.reset_seeded(range(len(seeds)), seeds, [s % players for s in seeds])
+    rng = np.random.default_rng(0)
+
+    while not games[0].game_over():
+        seats = vec.action_on
+        for i, game in enumerate(games):
+            assert_array_equal(game_embedding(game, game.action_on), vec_game_embedding(vec, seats)[i])
+        cards = []
+        for game in games:
+            hand = game.players[game.action_on].hand
+            card = hand[rng.integers(len(hand))]
+            cards.append(card.id)
+            game.play(card)
+        vec.play(np.array(cards))
+        scored = vec.should_score_trick()
+        winners = vec.score_tricks(scored)
+        assert winners.tolist() == [g.score_trick() for g in games if g.should_score_trick()]
+        vec.redeal(vec.needs_redeal())
+        for game in games:
+            if game.needs_redeal():
+                game.redeal()
+
+    assert vec.game_over().all()
+    assert vec.scores.tolist() == [[p.score() for p in g.players] for g in games]
+    assert vec.leader().tolist() == [g.leaders()[0][1] for g in games]
+
+
+@pytest.mark.parametrize("players", [2, 4])
+def test_vec_env_matches_wrapped_env(players):
+    num_envs = 16
+    vec_env = BriscolaVecEnv(num_envs, num_players=players)
+    vec_env.seed(100)
+    envs = [make_wrapped_env(players) for _ in range(num_envs)]
+    obs = vec_env.reset()
+    for i, env in enumerate(envs):
+        env_obs, _ = env.reset(seed=100 + i)
+        assert_array_equal(env_obs, obs[i])
+
+    rng = np.random.default_rng(1)
+    done = np.zeros(num_envs, dtype=bool)
+    while not done.all():
+        masks = get_action_masks(vec_env)
+        actions = np.array([rng.choice(np.flatnonzero(m)) for m in masks])
+        obs, rewards, dones, infos = vec_env.step(actions)
+        for i, env in enumerate(envs):
+            if done[i]:
+                continue
+            assert_array_equal(env.action_masks(), masks[i])
+            env_obs, reward, terminated, _, info = env.step(actions[i])
+            assert reward == rewards[i]
+            assert terminated == dones[i]
+            assert info == {k: infos[i][k] for k in ("tricks", "wins")}
+            if terminated:
+                assert_array_equal(env_obs, infos[i]["terminal_observation"])
+            else:
+                assert_array_equal(env_obs, obs[i])
+        done |= dones
+
+
+def test_vec_env_supports_masking():
+    vec_env = BriscolaVecEnv(4, num_players=2)
+    vec_env.reset()
+    assert is_masking_supported(vec_env)
+    assert get_action_masks(vec_env).shape == (4, 40)
+    assert (get_action_masks(vec_env).sum(axis=1) == 3).all()
+
+
+def test_vec_env_rejects_unplayable_cards():
+    vec_env = BriscolaVecEnv(2, num_players=2)
+    vec_env.reset()
+    masks = vec_env.action_masks()
+    actions = np.array([np.flatnonzero(m == 0)[0] for m in masks])
+    with pytest.raises(Exception):
+        vec_env.step(actions)
+
+
+def test_vec_env_deals_from_options():
+    rng = np.random.default_rng(0)
+    decks = [rng.permutation(40) for _ in range(3)]
+    env = BriscolaVecEnv(3, num_players=4)
+    env.set_options([{"deck": deck, "goes_first": i} for i, deck in enumerate(decks)])
+    obs = env.reset()
+    for i, deck in enumerate(decks):
+        game = BriscolaGame(4, goes_first=i, deck=deck)
+        assert_array_equal(obs[i], game_embedding(game, i))